@@ -0,0 +1,84 @@
+import time
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+def policy_aggregates_work(tx):
+    """
+    Function to be executed within a write transaction to store each Policy node's vote counts
+    and the scores derived from them on the node.
+
+    Sets on every Policy node:
+        support, opposition, split (int): Number of MPs who voted for, against or split.
+        total_votes (int): Number of MPs who voted on the policy.
+        support_ratio (float): support / opposition, or null if no MP voted against.
+        controversy (float): 1 - |support - opposition| / (support + opposition), from 0 when
+                             every MP voted the same way to 1 when the House divided evenly,
+                             or null unless MPs voted both for and against.
+
+    Args:
+        tx: The transaction object.
+
+    Returns:
+        A Record object containing the number of Policy nodes updated.
+    """
+    return tx.run("MATCH (p:Policy) \
+                OPTIONAL MATCH (p)<-[r:VOTED_FOR|VOTED_AGAINST|VOTE_SPLIT]-(:MP) \
+                WITH p, sum(CASE type(r) WHEN 'VOTED_FOR' THEN 1 ELSE 0 END) AS support, \
+                        sum(CASE type(r) WHEN 'VOTED_AGAINST' THEN 1 ELSE 0 END) AS opposition, \
+                        sum(CASE type(r) WHEN 'VOTE_SPLIT' THEN 1 ELSE 0 END) AS split \
+                SET p.support = support, p.opposition = opposition, p.split = split, \
+                    p.total_votes = support + opposition + split, \
+                    p.support_ratio = CASE WHEN opposition > 0 THEN toFloat(support) / opposition END, \
+                    p.controversy = CASE WHEN support > 0 AND opposition > 0 \
+                        THEN 1 - abs(toFloat(support) - opposition) / (support + opposition) END, \
+                    p.aggregated_at = datetime() \
+                RETURN count(p) AS policies").single()
+
+def party_aggregates_work(tx):
+    """
+    Function to be executed within a write transaction to replace the PARTY_VOTES summary
+    relationships from each Party node to the Policy nodes its MPs voted on.
+
+    Each PARTY_VOTES relationship has `support`, `opposition`, `split` and `total_votes` properties
+    counting the party's MPs by how they voted.
+
+    Args:
+        tx: The transaction object.
+
+    Returns:
+        A Record object containing the number of PARTY_VOTES relationships created.
+    """
+    tx.run("MATCH (:Party)-[s:PARTY_VOTES]->(:Policy) DELETE s").consume()
+    return tx.run("MATCH (party:Party)<-[:IS_A_MEMBER_OF]-(:MP)-[r:VOTED_FOR|VOTED_AGAINST|VOTE_SPLIT]->(p:Policy) \
+                WITH party, p, sum(CASE type(r) WHEN 'VOTED_FOR' THEN 1 ELSE 0 END) AS support, \
+                               sum(CASE type(r) WHEN 'VOTED_AGAINST' THEN 1 ELSE 0 END) AS opposition, \
+                               sum(CASE type(r) WHEN 'VOTE_SPLIT' THEN 1 ELSE 0 END) AS split \
+                CREATE (party)-[s:PARTY_VOTES {support: support, opposition: opposition, split: split, \
+                                               total_votes: support + opposition + split}]->(p) \
+                RETURN count(s) AS summaries").single()
+
+def refresh_aggregates(driver):
+    """
+    Recompute the vote counts stored on Policy nodes and PARTY_VOTES relationships, which the
+    dashboard reads instead of counting vote relationships on every view. Run after every ingest.
+    Both are replaced in a single transaction, so the dashboard never sees a partial refresh.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+
+    Returns:
+        dict: Number of Policy nodes and PARTY_VOTES relationships written, and the elapsed seconds.
+    """
+    start = time.perf_counter()
+    with driver.session() as session:
+        policies, summaries = session.execute_write(_refresh_aggregates_work)
+    stats = {'policies': policies, 'summaries': summaries, 'seconds': time.perf_counter() - start}
+    logger.info(f"Aggregated votes for {stats['policies']} policies and {stats['summaries']} party summaries "
+                f"in {stats['seconds']:.2f}s")
+    return stats
+
+def _refresh_aggregates_work(tx):
+    policies = policy_aggregates_work(tx)["policies"]
+    summaries = party_aggregates_work(tx)["summaries"]
+    return policies, summaries
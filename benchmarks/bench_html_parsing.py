@@ -0,0 +1,92 @@
+"""
+Micro-benchmark of the HTML extraction used by `scraper.parse_mp_votes` and
+`scraper.parse_constituency_regions`, comparing the original full `html.parser` tree
+against lxml and SoupStrainer partial parsing on saved pages.
+
+Usage:
+    python benchmarks/bench_html_parsing.py [--fixtures DIR] [--repeat N]
+
+The fixtures directory should contain `twfy_votes*.html` and `wikipedia_constituencies*.html`
+pages, e.g. real pages saved from TheyWorkForYou and Wikipedia.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(parent_dir)
+import scraper
+
+DEFAULT_FIXTURES_DIR = os.path.join(parent_dir, 'tests', 'fixtures')
+
+# (name, parser, partial) configurations, the first is the original implementation
+CONFIGURATIONS = [
+    ('html.parser full', 'html.parser', False),
+    ('html.parser partial', 'html.parser', True),
+    ('lxml full', 'lxml', False),
+    ('lxml partial', 'lxml', True),
+]
+
+PAGES = [
+    ('twfy_votes*.html', scraper.parse_mp_votes),
+    ('wikipedia_constituencies*.html', scraper.parse_constituency_regions),
+]
+
+def available_configurations():
+    """
+    Get the benchmark configurations whose parser backend is installed.
+    """
+    configurations = []
+    for name, parser, partial in CONFIGURATIONS:
+        try:
+            scraper.make_soup('<p></p>', parser)
+        except Exception:
+            print(f'Skipping {name}: parser not installed')
+            continue
+        configurations.append((name, parser, partial))
+    return configurations
+
+def measure(parse, html, parser, partial, repeat):
+    """
+    Time `repeat` parses of a page and measure the peak memory of a single parse.
+
+    Returns:
+        tuple: The parse output, mean seconds per parse and peak bytes allocated.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        output = parse(html, parser=parser, partial=partial)
+    seconds = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    parse(html, parser=parser, partial=partial)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return output, seconds, peak
+
+def run(fixtures_dir, repeat):
+    configurations = available_configurations()
+    for pattern, parse in PAGES:
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, pattern))):
+            with open(path, 'rb') as f:
+                html = f.read()
+            print(f'\n{os.path.basename(path)} ({len(html) / 1024:.1f} KiB, {parse.__name__})')
+            print(f'{"configuration":<22}{"ms/parse":>10}{"peak KiB":>10}{"speedup":>9}  output')
+
+            baseline_output = baseline_seconds = None
+            for name, parser, partial in configurations:
+                output, seconds, peak = measure(parse, html, parser, partial, repeat)
+                if baseline_output is None:
+                    baseline_output, baseline_seconds = output, seconds
+                matches = 'same' if output == baseline_output else 'DIFFERENT'
+                print(f'{name:<22}{seconds * 1000:>10.2f}{peak / 1024:>10.0f}{baseline_seconds / seconds:>8.1f}x  {matches}')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES_DIR, help="directory of saved HTML pages")
+    parser.add_argument('--repeat', type=int, default=50, help="parses per configuration (default: %(default)s)")
+    args = parser.parse_args()
+    run(args.fixtures, args.repeat)
@@ -0,0 +1,184 @@
+"""
+Ingestion benchmark: writes a synthetic parliament to Neo4j with each writer and reports
+throughput, per-MP latency percentiles and peak memory.
+
+Usage:
+    python benchmarks/bench_ingest.py [--mps N] [--policies N] [--writers create_person,bulk,...]
+
+Runs against the test database in NEO4J_URI_TEST (with NEO4J_USERNAME / NEO4J_PASSWORD), which is
+cleared before each writer. Results are written as JSON so runs can be compared across commits
+with --compare.
+"""
+import argparse
+import datetime
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(parent_dir)
+sys.path.append(os.path.join(parent_dir, 'tests'))
+from test_helpers import generate_parliament
+import database
+from database import Database
+
+DEFAULT_RESULTS_DIR = os.path.join(parent_dir, 'benchmarks', 'results')
+
+def write_create_person(driver, mps, args):
+    """
+    Write MPs one at a time with `database.create_person`.
+
+    Returns:
+        list: Seconds spent writing each MP.
+    """
+    latencies = []
+    for mp in mps:
+        start = time.perf_counter()
+        database.create_person(driver, mp)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def write_concurrent(driver, mps, args):
+    """
+    Write MPs with `database.create_person` on `args.workers` threads.
+
+    Returns:
+        list: Seconds spent writing each MP.
+    """
+    def timed_create_person(mp):
+        start = time.perf_counter()
+        database.create_person(driver, mp)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        return list(executor.map(timed_create_person, mps))
+
+def write_bulk(driver, mps, args):
+    """
+    Write MPs in batches of `args.batch_size` with `database.create_people_bulk`.
+    Each MP's latency is its share of the batch it was written in.
+
+    Returns:
+        list: Seconds spent writing each MP.
+    """
+    latencies = []
+    for i in range(0, len(mps), args.batch_size):
+        batch = mps[i:i + args.batch_size]
+        start = time.perf_counter()
+        database.create_people_bulk(driver, batch, batch_size=args.batch_size)
+        latencies.extend([(time.perf_counter() - start) / len(batch)] * len(batch))
+    return latencies
+
+WRITERS = {
+    'create_person': write_create_person,
+    'concurrent': write_concurrent,
+    'bulk': write_bulk,
+}
+
+def clear_database(driver):
+    with driver.session() as session:
+        session.run("MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS").consume()
+
+def run_writer(name, driver, mps, args):
+    """
+    Clear the database and time one writer over all MPs.
+
+    Returns:
+        dict: The writer's results.
+    """
+    clear_database(driver)
+    num_votes = sum(len(mp.votes) for mp in mps)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    latencies = WRITERS[name](driver, mps, args)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = np.array(latencies)
+    return {
+        'writer': name,
+        'seconds': seconds,
+        'mps_per_second': len(mps) / seconds,
+        'votes_per_second': num_votes / seconds,
+        'latency_p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'latency_p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'peak_python_memory_mb': peak / (1024 * 1024),
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=parent_dir, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, previous_path):
+    """
+    Print the throughput and p99 latency change of each writer against a previous results file.
+    """
+    with open(previous_path) as f:
+        previous = {r['writer']: r for r in json.load(f)['results']}
+    print(f'\nCompared to {previous_path}:')
+    for result in results:
+        before = previous.get(result['writer'])
+        if before is None:
+            continue
+        throughput = result['mps_per_second'] / before['mps_per_second'] - 1
+        p99 = result['latency_p99_ms'] / before['latency_p99_ms'] - 1
+        print(f"{result['writer']:<16} throughput {throughput:+.1%}  p99 latency {p99:+.1%}")
+
+def main(args):
+    load_dotenv()
+    config = {'mps': args.mps, 'policies': args.policies, 'votes_per_mp': args.votes_per_mp,
+              'workers': args.workers, 'batch_size': args.batch_size, 'seed': args.seed}
+
+    start = time.perf_counter()
+    mps = generate_parliament(args.mps, args.policies, votes_per_mp=args.votes_per_mp, seed=args.seed)
+    num_votes = sum(len(mp.votes) for mp in mps)
+    print(f'Generated {len(mps)} MPs and {num_votes} votes in {time.perf_counter() - start:.1f}s')
+
+    driver = Database.init_driver(os.getenv("NEO4J_URI_TEST"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+    results = []
+    print(f'{"writer":<16}{"seconds":>9}{"MPs/s":>9}{"votes/s":>10}{"p50 ms":>9}{"p99 ms":>9}{"peak MB":>9}')
+    for name in args.writers.split(','):
+        result = run_writer(name, driver, mps, args)
+        results.append(result)
+        print(f"{name:<16}{result['seconds']:>9.2f}{result['mps_per_second']:>9.1f}{result['votes_per_second']:>10.0f}"
+              f"{result['latency_p50_ms']:>9.1f}{result['latency_p99_ms']:>9.1f}{result['peak_python_memory_mb']:>9.1f}")
+    clear_database(driver)
+    Database.close_driver()
+
+    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f'ingest_{timestamp}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'benchmark': 'ingest', 'commit': git_commit(), 'timestamp': timestamp,
+                   'config': config, 'results': results}, f, indent=2)
+    print(f'Results written to {output}')
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mps', type=int, default=650, help="number of MPs (default: %(default)s)")
+    parser.add_argument('--policies', type=int, default=300, help="number of policies (default: %(default)s)")
+    parser.add_argument('--votes-per-mp', type=int, default=None,
+                        help="policies each MP voted on (default: all policies, up to 300)")
+    parser.add_argument('--writers', default=','.join(WRITERS),
+                        help=f"comma separated writers to run, from {', '.join(WRITERS)} (default: all)")
+    parser.add_argument('--workers', type=int, default=8, help="threads for the concurrent writer (default: %(default)s)")
+    parser.add_argument('--batch-size', type=int, default=database.DEFAULT_BULK_BATCH_SIZE,
+                        help="MPs per transaction for the bulk writer (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the parliament (default: %(default)s)")
+    parser.add_argument('--output', help="results file (default: benchmarks/results/ingest_<timestamp>.json)")
+    parser.add_argument('--compare', metavar='RESULTS', help="previous results file to compare against")
+    main(parser.parse_args())
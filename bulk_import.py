@@ -0,0 +1,129 @@
+import csv
+import os
+import threading
+from database import VOTE_RELATIONSHIPS
+from policies import policy_id
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_BULK_IMPORT_DIR = 'bulk_import'
+
+# Node files, as (label, file name, header). MPs, parties, regions and start dates are identified by
+# the property `create_person` merges them on, policies by their stable ID.
+NODE_FILES = [
+    ('MP', 'mps.csv', ['name:ID(MP)', 'constituency', 'gender', 'electorate:int', 'turnout:float',
+                       'majority:int', 'govt_post']),
+    ('Party', 'parties.csv', ['name:ID(Party)']),
+    ('Region', 'regions.csv', ['name:ID(Region)']),
+    ('Start_Date', 'start_dates.csv', ['date:ID(Start_Date)']),
+    ('Policy', 'policies.csv', [':ID(Policy)', 'id:long', 'name']),
+]
+
+# Relationship files, as (file name, header). The type of each relationship is in its :TYPE column.
+RELATIONSHIP_FILES = [
+    ('memberships.csv', [':START_ID(MP)', ':END_ID(Party)', ':TYPE']),
+    ('regions_represented.csv', [':START_ID(MP)', ':END_ID(Region)', ':TYPE']),
+    ('houses_joined.csv', [':START_ID(MP)', ':END_ID(Start_Date)', ':TYPE']),
+    ('votes.csv', [':START_ID(MP)', ':END_ID(Policy)', 'strength:float', ':TYPE']),
+]
+
+# Nodes each MP links to, as (label, node file, MP attribute, relationship file, relationship type)
+LINKS = [
+    ('Party', 'parties.csv', 'party', 'memberships.csv', 'IS_A_MEMBER_OF'),
+    ('Region', 'regions.csv', 'region', 'regions_represented.csv', 'REPRESENTS_REGION'),
+    ('Start_Date', 'start_dates.csv', 'start_date', 'houses_joined.csv', 'JOINED_HOUSE'),
+]
+
+class BulkImportWriter(object):
+    """
+    Streams enriched MPs into node and relationship CSV files for `neo4j-admin database import`,
+    the offline importer used to build a new database far faster than transactional writes.
+    Each MP's rows are written as soon as it is added, and the Party, Region, Start_Date and
+    Policy nodes it links to are written the first time they are seen.
+
+    Attributes:
+        directory (str): Directory the CSV files are written to.
+        counts (dict): Number of rows written to each file.
+    """
+    def __init__(self, directory=DEFAULT_BULK_IMPORT_DIR):
+        self.directory = directory
+        self.counts = {}
+        self._files = {}
+        self._writers = {}
+        self._seen = {label: set() for label, _, _ in NODE_FILES}
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        for file_name, header in [(f, h) for _, f, h in NODE_FILES] + RELATIONSHIP_FILES:
+            f = open(os.path.join(directory, file_name), 'w', newline='', encoding='utf-8')
+            self._files[file_name] = f
+            self._writers[file_name] = csv.writer(f)
+            self._writers[file_name].writerow(header)
+            self.counts[file_name] = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, file_name, row):
+        self._writers[file_name].writerow(['' if value is None else value for value in row])
+        self.counts[file_name] += 1
+
+    def _write_node(self, label, file_name, key, row):
+        if key not in self._seen[label]:
+            self._seen[label].add(key)
+            self._write(file_name, row)
+
+    def add(self, mp):
+        """
+        Write an enriched MP's node, the nodes it links to that have not been written yet,
+        and all of its relationships.
+
+        Args:
+            mp (MP): The enriched MP object.
+        """
+        with self._lock:
+            self._write_node('MP', 'mps.csv', mp.name,
+                             [mp.name, mp.constituency, mp.gender, mp.electorate, mp.turnout,
+                              mp.majority, mp.govt_post])
+            for label, node_file, attribute, relationship_file, relationship in LINKS:
+                value = getattr(mp, attribute)
+                if value is not None:
+                    self._write_node(label, node_file, value, [value])
+                    self._write(relationship_file, [mp.name, value, relationship])
+
+            for policy, direction, strength in mp.votes:
+                if direction not in VOTE_RELATIONSHIPS:
+                    continue
+                id = policy_id(policy)
+                self._write_node('Policy', 'policies.csv', id, [id, id, policy])
+                self._write('votes.csv', [mp.name, id, strength, VOTE_RELATIONSHIPS[direction]])
+
+    def command(self, database='neo4j'):
+        """
+        Build the `neo4j-admin` command that imports the written files into a new database.
+
+        Args:
+            database (str): Name of the database to create.
+
+        Returns:
+            str: The command line.
+        """
+        arguments = [f'--nodes={label}={os.path.join(self.directory, file_name)}'
+                     for label, file_name, _ in NODE_FILES]
+        arguments += [f'--relationships={os.path.join(self.directory, file_name)}'
+                      for file_name, _ in RELATIONSHIP_FILES]
+        return f"neo4j-admin database import full {' '.join(arguments)} {database}"
+
+    def close(self):
+        """
+        Close the CSV files. `command` gives the command that imports them.
+        """
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+        logger.info(f"Wrote bulk import files to {self.directory}: "
+                    + ', '.join(f'{count} rows in {name}' for name, count in self.counts.items()))
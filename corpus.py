@@ -0,0 +1,347 @@
+"""
+Local store of the MPs' Wikipedia articles, each fetched once or loaded from a MediaWiki XML dump,
+stored compressed with its revision ID and served from a memory-mapped file. Stored articles are
+re-fetched once their latest revision on Wikipedia differs from the stored one.
+
+Usage:
+    python corpus.py [--corpus DIR] --load-dump DUMP.xml[.bz2]
+"""
+import argparse
+import bz2
+import json
+import mmap
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+import zlib
+import http_client
+from logger_config import get_logger
+
+# wikipedia is optional, it is only needed to fetch articles that are not in the store
+try:
+    import wikipedia
+except ImportError:
+    wikipedia = None
+
+# mwparserfromhell is optional, it is only needed to load dumps, whose articles are wikitext
+try:
+    import mwparserfromhell
+except ImportError:
+    mwparserfromhell = None
+
+logger = get_logger(__name__)
+
+DEFAULT_CORPUS_DIR = 'wikipedia_corpus'
+# Article texts are trimmed at this heading when stored
+REFERENCES_HEADING = "== References =="
+WIKIPEDIA_API_URL = 'https://en.wikipedia.org/w/api.php'
+# Seconds a stored article is used before its latest revision on Wikipedia is checked again
+DEFAULT_REVISION_TTL = 7 * 24 * 60 * 60
+# Disambiguator of a title such as "Jane Smith (politician)"
+DISAMBIGUATOR = re.compile(r'\s+\([^)]*\)$')
+
+class Article(object):
+    """
+    A stored Wikipedia article.
+
+    Attributes:
+        title (str): The article's title.
+        revision_id (int): ID of the revision the text is from.
+        text (str): The article's text, without its references.
+    """
+    def __init__(self, title, revision_id, text):
+        self.title = title
+        self.revision_id = revision_id
+        self.text = text
+
+class CorpusStore(object):
+    """
+    Append-only store of zlib compressed article texts in a single data file, read through a memory map,
+    with a JSON index of each title's revision and where its text is in the data file, of when each
+    title's latest revision was last checked, and of the title each MP's name resolved to. Safe to
+    use from multiple threads.
+
+    Attributes:
+        directory (str): Directory of the store's files.
+    """
+    def __init__(self, directory=DEFAULT_CORPUS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._mmap = None
+        os.makedirs(directory, exist_ok=True)
+        self._index = {'articles': {}, 'resolved': {}, 'checked': {}}
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                self._index.update(json.load(f))
+        self._data = open(self._data_path, 'ab+')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.directory, 'index.json')
+
+    @property
+    def _data_path(self):
+        return os.path.join(self.directory, 'articles.bin')
+
+    def __len__(self):
+        return len(self._index['articles'])
+
+    def __contains__(self, title):
+        return title in self._index['articles']
+
+    def add(self, title, revision_id, text):
+        """
+        Store a revision of an article, unless it is already stored.
+
+        Args:
+            title (str): The article's title.
+            revision_id (int): ID of the revision.
+            text (str): The article's text. Anything from its references heading on is not stored.
+
+        Returns:
+            bool: True if the revision was stored, False if it was already stored.
+        """
+        data = zlib.compress(text.split(REFERENCES_HEADING)[0].encode('utf-8'))
+        with self._lock:
+            if self.revision(title) == revision_id:
+                return False
+            self._data.seek(0, os.SEEK_END)
+            offset = self._data.tell()
+            self._data.write(data)
+            self._data.flush()
+            self._index['articles'][title] = {'revision_id': revision_id, 'offset': offset, 'length': len(data)}
+        return True
+
+    def revision(self, title):
+        """
+        Get the stored revision ID of an article, or None if it is not stored.
+        """
+        entry = self._index['articles'].get(title)
+        return entry['revision_id'] if entry is not None else None
+
+    def get(self, title):
+        """
+        Read an article, decompressing its text from the memory-mapped data file.
+
+        Args:
+            title (str): The article's title.
+
+        Returns:
+            Article: The article, or None if it is not stored.
+        """
+        entry = self._index['articles'].get(title)
+        if entry is None:
+            return None
+        end = entry['offset'] + entry['length']
+        with self._lock:
+            # The data file only grows, so it is mapped again once it has outgrown the map
+            if self._mmap is None or len(self._mmap) < end:
+                if self._mmap is not None:
+                    self._mmap.close()
+                self._mmap = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+            data = self._mmap[entry['offset']:end]
+        return Article(title, entry['revision_id'], zlib.decompress(data).decode('utf-8'))
+
+    def checked(self, title):
+        """
+        Get when an article's latest revision was last checked, as seconds since the epoch, or None if it never was.
+        """
+        return self._index['checked'].get(title)
+
+    def set_checked(self, title, timestamp=None):
+        """
+        Record when an article's latest revision was checked, defaulting to now.
+        """
+        with self._lock:
+            self._index['checked'][title] = time.time() if timestamp is None else timestamp
+
+    def resolve(self, name):
+        """
+        Get the title of the article an MP's name resolved to, or None if it has not been resolved.
+        """
+        return self._index['resolved'].get(name)
+
+    def set_resolved(self, name, title):
+        """
+        Record the title of the article an MP's name resolved to.
+        """
+        with self._lock:
+            self._index['resolved'][name] = title
+
+    def save(self):
+        """
+        Write the index, so that the articles added since it was last saved are found by later runs.
+        """
+        with self._lock:
+            # Write to a temporary file first so a failed write never loses the previous index
+            tmp_path = f'{self._index_path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, self._index_path)
+
+    def close(self):
+        """
+        Save the index and close the data file.
+        """
+        self.save()
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._data.close()
+
+def require_wikipedia():
+    """
+    Raises:
+        ImportError: If wikipedia is not installed.
+    """
+    if wikipedia is None:
+        raise ImportError("Fetching articles needs wikipedia, install it with `pip install wikipedia`")
+
+def latest_revision(title):
+    """
+    Get the ID of the latest revision of a Wikipedia article, with a single MediaWiki API request.
+
+    Args:
+        title (str): The article's title.
+
+    Returns:
+        int: The revision ID, or None if the article does not exist or the request failed.
+    """
+    params = {'action': 'query', 'prop': 'revisions', 'titles': title, 'rvprop': 'ids',
+              'format': 'json', 'formatversion': 2}
+    response = http_client.get(WIKIPEDIA_API_URL, params=params, bypass=True)
+    if response.status_code != 200:
+        logger.error(f"Error: {response.status_code} when checking the latest revision of {title}")
+        return None
+    page = response.json()['query']['pages'][0]
+    if page.get('missing') or not page.get('revisions'):
+        return None
+    return page['revisions'][0]['revid']
+
+def fetch_article(store, name, offline=False, refresh=False, ttl=DEFAULT_REVISION_TTL):
+    """
+    Get the article about an MP, from the store if the MP's name has been resolved before or is the
+    title of a stored article, otherwise by searching Wikipedia and storing the first result.
+    A stored article's latest revision is checked once it has not been checked for `ttl` seconds,
+    and the article is fetched again if the revision differs from the stored one.
+
+    Args:
+        store (CorpusStore): The corpus store.
+        name (str): The MP's name.
+        offline (bool): If True, only articles already in the store are returned, without checking their revisions.
+        refresh (bool): If True, check the latest revision of a stored article however recently it was checked.
+        ttl (int): Seconds a stored article is used before its latest revision is checked again.
+
+    Returns:
+        Article: The article, or None if none was found.
+    """
+    title = store.resolve(name) or (name if name in store else None)
+    if title is not None:
+        checked = store.checked(title)
+        if not offline and (refresh or checked is None or time.time() - checked >= ttl):
+            revision_id = latest_revision(title)
+            if revision_id is not None and revision_id != store.revision(title):
+                logger.info(f"Fetching revision {revision_id} of {title}")
+                require_wikipedia()
+                page = wikipedia.page(title, auto_suggest=False)
+                store.add(title, int(page.revision_id), page.content)
+            store.set_checked(title)
+        return store.get(title)
+    if offline:
+        logger.warning(f"No stored Wikipedia page for {name}")
+        return None
+
+    require_wikipedia()
+    search_results = wikipedia.search(name)
+    if not search_results:
+        logger.warning(f"No Wikipedia page found for {name}")
+        return None
+
+    page = wikipedia.page(search_results[0], auto_suggest=False)
+    store.add(page.title, int(page.revision_id), page.content)
+    store.set_checked(page.title)
+    store.set_resolved(name, page.title)
+    return store.get(page.title)
+
+def strip_wikitext(wikitext):
+    """
+    Convert an article's wikitext to plain text like that of articles fetched from Wikipedia,
+    dropping its templates, references and markup and anything from its references heading on.
+
+    Args:
+        wikitext (str): The article's wikitext.
+
+    Returns:
+        str: The article's plain text.
+    """
+    if mwparserfromhell is None:
+        raise ImportError("Loading dumps needs mwparserfromhell, install it with `pip install mwparserfromhell`")
+    return mwparserfromhell.parse(wikitext.split(REFERENCES_HEADING)[0]).strip_code().strip()
+
+def _local_name(tag):
+    # Dumps qualify every tag with the export schema's namespace
+    return tag.rsplit('}', 1)[-1]
+
+def load_dump(store, path):
+    """
+    Add the articles in a MediaWiki XML dump, such as one exported with Special:Export, to the store,
+    converted from wikitext to plain text. The dump is parsed incrementally, so it may be larger than
+    memory, and may be bz2 compressed.
+
+    Names are resolved to titles as they would be by searching Wikipedia, so that offline runs find
+    the articles: a redirect resolves to its target, and a title's name without its disambiguator,
+    such as "Jane Smith" for "Jane Smith (politician)", resolves to the first title loaded with it
+    unless it is already resolved. MPs whose name matches neither are only found by online runs.
+
+    Args:
+        store (CorpusStore): The corpus store.
+        path (str): Path of the dump.
+
+    Returns:
+        int: Number of article revisions added.
+    """
+    opener = bz2.open if path.endswith('.bz2') else open
+    added = 0
+    with opener(path, 'rb') as f:
+        for _, element in ET.iterparse(f):
+            if _local_name(element.tag) != 'page':
+                continue
+            fields = {_local_name(child.tag): child for child in element}
+            title = fields['title'].text
+            # Only articles are stored, not talk, user or other namespaces' pages
+            if fields.get('ns') is not None and fields['ns'].text != '0':
+                element.clear()
+                continue
+            if 'redirect' in fields:
+                store.set_resolved(title, fields['redirect'].get('title'))
+                element.clear()
+                continue
+            revision = {_local_name(child.tag): child.text for child in fields['revision']}
+            added += store.add(title, int(revision['id']), strip_wikitext(revision.get('text') or ''))
+            name = DISAMBIGUATOR.sub('', title)
+            if name != title and store.resolve(name) is None:
+                store.set_resolved(name, title)
+            element.clear()
+    store.save()
+    logger.info(f"Added {added} articles from {path}")
+    return added
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', default=os.getenv("WIKIPEDIA_CORPUS_DIR", DEFAULT_CORPUS_DIR),
+                        help="directory of the corpus store (default: %(default)s)")
+    parser.add_argument('--load-dump', required=True, metavar='DUMP', help="MediaWiki XML dump to add to the store")
+    args = parser.parse_args()
+
+    with CorpusStore(args.corpus) as store:
+        added = load_dump(store, args.load_dump)
+        print(f"Added {added} articles, {len(store)} in the store")
@@ -1,8 +1,105 @@
+import time
 from neo4j import GraphDatabase
 from logger_config import get_logger
+from policies import PolicyCatalogue, policy_id
 
 logger = get_logger(__name__)
 
+def merge_legacy_policies_work(tx):
+    """
+    Function to be executed within a write transaction to give the Policy nodes written before
+    policies had IDs the ID of their normalised description. Legacy nodes whose descriptions
+    normalise to the same ID, such as "Foo" and "foo.", are merged into a single node with that
+    ID: their votes are moved to it and the legacy nodes are deleted.
+
+    Args:
+        tx: The transaction object.
+
+    Returns:
+        int: Number of legacy Policy nodes merged.
+    """
+    names = [record["name"] for record in tx.run("MATCH (p:Policy) WHERE p.id IS NULL RETURN p.name AS name")]
+    if not names:
+        return 0
+    rows = [{'name': name, 'id': policy_id(name)} for name in names]
+    return tx.run("UNWIND $rows AS row \
+                MATCH (legacy:Policy {name: row.name}) WHERE legacy.id IS NULL \
+                MERGE (p:Policy {id: row.id}) ON CREATE SET p.name = row.name \
+                WITH legacy, p \
+                OPTIONAL MATCH (m:MP)-[v]->(legacy) \
+                FOREACH (_ IN CASE WHEN type(v) = 'VOTED_FOR' THEN [1] ELSE [] END | \
+                    MERGE (m)-[:VOTED_FOR {strength: v.strength}]->(p)) \
+                FOREACH (_ IN CASE WHEN type(v) = 'VOTED_AGAINST' THEN [1] ELSE [] END | \
+                    MERGE (m)-[:VOTED_AGAINST {strength: v.strength}]->(p)) \
+                FOREACH (_ IN CASE WHEN type(v) = 'VOTE_SPLIT' THEN [1] ELSE [] END | \
+                    MERGE (m)-[:VOTE_SPLIT {strength: v.strength}]->(p)) \
+                WITH DISTINCT legacy \
+                DETACH DELETE legacy \
+                RETURN count(*) AS merged",
+                rows=rows).single()["merged"]
+
+# Schema migrations applied in order by `Database.apply_schema`, as (version, steps) pairs. A step is
+# a schema statement, or a function run in a write transaction to migrate data.
+# Every step must be idempotent, as a migration is re-run if recording its version fails.
+SCHEMA_MIGRATIONS = [
+    (1, [
+        "CREATE CONSTRAINT mp_name IF NOT EXISTS FOR (m:MP) REQUIRE m.name IS UNIQUE",
+        "CREATE CONSTRAINT policy_name IF NOT EXISTS FOR (p:Policy) REQUIRE p.name IS UNIQUE",
+        "CREATE CONSTRAINT party_name IF NOT EXISTS FOR (p:Party) REQUIRE p.name IS UNIQUE",
+        "CREATE CONSTRAINT region_name IF NOT EXISTS FOR (r:Region) REQUIRE r.name IS UNIQUE",
+        "CREATE CONSTRAINT start_date_date IF NOT EXISTS FOR (s:Start_Date) REQUIRE s.date IS UNIQUE",
+        "CREATE INDEX mp_constituency IF NOT EXISTS FOR (m:MP) ON (m.constituency)",
+        # Full-text indexes for the dashboard's MP / region / party search boxes
+        "CREATE FULLTEXT INDEX mp_name_search IF NOT EXISTS FOR (m:MP) ON EACH [m.name]",
+        "CREATE FULLTEXT INDEX region_name_search IF NOT EXISTS FOR (r:Region) ON EACH [r.name]",
+        "CREATE FULLTEXT INDEX party_name_search IF NOT EXISTS FOR (p:Party) ON EACH [p.name]",
+    ]),
+    (2, [
+        # Votes reference policies by the stable ID from `policies.policy_id`. Descriptions that differ
+        # only in case, spacing or trailing punctuation share an ID, so names are no longer unique
+        "DROP CONSTRAINT policy_name IF EXISTS",
+        "CREATE INDEX policy_name IF NOT EXISTS FOR (p:Policy) ON (p.name)",
+        merge_legacy_policies_work,
+        "CREATE CONSTRAINT policy_id IF NOT EXISTS FOR (p:Policy) REQUIRE p.id IS UNIQUE",
+    ]),
+    (3, [
+        # Let the dashboard's top-N reports read the counts from `aggregates` in index order
+        "CREATE INDEX policy_support IF NOT EXISTS FOR (p:Policy) ON (p.support)",
+        "CREATE INDEX policy_opposition IF NOT EXISTS FOR (p:Policy) ON (p.opposition)",
+        "CREATE INDEX policy_support_ratio IF NOT EXISTS FOR (p:Policy) ON (p.support_ratio)",
+        "CREATE INDEX policy_controversy IF NOT EXISTS FOR (p:Policy) ON (p.controversy)",
+    ]),
+]
+
+def get_schema_version_work(tx):
+    """
+    Function to be executed within a read transaction to get the recorded schema version.
+
+    Args:
+        tx: The transaction object.
+
+    Returns:
+        int: The recorded schema version, or 0 if no version has been recorded.
+    """
+    record = tx.run("MATCH (v:SchemaVersion) RETURN max(v.version) AS version").single()
+    if record is None or record["version"] is None:
+        return 0
+    return record["version"]
+
+def set_schema_version_work(tx, version):
+    """
+    Function to be executed within a write transaction to record the schema version.
+
+    Args:
+        tx: The transaction object.
+        version (int): The schema version that has been applied.
+
+    Returns:
+        A Record object containing the SchemaVersion node.
+    """
+    return tx.run("MERGE (v:SchemaVersion) SET v.version = $version, v.applied_at = datetime() RETURN v",
+                  version=version).single()
+
 class Database(object):
     """
     Singleton class to manage the Neo4j graph database operations.
@@ -18,7 +115,7 @@ class Database(object):
         raise RuntimeError('Call init_driver() instead')
 
     @classmethod
-    def init_driver(cls, uri, username, password):
+    def init_driver(cls, uri, username, password, apply_schema=True):
         """
         Initialize the Neo4j driver with the given connection parameters.
         If the driver has already been initialized, returns the existing instance.
@@ -27,6 +124,7 @@ class Database(object):
             uri (str): The connection URI for the Neo4j database.
             username (str): The username for authentication.
             password (str): The password for authentication.
+            apply_schema (bool): Whether to apply any pending schema migrations to a new driver.
 
         Returns:
             The initialized Neo4j driver.
@@ -39,6 +137,8 @@ class Database(object):
             cls.driver = GraphDatabase.driver(uri, auth=(username, password))
             # Verify connectivity
             cls.driver.verify_connectivity()
+            if apply_schema:
+                cls.apply_schema()
         else:
             print('Already intialised')
 
@@ -57,6 +157,32 @@ class Database(object):
         
         return cls.driver
 
+    @classmethod
+    def apply_schema(cls):
+        """
+        Apply the constraints, indexes and data migrations in `SCHEMA_MIGRATIONS` that are newer
+        than the schema version recorded in the database, and record the new version.
+
+        Returns:
+            int: The schema version of the database.
+        """
+        with cls.driver.session() as session:
+            current_version = session.execute_read(get_schema_version_work)
+            for version, steps in SCHEMA_MIGRATIONS:
+                if version <= current_version:
+                    continue
+                logger.info(f"Applying schema migration {version}")
+                # Schema changes can't share a transaction with data writes, so each runs in its own
+                for step in steps:
+                    if callable(step):
+                        session.execute_write(step)
+                    else:
+                        session.run(step).consume()
+                session.execute_write(set_schema_version_work, version=version)
+                current_version = version
+
+        return current_version
+
     @classmethod
     def close_driver(cls):
         """
@@ -112,104 +238,308 @@ def create_person_work(tx, name, party, constituency, region, gender,
                 gender=gender, start_date=start_date, electorate=electorate, 
                 turnout=turnout, majority=majority, govt_post=govt_post).single()
 
-def create_vote_for_work(tx, name, vote, strength):
+# Default number of MPs sent to Neo4j in a single bulk write transaction
+DEFAULT_BULK_BATCH_SIZE = 50
+
+# Vote directions and the relationship types they are written as
+VOTE_RELATIONSHIPS = {'voted_for': 'VOTED_FOR', 'voted_against': 'VOTED_AGAINST', 'vote_split': 'VOTE_SPLIT'}
+
+def upsert_policies_work(tx, policies):
+    """
+    Function to be executed within a write transaction to create or update Policy nodes by ID.
+    Policy nodes written before policies had IDs are given theirs by schema migration 2
+    (`merge_legacy_policies_work`) when the driver is initialised.
+
+    Args:
+        tx: The transaction object.
+        policies (list): {id, name} dicts from `PolicyCatalogue.pending`.
+
+    Returns:
+        A Record object containing the number of Policy nodes written.
+    """
+    return tx.run("UNWIND $policies AS policy \
+                MERGE (p:Policy {id: policy.id}) SET p.name = policy.name \
+                RETURN count(p) AS policies",
+                policies=policies).single()
+
+def write_people_work(tx, policies, rows):
+    """
+    Function to be executed within a write transaction to upsert any new Policy nodes, then
+    create or update a batch of MP nodes and their vote relationships.
+
+    Args:
+        tx: The transaction object.
+        policies (list): {id, name} dicts for policies not yet written.
+        rows (list): Rows created by `mp_to_row`, one per MP.
+
+    Returns:
+        A Record object containing the names of the created or updated MP nodes.
+    """
+    if policies:
+        upsert_policies_work(tx, policies)
+    return create_people_bulk_work(tx, rows)
+
+def mp_to_row(mp):
+    """
+    Convert an MP object into a parameter row for `create_people_bulk_work`, with the MP's
+    votes grouped by direction.
+
+    Args:
+        mp (MP): An MP object containing the MP's attributes and voting records.
+
+    Returns:
+        dict: The MP's attributes, plus a list of {policy_id, policy_name, strength} dicts per vote direction.
+    """
+    row = {'name': mp.name, 'party': mp.party, 'constituency': mp.constituency, 'region': mp.region,
+           'gender': mp.gender, 'start_date': mp.start_date, 'electorate': mp.electorate,
+           'turnout': mp.turnout, 'majority': mp.majority, 'govt_post': mp.govt_post}
+    row.update(group_votes(mp.votes))
+    return row
+
+def group_votes(votes):
+    """
+    Group vote tuples by direction, dropping any vote with an unknown direction.
+
+    Args:
+        votes (iterable): (policy, direction, strength) vote tuples.
+
+    Returns:
+        dict: A list of {policy_id, policy_name, strength} dicts for each direction in `VOTE_RELATIONSHIPS`.
+    """
+    grouped = {direction: [] for direction in VOTE_RELATIONSHIPS}
+    for vote in votes:
+        if vote[1] in VOTE_RELATIONSHIPS:
+            # The name is only set if the vote creates the Policy node, so it is never left nameless
+            grouped[vote[1]].append({'policy_id': policy_id(vote[0]), 'policy_name': vote[0], 'strength': vote[2]})
+    return grouped
+
+def create_people_bulk_work(tx, rows):
+    """
+    Function to be executed within a write transaction to create or update a batch of MP nodes,
+    their Party, Region and Start_Date relationships and all of their vote relationships
+    in a single query.
+
+    Args:
+        tx: The transaction object.
+        rows (list): Rows created by `mp_to_row`, one per MP.
+
+    Returns:
+        A Record object containing the names of the created or updated MP nodes.
+    """
+    return tx.run("UNWIND $rows AS row \
+                MERGE (m:MP {name: row.name}) SET m.constituency = row.constituency,\
+                                                  m.gender = row.gender,\
+                                                  m.electorate = row.electorate, m.turnout = row.turnout,\
+                                                  m.majority = row.majority, m.govt_post = row.govt_post \
+                MERGE (p:Party {name: row.party}) \
+                MERGE (r:Region {name: row.region}) \
+                MERGE (s:Start_Date {date: row.start_date}) \
+                MERGE (m)-[:IS_A_MEMBER_OF]->(p) \
+                MERGE (m)-[:REPRESENTS_REGION]->(r) \
+                MERGE (m)-[:JOINED_HOUSE]->(s) \
+                FOREACH (vote IN row.voted_for | \
+                    MERGE (pol:Policy {id: vote.policy_id}) ON CREATE SET pol.name = vote.policy_name \
+                    MERGE (m)-[:VOTED_FOR {strength: vote.strength}]->(pol)) \
+                FOREACH (vote IN row.voted_against | \
+                    MERGE (pol:Policy {id: vote.policy_id}) ON CREATE SET pol.name = vote.policy_name \
+                    MERGE (m)-[:VOTED_AGAINST {strength: vote.strength}]->(pol)) \
+                FOREACH (vote IN row.vote_split | \
+                    MERGE (pol:Policy {id: vote.policy_id}) ON CREATE SET pol.name = vote.policy_name \
+                    MERGE (m)-[:VOTE_SPLIT {strength: vote.strength}]->(pol)) \
+                RETURN collect(m.name) AS names",
+                rows=rows).single()
+
+def create_person(driver, mp, catalogue=None):
+    """
+    Creates or updates an MP node and its associated relationships in the graph database.
+    The MP node, its links, all of its votes and any Policy nodes not yet written are
+    written in a single `write_people_work` transaction, the same as one batch of
+    `create_people_bulk`, with each vote matched to its Policy node by the policy's ID.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+        mp (MP): An MP object containing the MP's attributes and voting records.
+        catalogue (PolicyCatalogue): The run's policy catalogue, so each Policy node is only written once.
+                                 Without one, all of the MP's policies are written.
+
+    Returns:
+        The name of the created or updated MP node.
+    """
+    logger.info(f"Creating node for {mp.name}")
+    catalogue = catalogue if catalogue is not None else PolicyCatalogue()
+    catalogue.add_votes(mp.votes)
+    policies = catalogue.pending()
+    with driver.session() as session:
+        record = session.execute_write(write_people_work, policies=policies, rows=[mp_to_row(mp)])
+    catalogue.mark_written(policies)
+    # Return the name of the single MP written
+    return record["names"][0]
+
+def create_people_bulk(driver, mps, batch_size=DEFAULT_BULK_BATCH_SIZE, catalogue=None):
     """
-    Function to be executed within a write transaction to create or update an MP node's
-    VOTED_FOR relationship with a Policy node.
+    Creates or updates many MP nodes and their relationships, sending `batch_size` MPs
+    per write transaction.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+        mps (iterable): MP objects containing the MPs' attributes and voting records.
+        batch_size (int): Maximum number of MPs written in one transaction.
+        catalogue (PolicyCatalogue): The run's policy catalogue, so each Policy node is only written once.
+
+    Returns:
+        dict: Number of MPs, votes and rows written, the elapsed seconds and rows written per second.
+    """
+    stats = {'mps': 0, 'votes': 0, 'rows': 0, 'policies': 0, 'seconds': 0.0, 'rows_per_second': 0.0}
+    batch_size = max(1, batch_size)
+    catalogue = catalogue if catalogue is not None else PolicyCatalogue()
+    start = time.perf_counter()
+
+    with driver.session() as session:
+        batch = []
+        for mp in mps:
+            catalogue.add_votes(mp.votes)
+            batch.append(mp_to_row(mp))
+            if len(batch) >= batch_size:
+                _write_bulk_batch(session, catalogue, batch, stats)
+                batch = []
+        if batch:
+            _write_bulk_batch(session, catalogue, batch, stats)
+
+    stats['seconds'] = time.perf_counter() - start
+    if stats['seconds'] > 0:
+        stats['rows_per_second'] = stats['rows'] / stats['seconds']
+    logger.info(f"Bulk wrote {stats['mps']} MPs and {stats['votes']} votes in {stats['seconds']:.2f}s "
+                f"({stats['rows_per_second']:.0f} rows/s)")
+    return stats
+
+def _write_bulk_batch(session, catalogue, rows, stats):
+    """
+    Write a batch of MP rows and the policies they introduce in one transaction and add the
+    counts written to `stats`.
+    """
+    policies = catalogue.pending()
+    session.execute_write(write_people_work, policies=policies, rows=rows)
+    catalogue.mark_written(policies)
+    votes = sum(len(row[direction]) for row in rows for direction in VOTE_RELATIONSHIPS)
+    stats['mps'] += len(rows)
+    stats['votes'] += votes
+    stats['policies'] += len(policies)
+    stats['rows'] += len(rows) + votes + len(policies)
+    logger.debug(f"Bulk wrote batch of {len(rows)} MPs and {votes} votes")
+
+def create_votes_work(tx, name, voted_for, voted_against, vote_split):
+    """
+    Function to be executed within a write transaction to add vote relationships to an existing MP node.
 
     Args:
         tx: The transaction object.
         name (str): The name of the MP.
-        vote (str): The name of the policy the MP voted for.
-        strength (float): The strength of the MP's vote.
+        voted_for (list): {policy_id, policy_name, strength} dicts for policies the MP voted for.
+        voted_against (list): {policy_id, policy_name, strength} dicts for policies the MP voted against.
+        vote_split (list): {policy_id, policy_name, strength} dicts for policies the MP's vote was split on.
 
     Returns:
-        A Record object containing the created or updated nodes and relationships.
+        A Record object containing the MP node.
     """
     return tx.run("MATCH (m:MP {name: $name}) \
-                MERGE (p:Policy {name: $vote}) \
-                MERGE (m)-[:VOTED_FOR {strength: $strength}]->(p) \
-                RETURN p",
-                name=name, vote=vote, strength=strength).single()
+                FOREACH (vote IN $voted_for | \
+                    MERGE (pol:Policy {id: vote.policy_id}) ON CREATE SET pol.name = vote.policy_name \
+                    MERGE (m)-[:VOTED_FOR {strength: vote.strength}]->(pol)) \
+                FOREACH (vote IN $voted_against | \
+                    MERGE (pol:Policy {id: vote.policy_id}) ON CREATE SET pol.name = vote.policy_name \
+                    MERGE (m)-[:VOTED_AGAINST {strength: vote.strength}]->(pol)) \
+                FOREACH (vote IN $vote_split | \
+                    MERGE (pol:Policy {id: vote.policy_id}) ON CREATE SET pol.name = vote.policy_name \
+                    MERGE (m)-[:VOTE_SPLIT {strength: vote.strength}]->(pol)) \
+                RETURN m",
+                name=name, voted_for=voted_for, voted_against=voted_against, vote_split=vote_split).single()
 
-def create_vote_against_work(tx, name, vote, strength):
+def delete_votes_work(tx, name, votes):
     """
-    Function to be executed within a write transaction to create or update an MP node's
-    VOTED_AGAINST relationship with a Policy node.
+    Function to be executed within a write transaction to delete vote relationships from an MP node.
 
     Args:
         tx: The transaction object.
         name (str): The name of the MP.
-        vote (str): The name of the policy the MP voted against.
-        strength (float): The strength of the MP's vote.
+        votes (list): {policy_id, type, strength} dicts, where type is the relationship type to delete.
 
     Returns:
-        A Record object containing the created or updated nodes and relationships.
+        A Record object containing the number of relationships deleted.
     """
-    return tx.run("MATCH (m:MP {name: $name}) \
-                MERGE (p:Policy {name: $vote}) \
-                MERGE (m)-[:VOTED_AGAINST {strength: $strength}]->(p) \
-                RETURN p",
-                name=name, vote=vote, strength=strength).single()
+    return tx.run("UNWIND $votes AS vote \
+                MATCH (m:MP {name: $name})-[r]->(p:Policy {id: vote.policy_id}) \
+                WHERE type(r) = vote.type AND r.strength = vote.strength \
+                DELETE r \
+                RETURN count(r) AS deleted",
+                name=name, votes=votes).single()
 
-def create_vote_split_work(tx, name, vote, strength):
+def delete_person_links_work(tx, name):
     """
-    Function to be executed within a write transaction to create or update an MP node's
-    VOTE_SPLIT relationship with a Policy node.
+    Function to be executed within a write transaction to delete an MP node's Party, Region and
+    Start_Date relationships, so that rewriting them does not leave the previous ones behind.
 
     Args:
         tx: The transaction object.
         name (str): The name of the MP.
-        vote (str): The name of the policy the MP's vote was split on.
-        strength (float): The strength of the MP's vote.
 
     Returns:
-        A Record object containing the created or updated nodes and relationships.
+        A Record object containing the number of relationships deleted.
     """
-    return tx.run("MATCH (m:MP {name: $name}) \
-                MERGE (p:Policy {name: $vote}) \
-                MERGE (m)-[:VOTE_SPLIT {strength: $strength}]->(p) \
-                RETURN p",
-                name=name, vote=vote, strength=strength).single()
+    return tx.run("MATCH (m:MP {name: $name})-[r:IS_A_MEMBER_OF|REPRESENTS_REGION|JOINED_HOUSE]->() \
+                DELETE r \
+                RETURN count(r) AS deleted",
+                name=name).single()
 
-def create_person(driver, mp):
+def apply_person_diff_work(tx, mp, attributes_changed, added_votes, removed_votes, policies=None):
     """
-    Creates or updates an MP node and its associated relationships in the graph database.
-    
+    Function to be executed within a write transaction to apply only the changes to an MP
+    since it was last written.
+
+    Args:
+        tx: The transaction object.
+        mp (MP): The MP object with its current attributes.
+        attributes_changed (bool): Whether the MP node and its Party, Region and Start_Date links need writing.
+                                   The existing links are replaced, so a new party or region is not
+                                   added alongside the old one.
+        added_votes (list): (policy, direction, strength) votes to create.
+        removed_votes (list): (policy, direction, strength) votes to delete.
+        policies (list): {id, name} dicts for policies of the added votes not yet written.
+    """
+    if policies:
+        upsert_policies_work(tx, policies)
+    if attributes_changed:
+        delete_person_links_work(tx, name=mp.name)
+        create_person_work(tx, name=mp.name, party=mp.party, constituency=mp.constituency, region=mp.region,
+                           gender=mp.gender, start_date=mp.start_date, electorate=mp.electorate,
+                           turnout=mp.turnout, majority=mp.majority, govt_post=mp.govt_post)
+    if removed_votes:
+        delete_votes_work(tx, name=mp.name,
+                          votes=[{'policy_id': policy_id(vote[0]), 'type': VOTE_RELATIONSHIPS[vote[1]], 'strength': vote[2]}
+                                 for vote in removed_votes if vote[1] in VOTE_RELATIONSHIPS])
+    if added_votes:
+        create_votes_work(tx, name=mp.name, **group_votes(added_votes))
+
+def apply_person_diff(driver, mp, diff, catalogue=None):
+    """
+    Writes only the changes to an MP since it was last written, in a single transaction.
+
     Args:
-    driver (neo4j.Driver): The Neo4j driver instance.
-    mp (MP): An MP object containing the MP's attributes and voting records.
+        driver (neo4j.Driver): The Neo4j driver instance.
+        mp (MP): The MP object with its current attributes and voting records.
+        diff (MPDiff): The changes to write, as returned by `SyncState.diff`.
+        catalogue (PolicyCatalogue): The run's policy catalogue, so each Policy node is only written once.
 
     Returns:
-        The name of the created or updated MP node.
+        The name of the updated MP node.
     """
-    logger.info(f"Creating node for {mp.name}")
-    session = driver.session()
-    record = session.execute_write(create_person_work,
-                            name=mp.name, 
-                            party=mp.party, 
-                            constituency=mp.constituency, 
-                            region=mp.region,
-                            gender=mp.gender,
-                            start_date=mp.start_date,
-                            electorate=mp.electorate,
-                            turnout=mp.turnout,
-                            majority=mp.majority,
-                            govt_post=mp.govt_post)
-    for vote in mp.votes:
-        # If MP voted in for / against / split the issue then add relationship to graph
-        if vote[1] == 'voted_for':
-            session.execute_write(create_vote_for_work,
-                                    name=mp.name, vote=vote[0], strength=vote[2])
-
-        elif vote[1] == 'voted_against':
-            session.execute_write(create_vote_against_work,
-                                    name=mp.name, vote=vote[0], strength=vote[2])
-        elif vote[1] == 'vote_split':
-            session.execute_write(create_vote_split_work,
-                                    name=mp.name, vote=vote[0], strength=vote[2])
-    # Get the value from the first record
-    person = record["p"]
-    session.close()
-    # Return the property from the node
-    return person["name"]
\ No newline at end of file
+    logger.info(f"Updating node for {mp.name}: attributes_changed={diff.attributes_changed}, "
+                f"added_votes={len(diff.added_votes)}, removed_votes={len(diff.removed_votes)}")
+    catalogue = catalogue if catalogue is not None else PolicyCatalogue()
+    catalogue.add_votes(diff.added_votes)
+    policies = catalogue.pending()
+    with driver.session() as session:
+        session.execute_write(apply_person_diff_work, mp=mp, attributes_changed=diff.attributes_changed,
+                              added_votes=diff.added_votes, removed_votes=diff.removed_votes,
+                              policies=policies)
+    catalogue.mark_written(policies)
+    return mp.name
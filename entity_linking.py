@@ -0,0 +1,280 @@
+import hashlib
+import json
+import os
+import requests
+from logger_config import get_logger
+
+# spaCy is optional, it is only needed by the local annotator
+try:
+    import spacy
+except ImportError:
+    spacy = None
+
+logger = get_logger(__name__)
+
+DEFAULT_ENTITY_CACHE_DIR = '.entity_cache'
+DEFAULT_ENTITY_THRESHOLD = 0.8
+# Texts longer than this are linked a paragraph chunk at a time, keeping each Wikifier request small
+MAX_CHUNK_CHARS = 10000
+
+WIKIFIER_URL = "http://www.wikifier.org/annotate-article"
+# spaCy model used by the local annotator
+LOCAL_MODEL = 'en_core_web_sm'
+
+# Wikidata classes of the entities we're interested in, and the node label each is written with
+LABEL_MAP = {
+    "person": "Person",
+    "school": "School",
+    "higher education institution": "University",
+    "city/town": "Location",
+    "country": "Location",
+    "geographic region": "Location",
+    "location": "Location",
+    "political party": "Party",
+    "company": "Organisation",
+    "business": "Organisation",
+    "organization": "Organisation",
+}
+
+# spaCy entity types recognised by the local annotator, and the node label each is written with
+SPACY_LABEL_MAP = {
+    "PERSON": "Person",
+    "GPE": "Location",
+    "LOC": "Location",
+    "ORG": "Organisation",
+}
+
+def get_label(annotation_classes):
+    """
+    Get the node label of a Wikifier annotation from its Wikidata classes.
+
+    Args:
+        annotation_classes (list): The annotation's `wikiDataClasses`.
+
+    Returns:
+        str: The label from `LABEL_MAP` of the first class in it, or None if there is none.
+    """
+    for wiki_class in annotation_classes:
+        label = LABEL_MAP.get(wiki_class['enLabel'])
+        if label:
+            return label
+    return None
+
+def wikifier_annotate(text, threshold=DEFAULT_ENTITY_THRESHOLD):
+    """
+    Link the entities mentioned in a text to Wikipedia pages with the wikifier.org API,
+    authenticated with the WIKIFIER_USER_KEY environment variable.
+
+    Args:
+        text (str): The text.
+        threshold (float): Annotations with a squared page rank below this are discarded.
+
+    Returns:
+        list: {title, label, characters} dicts of the entities in `LABEL_MAP`, `characters` being the
+              inclusive (start, end) character offsets of each mention. None if the request failed.
+    """
+    data = {
+        "text": text,
+        "lang": "en",
+        "userKey": os.getenv("WIKIFIER_USER_KEY"),
+        # prune annotations based on page rank
+        "pageRankSqThreshold": threshold,
+        # discard all annotations that have been pruned
+        "applyPageRankSqThreshold": "true",
+        "support": "true",
+        "minLinkFrequency": "true",
+        "ranges": "false",
+        "includeCosines": "false",
+        # ignore ambiguous mentions
+        "maxMentionEntropy": "3"
+    }
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    response = requests.post(WIKIFIER_URL, data=data, headers=headers, timeout=60)
+    if response.status_code != 200:
+        logger.error(f"Error: {response.status_code} when using wikifier API")
+        return None
+    response = json.loads(response.content.decode('utf8'))
+
+    results = []
+    for annotation in response['annotations']:
+        # only get desired annotations
+        if 'wikiDataClasses' in annotation:
+            label = get_label(annotation['wikiDataClasses'])
+            if label is not None:
+                results.append({'title': annotation['title'], 'label': label,
+                                'characters': [(s['chFrom'], s['chTo']) for s in annotation['support']]})
+    return results
+
+# The local annotator's spaCy pipeline, loaded on first use
+_local_pipeline = None
+
+def local_annotate(text, threshold=DEFAULT_ENTITY_THRESHOLD):
+    """
+    Stand-in for `wikifier_annotate` for offline runs, recognising entities with spaCy's named
+    entity recogniser. Entities are titled by their text rather than their Wikipedia page.
+
+    Args:
+        text (str): The text.
+        threshold (float): Unused, as spaCy's entities have no page rank.
+
+    Returns:
+        list: {title, label, characters} dicts of the entities in `SPACY_LABEL_MAP`.
+    """
+    global _local_pipeline
+    if spacy is None:
+        raise ImportError("The local annotator needs spacy, install it with `pip install spacy`")
+    if _local_pipeline is None:
+        _local_pipeline = spacy.load(LOCAL_MODEL, disable=['parser'])
+
+    entities = {}
+    for ent in _local_pipeline(text).ents:
+        label = SPACY_LABEL_MAP.get(ent.label_)
+        if label is not None:
+            entity = entities.setdefault(ent.text, {'title': ent.text, 'label': label, 'characters': []})
+            entity['characters'].append((ent.start_char, ent.end_char - 1))
+    return list(entities.values())
+
+# Annotators selectable by name, each called with a text and threshold
+ANNOTATORS = {
+    'wikifier': wikifier_annotate,
+    'local': local_annotate,
+}
+
+def chunks(text, max_chars=MAX_CHUNK_CHARS):
+    """
+    Split a text into chunks of at most `max_chars` characters, at paragraph boundaries where possible.
+
+    Args:
+        text (str): The text.
+        max_chars (int): Maximum characters per chunk.
+
+    Returns:
+        list: (offset, chunk) pairs, `offset` being the chunk's start in `text`.
+    """
+    result = []
+    start = 0
+    while len(text) - start > max_chars:
+        end = start + max_chars
+        # Split after the last newline in the chunk, or failing that the last space
+        split = text.rfind('\n', start, end)
+        if split <= start:
+            split = text.rfind(' ', start, end)
+        end = split + 1 if split > start else end
+        result.append((start, text[start:end]))
+        start = end
+    if start < len(text):
+        result.append((start, text[start:]))
+    return result
+
+def sentence_entities(entities, start, text):
+    """
+    Get the entities mentioned in a sentence of a linked document.
+
+    Args:
+        entities (list): The document's entities, as returned by `EntityLinker.link`.
+        start (int): The sentence's character offset in the document.
+        text (str): The sentence's text.
+
+    Returns:
+        list: The entities with a mention in the sentence, with only those mentions and their
+              offsets relative to the sentence.
+    """
+    end = start + len(text)
+    result = []
+    for entity in entities:
+        characters = [(ch_from - start, ch_to - start) for ch_from, ch_to in entity['characters']
+                      if start <= ch_from and ch_to < end]
+        if characters:
+            result.append(dict(entity, characters=characters))
+    return result
+
+class EntityLinker(object):
+    """
+    Links the entities mentioned in whole documents, one request per chunk of up to `max_chars`
+    characters rather than one per sentence, with the annotations of each chunk stored in an
+    on-disk cache keyed by a hash of the annotator, threshold and text. Unchanged biographies are
+    then linked without any request on later runs. Safe to share a cache directory between processes.
+
+    Attributes:
+        annotator (str): Name of the annotator in `ANNOTATORS`.
+        threshold (float): Threshold passed to the annotator.
+        cache_dir (str): Directory of the cache, or None to disable caching.
+        max_chars (int): Maximum characters per annotated chunk.
+        hits (int): Number of chunks served from the cache.
+        misses (int): Number of chunks sent to the annotator.
+    """
+    def __init__(self, annotator='wikifier', threshold=DEFAULT_ENTITY_THRESHOLD, cache_dir=DEFAULT_ENTITY_CACHE_DIR,
+                 max_chars=MAX_CHUNK_CHARS):
+        if annotator not in ANNOTATORS:
+            raise ValueError(f"Unknown annotator {annotator}, expected one of {list(ANNOTATORS)}")
+        self.annotator = annotator
+        self.threshold = threshold
+        self.cache_dir = cache_dir
+        self.max_chars = max_chars
+        self.hits = 0
+        self.misses = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def cache_key(self, text):
+        """
+        Build the cache key of a text's annotations.
+
+        Returns:
+            str: A hex digest of the annotator, threshold and text.
+        """
+        return hashlib.sha256(json.dumps([self.annotator, self.threshold, text]).encode('utf-8')).hexdigest()
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def annotate(self, text):
+        """
+        Annotate a text, serving it from the cache if it has been annotated before.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            list: {title, label, characters} dicts, or None if annotating failed.
+        """
+        key = self.cache_key(text) if self.cache_dir is not None else None
+        if key is not None:
+            try:
+                with open(self._cache_path(key), 'rb') as f:
+                    entities = json.loads(f.read())
+                self.hits += 1
+                return [dict(entity, characters=[tuple(c) for c in entity['characters']]) for entity in entities]
+            except (OSError, ValueError):
+                pass
+
+        self.misses += 1
+        entities = ANNOTATORS[self.annotator](text, self.threshold)
+        # Failures are not cached, so they are retried by the next run
+        if key is not None and entities is not None:
+            # Write to a temporary file first so concurrent readers never see a partial entry
+            tmp_path = f'{self._cache_path(key)}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entities, f)
+            os.replace(tmp_path, self._cache_path(key))
+        return entities
+
+    def link(self, text):
+        """
+        Link the entities mentioned in a document.
+
+        Args:
+            text (str): The document.
+
+        Returns:
+            list: {title, label, characters} dicts, with each mention's offsets in the document.
+                  The entities of chunks that failed to annotate are missing.
+        """
+        entities = {}
+        for offset, chunk in chunks(text, self.max_chars):
+            for entity in self.annotate(chunk) or []:
+                linked = entities.setdefault(entity['title'], {'title': entity['title'], 'label': entity['label'],
+                                                               'characters': []})
+                linked['characters'].extend((ch_from + offset, ch_to + offset)
+                                            for ch_from, ch_to in entity['characters'])
+        return list(entities.values())
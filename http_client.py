@@ -0,0 +1,515 @@
+import email.utils
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from functools import partial
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_DIR = '.http_cache'
+DEFAULT_MAX_CACHE_BYTES = 500 * 1024 * 1024
+DEFAULT_TTL = 24 * 60 * 60
+
+# Seconds a cached response is served without revalidation, matched on the longest URL prefix
+ENDPOINT_TTLS = {
+    'https://en.wikipedia.org/wiki/Constituencies_of_the_Parliament_of_the_United_Kingdom': 7 * 24 * 60 * 60,
+    'https://www.theyworkforyou.com/api/getMPs': 24 * 60 * 60,
+    'https://www.theyworkforyou.com/mp/': 24 * 60 * 60,
+    'https://members-api.parliament.uk/api/Posts/GovernmentPosts': 24 * 60 * 60,
+    'https://members-api.parliament.uk/api/Members/Search': 24 * 60 * 60,
+    'https://members-api.parliament.uk/api/Members/': 7 * 24 * 60 * 60,
+}
+
+# Keep-alive connections kept open per host
+DEFAULT_POOL_SIZE = 16
+# Token bucket rate limits per host, as (requests per second, burst size), applied by `configure_hosts`
+HOST_RATE_LIMITS = {
+    'www.theyworkforyou.com': (5, 10),
+    'members-api.parliament.uk': (10, 20),
+    'en.wikipedia.org': (5, 5),
+}
+# Statuses retried by `_send`, with exponential backoff from RETRY_BACKOFF_BASE up to RETRY_BACKOFF_MAX seconds
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+RETRY_BACKOFF_BASE = 1
+RETRY_BACKOFF_MAX = 60
+# Connection failures and timeouts are retried like RETRY_STATUSES
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+# Seconds to wait for a host to connect and to send each part of its response
+REQUEST_TIMEOUT = 30
+
+# The cache is off until `configure` is called, so library code always goes to the network,
+# and hosts are not rate limited until `configure_hosts` is called
+_config = {'enabled': False, 'cache_dir': DEFAULT_CACHE_DIR, 'max_bytes': DEFAULT_MAX_CACHE_BYTES,
+           'bypass': False, 'ttls': dict(ENDPOINT_TTLS), 'transport': None, 'recorder': None,
+           'rate_limits': {}, 'pool_size': DEFAULT_POOL_SIZE}
+_lock = threading.Lock()
+_cache_bytes = None
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket limiting the rate of requests to a host.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum number of tokens, i.e. the largest burst of requests.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token, sleeping until one is available.
+
+        Returns:
+            float: Seconds spent waiting for the token.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class HostClient(object):
+    """
+    Keep-alive connection pool, rate limiter and request counters for a single host.
+
+    Attributes:
+        host (str): The host name.
+        session (requests.Session): Session holding the host's connection pool.
+        bucket (TokenBucket): The host's rate limiter, or None if the host is not rate limited.
+        stats (dict): Counts of requests, retries, errors and bytes received, and seconds spent
+                      on requests and waiting for the rate limiter.
+    """
+    def __init__(self, host, pool_size=DEFAULT_POOL_SIZE, rate_limit=None):
+        self.host = host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.bucket = TokenBucket(*rate_limit) if rate_limit else None
+        self.stats = {'requests': 0, 'retries': 0, 'errors': 0, 'bytes': 0,
+                      'latency_seconds': 0.0, 'throttled_seconds': 0.0}
+        self._lock = threading.Lock()
+
+    def count(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self.stats[name] += value
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+class CachedResponse(object):
+    """
+    Response served from the on-disk cache, exposing the parts of `requests.Response` used by the scrapers.
+
+    Attributes:
+        url (str): The URL the response was fetched from.
+        status_code (int): HTTP status code of the cached response.
+        headers (dict): HTTP headers of the cached response.
+        content (bytes): Body of the cached response.
+    """
+    def __init__(self, url, status_code, headers, content, from_cache=True):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+def configure(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_CACHE_BYTES, enabled=True, bypass=False, ttls=None):
+    """
+    Configure the shared HTTP response cache.
+
+    Args:
+        cache_dir (str): Directory responses are stored in.
+        max_bytes (int): Maximum total size of the cache, least recently used entries are evicted above it.
+        enabled (bool): If False, every request goes straight to the network and nothing is stored.
+        bypass (bool): If True, cached responses are never served but fresh responses are still stored.
+        ttls (dict): Per URL prefix TTLs in seconds, merged over `ENDPOINT_TTLS`.
+    """
+    global _cache_bytes
+    with _lock:
+        _config['enabled'] = enabled
+        _config['cache_dir'] = cache_dir
+        _config['max_bytes'] = max_bytes
+        _config['bypass'] = bypass
+        _config['ttls'] = dict(ENDPOINT_TTLS)
+        if ttls:
+            _config['ttls'].update(ttls)
+        _cache_bytes = None
+    if enabled:
+        os.makedirs(cache_dir, exist_ok=True)
+        logger.info(f"HTTP cache enabled in {cache_dir} (bypass={bypass})")
+
+def configure_hosts(rate_limits=None, pool_size=DEFAULT_POOL_SIZE):
+    """
+    Configure the per-host connection pools and rate limits, replacing any existing pools.
+
+    Args:
+        rate_limits (dict): Per host (requests per second, burst size), merged over `HOST_RATE_LIMITS`.
+                            A value of None removes the host's limit.
+        pool_size (int): Keep-alive connections kept open per host.
+    """
+    limits = dict(HOST_RATE_LIMITS)
+    limits.update(rate_limits or {})
+    with _hosts_lock:
+        for client in _hosts.values():
+            client.session.close()
+        _hosts.clear()
+        _config['rate_limits'] = limits
+        _config['pool_size'] = pool_size
+
+def host_client(host):
+    """
+    Get the client for a host, creating its connection pool on first use.
+
+    Args:
+        host (str): The host name.
+
+    Returns:
+        HostClient: The host's client.
+    """
+    with _hosts_lock:
+        client = _hosts.get(host)
+        if client is None:
+            client = HostClient(host, pool_size=_config['pool_size'], rate_limit=_config['rate_limits'].get(host))
+            _hosts[host] = client
+        return client
+
+def get_stats():
+    """
+    Get the request counters of every host used so far.
+
+    Returns:
+        dict: Counters per host, with the mean latency per request in seconds.
+    """
+    with _hosts_lock:
+        clients = list(_hosts.values())
+    stats = {}
+    for client in clients:
+        with client._lock:
+            host_stats = dict(client.stats)
+        host_stats['mean_latency_seconds'] = host_stats['latency_seconds'] / max(1, host_stats['requests'])
+        stats[client.host] = host_stats
+    return stats
+
+def log_stats():
+    """
+    Log the request counters of every host used so far.
+    """
+    for host, stats in get_stats().items():
+        logger.info(f"{host}: {stats['requests']} requests, {stats['retries']} retries, {stats['errors']} errors, "
+                    f"{stats['bytes'] / (1024 * 1024):.1f} MiB, {stats['mean_latency_seconds'] * 1000:.0f} ms mean latency, "
+                    f"{stats['throttled_seconds']:.1f}s rate limited")
+
+def retry_delay(response, attempt):
+    """
+    Get the seconds to wait before retrying a request, honouring the response's Retry-After header.
+
+    Args:
+        response: The failed response.
+        attempt (int): The number of the attempt that failed, from 0.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    retry_after = response.headers.get('Retry-After') if hasattr(response.headers, 'get') else None
+    if isinstance(retry_after, str):
+        if retry_after.strip().isdigit():
+            return min(RETRY_BACKOFF_MAX, int(retry_after))
+        try:
+            retry_at = email.utils.parsedate_to_datetime(retry_after)
+            return min(RETRY_BACKOFF_MAX, max(0.0, retry_at.timestamp() - time.time()))
+        except (TypeError, ValueError):
+            pass
+    return backoff_delay(attempt)
+
+def backoff_delay(attempt):
+    """
+    Get the seconds to wait before retrying a request, with exponential backoff and full jitter.
+
+    Args:
+        attempt (int): The number of the attempt that failed, from 0.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt))
+
+def set_transport(transport):
+    """
+    Replace the function used to send requests over the network, e.g. with a fixture replayer.
+
+    Args:
+        transport (callable): Called as `transport(url, params=..., headers=...)` and returns a response,
+                              or None to send requests through the host's session again.
+    """
+    _config['transport'] = transport
+
+def set_recorder(recorder):
+    """
+    Set an object whose `record(url, params, response)` method is called with every response returned by `get`.
+
+    Args:
+        recorder: The recorder, or None to stop recording.
+    """
+    _config['recorder'] = recorder
+
+def ttl_for(url):
+    """
+    Get the TTL in seconds for a URL, using the longest matching prefix in the configured TTLs.
+
+    Args:
+        url (str): The request URL.
+
+    Returns:
+        int: The TTL in seconds.
+    """
+    matches = [prefix for prefix in _config['ttls'] if url.startswith(prefix)]
+    if not matches:
+        return DEFAULT_TTL
+    return _config['ttls'][max(matches, key=len)]
+
+def cache_key(url, params=None):
+    """
+    Build the cache key for a request from its URL and query parameters.
+
+    Args:
+        url (str): The request URL.
+        params (dict): The query parameters.
+
+    Returns:
+        str: A hex digest identifying the request.
+    """
+    params = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    return hashlib.sha256(json.dumps([url, params]).encode('utf-8')).hexdigest()
+
+def get(url, params=None, headers=None, bypass=False):
+    """
+    Send a GET request, serving it from the on-disk cache while it is within its TTL and
+    revalidating it with ETag / Last-Modified once it has expired.
+
+    Args:
+        url (str): The request URL.
+        params (dict): The query parameters.
+        headers (dict): Extra request headers.
+        bypass (bool): If True, do not serve this request from the cache.
+
+    Returns:
+        A `requests.Response`, or a `CachedResponse` if the response was served from the cache.
+    """
+    response = _get(url, params, headers, bypass)
+    recorder = _config['recorder']
+    if recorder is not None:
+        recorder.record(url, params, response)
+    return response
+
+def _send(url, params=None, headers=None):
+    """
+    Send a request through the host's rate limiter and connection pool, retrying 429 and 5xx
+    responses, connection failures and timeouts up to `MAX_RETRIES` times.
+    """
+    client = host_client(urlsplit(url).netloc)
+    transport = _config['transport'] or partial(client.session.get, timeout=REQUEST_TIMEOUT)
+
+    for attempt in range(MAX_RETRIES + 1):
+        if client.bucket is not None:
+            client.count(throttled_seconds=client.bucket.acquire())
+
+        start = time.perf_counter()
+        try:
+            response = transport(url, params=params, headers=headers)
+        except RETRY_EXCEPTIONS as e:
+            client.count(requests=1, errors=1, latency_seconds=time.perf_counter() - start)
+            if attempt == MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+            client.count(retries=1)
+            logger.debug(f"{url} failed with {e!r}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        except requests.RequestException:
+            client.count(requests=1, errors=1, latency_seconds=time.perf_counter() - start)
+            raise
+        content = response.content
+        client.count(requests=1, latency_seconds=time.perf_counter() - start,
+                     bytes=len(content) if isinstance(content, bytes) else 0)
+
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            break
+        delay = retry_delay(response, attempt)
+        client.count(retries=1)
+        logger.debug(f"{url} returned {response.status_code}, retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+    if response.status_code >= 400:
+        client.count(errors=1)
+    return response
+
+def _get(url, params, headers, bypass):
+    if not _config['enabled']:
+        return _send(url, params=params, headers=headers)
+
+    key = cache_key(url, params)
+    meta = _read_meta(key)
+    bypass = bypass or _config['bypass']
+
+    if meta is not None and not bypass:
+        if time.time() - meta['fetched_at'] < ttl_for(url):
+            cached = _load_response(key, meta)
+            if cached is not None:
+                logger.debug(f"HTTP cache hit for {url}")
+                return cached
+
+        # Expired, ask the server whether our copy is still valid
+        headers = dict(headers or {})
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    response = _send(url, params=params, headers=headers)
+
+    if response.status_code == 304 and meta is not None:
+        logger.debug(f"HTTP cache revalidated {url}")
+        meta['fetched_at'] = time.time()
+        _write_file(_meta_path(key), json.dumps(meta).encode('utf-8'))
+        cached = _load_response(key, meta)
+        if cached is not None:
+            return cached
+        # The body was evicted while revalidating, fetch it again unconditionally
+        response = _send(url, params=params)
+
+    if response.status_code == 200:
+        _store(key, url, response)
+
+    return response
+
+def clear():
+    """
+    Remove every entry from the cache directory.
+    """
+    global _cache_bytes
+    cache_dir = _config['cache_dir']
+    with _lock:
+        if os.path.isdir(cache_dir):
+            for name in os.listdir(cache_dir):
+                os.remove(os.path.join(cache_dir, name))
+        _cache_bytes = 0
+
+def _meta_path(key):
+    return os.path.join(_config['cache_dir'], f'{key}.json')
+
+def _body_path(key):
+    return os.path.join(_config['cache_dir'], f'{key}.body')
+
+def _read_meta(key):
+    try:
+        with open(_meta_path(key), 'rb') as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+def _load_response(key, meta):
+    try:
+        with open(_body_path(key), 'rb') as f:
+            content = f.read()
+        # Touch the body so eviction treats this entry as recently used
+        os.utime(_body_path(key))
+    except OSError:
+        return None
+    return CachedResponse(meta['url'], meta['status_code'], meta['headers'], content)
+
+def _write_file(path, data):
+    # Write to a temporary file first so concurrent readers never see a partial entry
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _store(key, url, response):
+    global _cache_bytes
+    content = response.content
+    if not isinstance(content, bytes):
+        return
+    headers = response.headers if hasattr(response.headers, 'items') else {}
+    meta = {'url': url, 'status_code': response.status_code, 'headers': dict(headers.items()),
+            'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time()}
+    try:
+        # A revalidated or re-fetched entry replaces its previous body rather than adding to the cache size
+        previous_size = os.path.getsize(_body_path(key))
+    except OSError:
+        previous_size = 0
+    try:
+        _write_file(_body_path(key), content)
+        _write_file(_meta_path(key), json.dumps(meta).encode('utf-8'))
+    except OSError:
+        logger.error(f"Failed to store {url} in HTTP cache")
+        return
+
+    with _lock:
+        if _cache_bytes is None:
+            _cache_bytes = _scan_cache_bytes()
+        else:
+            _cache_bytes += len(content) - previous_size
+        if _cache_bytes > _config['max_bytes']:
+            _evict()
+
+def _scan_cache_bytes():
+    cache_dir = _config['cache_dir']
+    return sum(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir)
+               if name.endswith('.body'))
+
+def _evict():
+    """
+    Remove least recently used entries until the cache is below 90% of its maximum size.
+    Must be called with `_lock` held.
+    """
+    global _cache_bytes
+    cache_dir = _config['cache_dir']
+    bodies = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.body'):
+            stat = os.stat(os.path.join(cache_dir, name))
+            bodies.append((stat.st_mtime, stat.st_size, name[:-len('.body')]))
+    bodies.sort()
+
+    _cache_bytes = sum(size for _, size, _ in bodies)
+    target = _config['max_bytes'] * 0.9
+    for _, size, key in bodies:
+        if _cache_bytes <= target:
+            break
+        for path in (_body_path(key), _meta_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        _cache_bytes -= size
+        logger.debug(f"Evicted {key} from HTTP cache")
@@ -0,0 +1,185 @@
+import base64
+import gzip
+import json
+import random
+import threading
+import time
+import http_client
+from http_client import CachedResponse, cache_key
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Query parameters holding credentials, left out of recordings and of the keys they are replayed by
+REDACTED_PARAMS = {'key'}
+
+def fixture_params(params):
+    """
+    Get the query parameters of a request as they are stored in an archive.
+
+    Args:
+        params (dict): The query parameters.
+
+    Returns:
+        dict: The parameters as strings, without `REDACTED_PARAMS`.
+    """
+    return {str(k): str(v) for k, v in (params or {}).items() if k not in REDACTED_PARAMS}
+
+def fixture_key(url, params):
+    """
+    Build the key a request is recorded and replayed by.
+
+    Args:
+        url (str): The request URL.
+        params (dict): The query parameters.
+
+    Returns:
+        str: A hex digest identifying the request.
+    """
+    return cache_key(url, fixture_params(params))
+
+class FixtureRecorder(object):
+    """
+    Records every response returned by `http_client.get` so a run can later be replayed offline.
+    The archive is gzip-compressed JSON lines, one request per line.
+
+    Attributes:
+        path (str): Path the archive is written to.
+        entries (dict): Recorded responses keyed by `fixture_key`.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def record(self, url, params, response):
+        """
+        Record a response. A later response to the same request replaces an earlier one.
+
+        Args:
+            url (str): The request URL.
+            params (dict): The query parameters.
+            response: The response returned for the request.
+        """
+        content = response.content
+        if not isinstance(content, bytes):
+            return
+        headers = response.headers if hasattr(response.headers, 'items') else {}
+        entry = {'url': url, 'params': fixture_params(params),
+                 'status_code': response.status_code, 'headers': dict(headers.items()),
+                 'content': base64.b64encode(content).decode('ascii')}
+        with self._lock:
+            self.entries[fixture_key(url, params)] = entry
+
+    def save(self):
+        """
+        Write the recorded responses to the archive.
+        """
+        with self._lock:
+            entries = list(self.entries.items())
+        with gzip.open(self.path, 'wt', encoding='utf-8') as f:
+            for key, entry in entries:
+                f.write(json.dumps(dict(entry, key=key)) + '\n')
+        logger.info(f"Recorded {len(entries)} HTTP responses to {self.path}")
+
+class FixtureReplayer(object):
+    """
+    In-process stand-in for the network that serves responses from a recorded archive,
+    with optional injected latency and error rate.
+
+    Attributes:
+        path (str): Path of the archive.
+        latency (float): Mean seconds added to each request.
+        jitter (float): Maximum seconds randomly added to or removed from `latency`.
+        error_rate (float): Fraction of requests answered with a 503 error instead of the recording.
+        responses (dict): Recorded responses keyed by `fixture_key`.
+        misses (int): Number of requests that were not in the archive.
+    """
+    def __init__(self, path, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.path = path
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.responses = {}
+        self.misses = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                self.responses[entry['key']] = entry
+        logger.info(f"Loaded {len(self.responses)} recorded HTTP responses from {path}")
+
+    def __call__(self, url, params=None, headers=None):
+        """
+        Serve a request from the archive, with the same signature as `requests.get`.
+
+        Returns:
+            CachedResponse: The recorded response, a 503 response if an error was injected,
+                            or a 404 response if the request was not recorded.
+        """
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            inject_error = self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if inject_error:
+            return CachedResponse(url, 503, {}, b'', from_cache=False)
+
+        entry = self.responses.get(fixture_key(url, params))
+        if entry is None:
+            logger.warning(f"No recorded response for {url} {params}")
+            with self._lock:
+                self.misses += 1
+            return CachedResponse(url, 404, {}, b'', from_cache=False)
+        return CachedResponse(url, entry['status_code'], entry['headers'],
+                              base64.b64decode(entry['content']), from_cache=False)
+
+def start_recording(path):
+    """
+    Record every response returned by `http_client.get` until `stop_recording` is called.
+
+    Args:
+        path (str): Path the archive is written to.
+
+    Returns:
+        FixtureRecorder: The active recorder.
+    """
+    recorder = FixtureRecorder(path)
+    http_client.set_recorder(recorder)
+    return recorder
+
+def stop_recording(recorder):
+    """
+    Stop recording and write the archive.
+
+    Args:
+        recorder (FixtureRecorder): The active recorder.
+    """
+    http_client.set_recorder(None)
+    recorder.save()
+
+def start_replay(path, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+    """
+    Serve every request sent by `http_client` from a recorded archive instead of the network.
+
+    Args:
+        path (str): Path of the archive.
+        latency (float): Mean seconds added to each request.
+        jitter (float): Maximum seconds randomly added to or removed from `latency`.
+        error_rate (float): Fraction of requests answered with a 503 error.
+        seed (int): Seed for the latency and error injection, for reproducible runs.
+
+    Returns:
+        FixtureReplayer: The active replayer.
+    """
+    replayer = FixtureReplayer(path, latency=latency, jitter=jitter, error_rate=error_rate, seed=seed)
+    http_client.set_transport(replayer)
+    return replayer
+
+def stop_replay():
+    """
+    Send requests over the network again.
+    """
+    http_client.set_transport(None)
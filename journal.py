@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_JOURNAL_PATH = 'ingest_journal.jsonl'
+
+# Stages recorded for each MP, in the order they complete
+FETCHED = 'fetched'
+PARSED = 'parsed'
+WRITTEN = 'written'
+FAILED = 'failed'
+STAGES = (FETCHED, PARSED, WRITTEN)
+
+class Journal(object):
+    """
+    Append-only checkpoint journal of the stages each MP has completed in a run, one JSON line
+    per stage, so that a run which dies part way through can be resumed without redoing
+    finished work. A line is flushed as soon as it is recorded, and a line cut short by a crash
+    is ignored when the journal is loaded.
+
+    Attributes:
+        path (str): Path of the journal file.
+        stages (dict): Details of the stages completed by each MP, keyed by the MP's Members API
+                       id as a string, then by stage.
+    """
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, stages=None):
+        self.path = path
+        self.stages = stages or {}
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    @classmethod
+    def open(cls, path=DEFAULT_JOURNAL_PATH, resume=False):
+        """
+        Open the journal for a run.
+
+        Args:
+            path (str): Path of the journal file.
+            resume (bool): If True, load the stages recorded by previous runs and append to them,
+                           otherwise start a new, empty journal.
+
+        Returns:
+            Journal: The opened journal.
+        """
+        if not resume:
+            open(path, 'w').close()
+            return cls(path)
+
+        stages = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"Ignoring incomplete journal line in {path}")
+                        continue
+                    cls._apply(stages, entry)
+        written = sum(1 for mp_stages in stages.values() if WRITTEN in mp_stages)
+        logger.info(f"Resuming from {path}: {written} of {len(stages)} journalled MPs already written")
+        return cls(path, stages)
+
+    @staticmethod
+    def _apply(stages, entry):
+        mp_stages = stages.setdefault(entry['mp'], {})
+        if entry['stage'] == FAILED and entry.get('during') in STAGES:
+            # A failure invalidates the stage that failed and every stage after it
+            for stage in STAGES[STAGES.index(entry['during']):]:
+                mp_stages.pop(stage, None)
+        mp_stages[entry['stage']] = {k: v for k, v in entry.items() if k not in ('mp', 'stage')}
+
+    def record(self, mp_id, stage, **details):
+        """
+        Append a completed stage for an MP to the journal.
+
+        Args:
+            mp_id (int): The MP's Members API id.
+            stage (str): One of `STAGES`, or `FAILED` with the failed stage as `during`.
+            details: JSON serialisable details of the stage, such as the URL of the fetched page
+                     or the parsed votes.
+        """
+        entry = dict(details, mp=str(mp_id), stage=stage, time=time.time())
+        line = json.dumps(entry) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._apply(self.stages, entry)
+
+    def completed(self, mp_id, stage=WRITTEN):
+        """
+        Check whether an MP has completed a stage.
+
+        Args:
+            mp_id (int): The MP's Members API id.
+            stage (str): The stage to check.
+
+        Returns:
+            bool: True if the stage was recorded and has not failed since.
+        """
+        with self._lock:
+            return stage in self.stages.get(str(mp_id), {})
+
+    def details(self, mp_id, stage):
+        """
+        Get the details recorded with a stage an MP has completed.
+
+        Args:
+            mp_id (int): The MP's Members API id.
+            stage (str): The stage.
+
+        Returns:
+            dict: The stage's details, or None if the stage was not recorded or has failed since.
+        """
+        with self._lock:
+            return self.stages.get(str(mp_id), {}).get(stage)
+
+    def close(self):
+        """
+        Close the journal file.
+        """
+        with self._lock:
+            self._file.close()
@@ -1,7 +1,19 @@
-from person import get_mps_from_members_api
+from person import iter_mps_from_members_api
 import os
-from database import Database, create_person
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from database import Database, create_person, create_people_bulk, DEFAULT_BULK_BATCH_SIZE
+from policies import PolicyCatalogue
+from aggregates import refresh_aggregates
+from snapshot import require_pyarrow, write_snapshot, DEFAULT_SNAPSHOT_DIR, FORMATS as SNAPSHOT_FORMATS
+from bulk_import import BulkImportWriter, DEFAULT_BULK_IMPORT_DIR
+from pipeline import Pipeline, Stage, format_stage, DEFAULT_QUEUE_SIZE
+from sync_state import SyncState, sync_person, DEFAULT_STATE_PATH
+from journal import Journal, DEFAULT_JOURNAL_PATH, FETCHED, PARSED, WRITTEN, FAILED
 import scraper
+import http_client
+import http_fixtures
 import traceback
 from tqdm import tqdm
 from dotenv import load_dotenv
@@ -9,10 +21,376 @@ from logger_config import get_logger
 
 logger = get_logger(__name__)
 
-def main():
+# Number of MPs enriched and written concurrently, overridable with INGEST_WORKERS or --workers
+DEFAULT_WORKERS = 8
+
+def record(journal, mp, stage, **details):
+    """
+    Record a stage completed by an MP in the run's checkpoint journal, if there is one.
+    """
+    if journal is not None:
+        journal.record(mp.id, stage, **details)
+
+def enrich_mp(mp, constituency_region_dict, twfy_dict, govt_post_dict, journal=None):
+    """
+    Enrich a single MP with region, TWFY, election result, government post and voting data.
+    A failure to scrape the MP's votes is logged and leaves the MP without votes.
+
+    Args:
+        mp (MP): The MP object to enrich.
+        constituency_region_dict (dict): Mapping of constituency names to regions.
+        twfy_dict (dict): Mapping of constituency names to TWFY names and IDs.
+        govt_post_dict (dict): Mapping of MP IDs to government post names.
+        journal (Journal): The run's checkpoint journal.
+
+    Returns:
+        bool: True if the MP's votes were scraped, False if scraping them failed.
+    """
+    enrich_attributes(mp, constituency_region_dict, govt_post_dict)
+    mp.set_twfy_id_name(twfy_dict[mp.constituency])
+    if resume_votes(mp, journal):
+        return True
+    html = fetch_votes(mp, journal)
+
+    return html is not None and parse_votes(mp, html, journal)
+
+def resume_votes(mp, journal=None):
+    """
+    Set an MP's votes from the journal of a previous run that parsed them, so that a resumed run
+    does not fetch and parse the MP's voting record page again.
+
+    Args:
+        mp (MP): The MP object.
+        journal (Journal): The run's checkpoint journal.
+
+    Returns:
+        bool: True if the MP's votes were set from the journal.
+    """
+    parsed = journal.details(mp.id, PARSED) if journal is not None else None
+    if parsed is None or not isinstance(parsed.get('votes'), list):
+        return False
+    mp.set_votes([tuple(vote) for vote in parsed['votes']])
+    return True
+
+def fetch_votes(mp, journal=None):
+    """
+    Download an MP's TWFY voting record page, journalling the page's URL and size.
+
+    Args:
+        mp (MP): The MP object, with its TWFY ID set.
+        journal (Journal): The run's checkpoint journal.
+
+    Returns:
+        bytes: The page's HTML, or None if it could not be downloaded.
+    """
+    try:
+        html = scraper.fetch_mp_votes_page(mp.twfy_id)
+    except Exception:
+        traceback.print_exc()
+        record(journal, mp, FAILED, during=FETCHED)
+        return None
+
+    url = scraper.mp_votes_url(mp.twfy_id)
+    record(journal, mp, FETCHED, url=url, bytes=len(html))
+    return html
+
+def parse_votes(mp, html, journal=None):
+    """
+    Parse an MP's TWFY voting record page and set the MP's votes.
+
+    Args:
+        mp (MP): The MP object.
+        html (bytes): The page's HTML.
+        journal (Journal): The run's checkpoint journal.
+
+    Returns:
+        bool: True if the votes were parsed, False if parsing failed.
+    """
+    try:
+        mp.set_votes(scraper.parse_mp_votes(html))
+    except Exception:
+        traceback.print_exc()
+        record(journal, mp, FAILED, during=PARSED)
+        return False
+
+    # The votes are journalled so that a resumed run can write the MP without fetching the page again
+    record(journal, mp, PARSED, votes=[list(vote) for vote in mp.votes])
+    return True
+
+def enrich_attributes(mp, constituency_region_dict, govt_post_dict):
+    """
+    Set an MP's region, election result and government post.
+
+    Args:
+        mp (MP): The MP object to enrich.
+        constituency_region_dict (dict): Mapping of constituency names to regions.
+        govt_post_dict (dict): Mapping of MP IDs to government post names.
+    """
+    mp.set_region(constituency_region_dict[mp.constituency])
+    mp.set_election_result()
+
+    if mp.id in govt_post_dict:
+        mp.set_govt_post(govt_post_dict[mp.id])
+
+def write_mp(driver, mp, votes_scraped, state=None, catalogue=None, journal=None):
+    """
+    Create or update an enriched MP's node in the graph database, logging rather than raising any error.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+        mp (MP): The enriched MP object.
+        votes_scraped (bool): Whether the MP's votes were scraped.
+        state (SyncState): If given, only the changes since the MP was last written are written.
+        catalogue (PolicyCatalogue): The run's policy catalogue.
+        journal (Journal): The run's checkpoint journal. An MP written without its votes is not
+                           journalled as written, so a resumed run retries it.
+    """
+    try:
+        # Without its votes the MP can't be diffed, so fall back to a full write that removes nothing
+        if state is not None and votes_scraped:
+            sync_person(driver, state, mp, catalogue=catalogue)
+        else:
+            create_person(driver, mp, catalogue=catalogue)
+    except Exception:
+        traceback.print_exc()
+        record(journal, mp, FAILED, during=WRITTEN)
+        return
+
+    if votes_scraped:
+        record(journal, mp, WRITTEN)
+
+def process_mp(driver, mp, constituency_region_dict, twfy_dict, govt_post_dict, state=None, catalogue=None,
+               journal=None):
+    """
+    Enrich a single MP then create or update its node in the graph database.
+
+    A failure to scrape the MP's votes or to write the MP is logged and does not stop the
+    MP from being processed, so that one MP cannot affect any other MP in the run.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+        mp (MP): The MP object to enrich and write.
+        constituency_region_dict (dict): Mapping of constituency names to regions.
+        twfy_dict (dict): Mapping of constituency names to TWFY names and IDs.
+        govt_post_dict (dict): Mapping of MP IDs to government post names.
+        state (SyncState): If given, only the changes since the MP was last written are written,
+                           and unchanged MPs are skipped.
+        catalogue (PolicyCatalogue): The run's policy catalogue, shared between MPs so that each
+                                     Policy node is only written once.
+        journal (Journal): The run's checkpoint journal.
+
+    Returns:
+        The enriched MP object.
+    """
+    votes_scraped = enrich_mp(mp, constituency_region_dict, twfy_dict, govt_post_dict, journal=journal)
+    write_mp(driver, mp, votes_scraped, state=state, catalogue=catalogue, journal=journal)
+
+    return mp
+
+def enrich_only(mp, constituency_region_dict, twfy_dict, govt_post_dict, journal=None):
+    """
+    Enrich a single MP without writing it, for bulk writes.
+
+    Returns:
+        The enriched MP object.
+    """
+    enrich_mp(mp, constituency_region_dict, twfy_dict, govt_post_dict, journal=journal)
+    return mp
+
+def pool_mps(driver, mps, constituency_region_dict, twfy_dict, govt_post_dict, workers=DEFAULT_WORKERS,
+             bulk=False, batch_size=DEFAULT_BULK_BATCH_SIZE, state=None, catalogue=None, journal=None,
+             bulk_stats=None):
+    """
+    Process MPs on a bounded pool of worker threads, each enriching and writing whole MPs, so that
+    the Members API, TheyWorkForYou and Neo4j requests of different MPs overlap.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+        mps (iterable): The MP objects to process.
+        constituency_region_dict (dict): Mapping of constituency names to regions.
+        twfy_dict (dict): Mapping of constituency names to TWFY names and IDs.
+        govt_post_dict (dict): Mapping of MP IDs to government post names.
+        workers (int): Maximum number of MPs processed concurrently. 1 processes MPs sequentially.
+        bulk (bool): If True, workers only enrich MPs and enriched MPs are written in batches
+                     of `batch_size` MPs per transaction with `create_people_bulk`.
+        batch_size (int): Number of MPs per bulk write transaction.
+        state (SyncState): If given, only the changes since each MP was last written are written.
+        catalogue (PolicyCatalogue): The run's policy catalogue.
+        journal (Journal): The run's checkpoint journal.
+        bulk_stats (dict): If given, the counts and seconds of the bulk writes are added to it, see `write_bulk_batch`.
+    """
+    if bulk:
+        work = partial(enrich_only, journal=journal)
+    else:
+        work = partial(process_mp, driver, state=state, catalogue=catalogue, journal=journal)
+    batch = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        # MPs are submitted as their Members API page arrives, overlapping the crawl with enrichment
+        futures = [executor.submit(work, mp, constituency_region_dict, twfy_dict, govt_post_dict)
+                   for mp in mps]
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            # Errors outside of vote scraping / writing only affect the MP that raised them
+            try:
+                mp = future.result()
+            except Exception:
+                traceback.print_exc()
+                continue
+            if bulk:
+                batch.append(mp)
+                if len(batch) >= batch_size:
+                    write_bulk_batch(driver, batch, batch_size, catalogue, journal, bulk_stats)
+                    batch = []
+    if batch:
+        write_bulk_batch(driver, batch, batch_size, catalogue, journal, bulk_stats)
+
+def enrich_mps(mps, constituency_region_dict, twfy_dict, govt_post_dict, workers=DEFAULT_WORKERS, journal=None,
+               on_enriched=None):
+    """
+    Enrich MPs on a bounded pool of worker threads without writing them to the graph database.
+
+    Args:
+        mps (iterable): The MP objects to enrich.
+        constituency_region_dict (dict): Mapping of constituency names to regions.
+        twfy_dict (dict): Mapping of constituency names to TWFY names and IDs.
+        govt_post_dict (dict): Mapping of MP IDs to government post names.
+        workers (int): Maximum number of MPs enriched concurrently.
+        journal (Journal): The run's checkpoint journal.
+        on_enriched (callable): If given, called with each successfully enriched MP as it completes.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(enrich_only, mp, constituency_region_dict, twfy_dict, govt_post_dict,
+                                   journal=journal)
+                   for mp in mps]
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            try:
+                mp = future.result()
+            except Exception:
+                traceback.print_exc()
+                continue
+            if on_enriched is not None:
+                on_enriched(mp)
+
+def stream_mps(driver, mps, constituency_region_dict, twfy_dict, govt_post_dict, workers=DEFAULT_WORKERS,
+               bulk=False, batch_size=DEFAULT_BULK_BATCH_SIZE, state=None, catalogue=None,
+               queue_size=DEFAULT_QUEUE_SIZE, journal=None, bulk_stats=None):
+    """
+    Process MPs through a fetch -> parse -> enrich -> write pipeline whose stages are connected by
+    bounded queues, so that each stage runs at its own rate and a slow Neo4j holds back fetching
+    rather than letting enriched MPs build up in memory.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+        mps (iterable): The MP objects to process, read only as fast as the pipeline accepts them.
+        constituency_region_dict (dict): Mapping of constituency names to regions.
+        twfy_dict (dict): Mapping of constituency names to TWFY names and IDs.
+        govt_post_dict (dict): Mapping of MP IDs to government post names.
+        workers (int): Number of threads for each network bound stage.
+        bulk (bool): If True, MPs are written in batches of `batch_size` MPs per transaction.
+        batch_size (int): Number of MPs per bulk write transaction.
+        state (SyncState): If given, only the changes since each MP was last written are written.
+        catalogue (PolicyCatalogue): The run's policy catalogue.
+        queue_size (int): Maximum number of MPs waiting before each stage.
+        journal (Journal): The run's checkpoint journal.
+        bulk_stats (dict): If given, the counts and seconds of the bulk writes are added to it, see `write_bulk_batch`.
+
+    Returns:
+        dict: Statistics per stage, see `Pipeline.stats`.
+    """
+    def fetch(mp):
+        mp.set_twfy_id_name(twfy_dict[mp.constituency])
+        if resume_votes(mp, journal):
+            return mp, None, True
+        return mp, fetch_votes(mp, journal), False
+
+    def parse(item):
+        mp, html, resumed = item
+        return mp, resumed or (html is not None and parse_votes(mp, html, journal))
+
+    def enrich(item):
+        enrich_attributes(item[0], constituency_region_dict, govt_post_dict)
+        return item
+
+    batch = []
+
+    def write(item):
+        mp, votes_scraped = item
+        if not bulk:
+            write_mp(driver, mp, votes_scraped, state=state, catalogue=catalogue, journal=journal)
+            return None
+        batch.append(mp)
+        if len(batch) >= batch_size:
+            write_bulk_batch(driver, batch[:], batch_size, catalogue, journal, bulk_stats)
+            del batch[:]
+        return None
+
+    def flush():
+        if batch:
+            write_bulk_batch(driver, batch[:], batch_size, catalogue, journal, bulk_stats)
+
+    pipeline = Pipeline([
+        Stage('fetch', fetch, workers=workers, queue_size=queue_size),
+        # Parsing is CPU bound, so more threads would only contend for the GIL
+        Stage('parse', parse, workers=1, queue_size=queue_size),
+        Stage('enrich', enrich, workers=workers, queue_size=queue_size),
+        # Batches are built by a single writer, per-MP writes can share the work
+        Stage('write', write, workers=1 if bulk else workers, queue_size=queue_size, flush=flush),
+    ])
+    return pipeline.run(mps)
+
+def main(workers=DEFAULT_WORKERS, bulk=False, batch_size=DEFAULT_BULK_BATCH_SIZE,
+         incremental=False, state_path=DEFAULT_STATE_PATH, streaming=False, queue_size=DEFAULT_QUEUE_SIZE,
+         resume=False, journal_path=DEFAULT_JOURNAL_PATH, aggregate=True,
+         snapshot_dir=None, snapshot_format='parquet', snapshot_only=False, bulk_import_dir=None):
+    """
+    Fetch all current MPs, enrich them and write them to the graph database.
+
+    MPs are processed by a bounded pool of worker threads (`pool_mps`), or by a staged
+    pipeline (`stream_mps`) if `streaming` is set.
+
+    Args:
+        workers (int): Maximum number of MPs processed concurrently. 1 processes MPs sequentially.
+        bulk (bool): If True, workers only enrich MPs and enriched MPs are written in batches
+                     of `batch_size` MPs per transaction with `create_people_bulk`.
+        batch_size (int): Number of MPs per bulk write transaction.
+        incremental (bool): If True, skip MPs that are unchanged since the last run recorded in
+                            `state_path` and write only the changes for the others.
+        state_path (str): Path of the sync state file used by incremental runs.
+        streaming (bool): If True, MPs are processed by the staged pipeline in `stream_mps`.
+        queue_size (int): Maximum number of MPs waiting before each stage of the streaming pipeline.
+        resume (bool): If True, skip MPs that the checkpoint journal at `journal_path` records as written,
+                       retrying only MPs that failed or were not reached. MPs whose votes were parsed are
+                       written with the journalled votes rather than fetched again. Otherwise a new journal is started.
+                       Runs that do not write to the graph database keep no journal, so cannot be resumed.
+        journal_path (str): Path of the checkpoint journal.
+        aggregate (bool): If True, refresh the dashboard's precomputed vote counts once all MPs are written.
+        snapshot_dir (str): If given, also write a columnar snapshot of the enriched MPs under this directory.
+        snapshot_format (str): 'parquet' or 'arrow', see `snapshot.write_snapshot`.
+        snapshot_only (bool): If True, only write the snapshot, without connecting to the graph database.
+        bulk_import_dir (str): If given, write the enriched MPs to `neo4j-admin database import` CSV files
+                               under this directory instead of connecting to the graph database, for
+                               cold loads into a new database.
+
+    Returns:
+        dict: The run's statistics. `stages` is the streaming pipeline's statistics per stage, see
+              `Pipeline.stats`, and `bulk` the MPs, votes, policies and rows written in bulk, the
+              seconds spent writing them and the rows written per second. Each is None if unused.
+              `bulk_import_command` is the `neo4j-admin` command importing the bulk import files,
+              or None without `bulk_import_dir`.
+    """
     # load environment variables from .env file
     load_dotenv()
-    driver = Database.init_driver(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+    offline = snapshot_only or bulk_import_dir is not None
+    if offline and resume:
+        raise ValueError("Only runs that write to the graph database can be resumed")
+    if snapshot_only:
+        snapshot_dir = snapshot_dir or DEFAULT_SNAPSHOT_DIR
+    if snapshot_dir is not None:
+        # Fail now rather than once every MP has been fetched and enriched
+        require_pyarrow()
+    if offline:
+        driver = None
+    else:
+        driver = Database.init_driver(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
 
     constituency_region_dict = scraper.scrape_constituency_regions()
     if constituency_region_dict is None:
@@ -21,25 +399,224 @@ def main():
     twfy_dict = scraper.get_twfy_ids()
     govt_post_dict = scraper.get_govt_posts_from_members_api()
 
-    mp_dict = get_mps_from_members_api()
-    
-    for mp in tqdm(mp_dict.values()):       
-        mp.set_region(constituency_region_dict[mp.constituency])
-        mp.set_twfy_id_name(twfy_dict[mp.constituency])
-        mp.set_election_result()
-        
-        if mp.id in govt_post_dict:
-            mp.set_govt_post(govt_post_dict[mp.id])
-        try:
-            votes = scraper.scrape_mp_votes(mp.twfy_id)
-            mp.set_votes(votes)
-        except Exception:
-            traceback.print_exc()
-        finally:
-            try:
-                create_person(driver, mp)
-            except Exception:
-                traceback.print_exc()
+    logger.info(f"Processing MPs with {workers} workers")
+    state = SyncState.load(state_path) if incremental else None
+    # Policies are collected from every MP's votes and each is upserted once per run
+    catalogue = PolicyCatalogue()
+    # Offline runs write nothing a resumed run could skip, and must not empty the journal of a previous run
+    journal = Journal.open(journal_path, resume=resume) if not offline else None
+    mps = iter_mps_from_members_api()
+    if resume:
+        mps = (mp for mp in mps if not journal.completed(mp.id, WRITTEN))
+    if snapshot_dir is not None:
+        if resume:
+            logger.warning("The snapshot of a resumed run only includes the MPs processed by this run")
+        snapshot_mps = []
+        mps = collect(mps, snapshot_mps)
+    bulk_import = BulkImportWriter(bulk_import_dir) if bulk_import_dir is not None else None
+    stats = {'stages': None, 'bulk_import_command': None,
+             'bulk': {'mps': 0, 'votes': 0, 'policies': 0, 'rows': 0, 'seconds': 0.0} if bulk and not offline else None}
+    try:
+        if offline:
+            enrich_mps(mps, constituency_region_dict, twfy_dict, govt_post_dict, workers=workers, journal=journal,
+                       on_enriched=partial(import_mp, bulk_import) if bulk_import is not None else None)
+        elif streaming:
+            stats['stages'] = stream_mps(driver, mps, constituency_region_dict, twfy_dict, govt_post_dict,
+                                         workers=workers, bulk=bulk, batch_size=batch_size, state=state,
+                                         catalogue=catalogue, queue_size=queue_size, journal=journal,
+                                         bulk_stats=stats['bulk'])
+        else:
+            pool_mps(driver, mps, constituency_region_dict, twfy_dict, govt_post_dict,
+                     workers=workers, bulk=bulk, batch_size=batch_size, state=state, catalogue=catalogue,
+                     journal=journal, bulk_stats=stats['bulk'])
+    finally:
+        if journal is not None:
+            journal.close()
+        # Save the state even if the run failed so it agrees with the MPs the journal marks as written
+        if state is not None and not offline:
+            state.save()
+        if bulk_import is not None:
+            bulk_import.close()
+            stats['bulk_import_command'] = bulk_import.command()
+    if snapshot_dir is not None:
+        # MPs that failed to enrich have no region and are left out
+        write_snapshot([mp for mp in snapshot_mps if mp.region is not None], govt_post_dict,
+                       snapshot_dir=snapshot_dir, format=snapshot_format)
+    if stats['bulk'] is not None:
+        seconds = stats['bulk']['seconds']
+        stats['bulk']['rows_per_second'] = stats['bulk']['rows'] / seconds if seconds > 0 else 0.0
+    if offline:
+        return stats
+    logger.info(f"Wrote {len(catalogue)} policies")
+    if aggregate:
+        refresh_aggregates(driver)
+    return stats
+
+def import_mp(bulk_import, mp):
+    """
+    Write an enriched MP to the bulk import files. MPs that failed to enrich have no region and are left out.
+
+    Args:
+        bulk_import (BulkImportWriter): The run's bulk import writer.
+        mp (MP): The enriched MP object.
+    """
+    if mp.region is not None:
+        bulk_import.add(mp)
+
+def collect(items, collected):
+    """
+    Yield every item, also appending it to `collected`.
+
+    Args:
+        items (iterable): The items.
+        collected (list): The list items are appended to.
+    """
+    for item in items:
+        collected.append(item)
+        yield item
+
+def write_bulk_batch(driver, mps, batch_size, catalogue=None, journal=None, stats=None):
+    """
+    Write a batch of enriched MPs with `create_people_bulk`, logging rather than raising any error
+    so that a failed batch does not stop the run.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+        mps (list): The enriched MP objects to write.
+        batch_size (int): Number of MPs per bulk write transaction.
+        catalogue (PolicyCatalogue): The run's policy catalogue.
+        journal (Journal): The run's checkpoint journal. MPs written without their votes are not
+                           journalled as written, so a resumed run retries them.
+        stats (dict): If given, the MPs, votes, policies and rows written and the seconds spent
+                      writing them are added to its counts, see `create_people_bulk`.
+    """
+    try:
+        batch_stats = create_people_bulk(driver, mps, batch_size=batch_size, catalogue=catalogue)
+    except Exception:
+        logger.error(f"Bulk write failed for MPs: {[mp.name for mp in mps]}")
+        traceback.print_exc()
+        for mp in mps:
+            record(journal, mp, FAILED, during=WRITTEN)
+        return
+
+    if stats is not None:
+        for key in stats:
+            stats[key] += batch_stats[key]
+    for mp in mps:
+        if journal is not None and journal.completed(mp.id, PARSED):
+            journal.record(mp.id, WRITTEN)
+
+def parse_args(argv=None):
+    """
+    Parse command line arguments for an ingest run.
+
+    Args:
+        argv (list): Arguments to parse, defaults to `sys.argv[1:]`.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Load current MPs and their voting records into Neo4j")
+    parser.add_argument('--workers', type=int, default=int(os.getenv("INGEST_WORKERS", DEFAULT_WORKERS)),
+                        help="number of MPs processed concurrently (default: %(default)s)")
+    write_mode = parser.add_mutually_exclusive_group()
+    write_mode.add_argument('--bulk', action='store_true',
+                            help="write enriched MPs in batched UNWIND transactions")
+    write_mode.add_argument('--incremental', action='store_true',
+                            help="skip unchanged MPs and write only what changed since the last run")
+    parser.add_argument('--state-file', default=os.getenv("SYNC_STATE_PATH", DEFAULT_STATE_PATH),
+                        help="sync state file used by --incremental (default: %(default)s)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BULK_BATCH_SIZE,
+                        help="number of MPs per bulk write transaction (default: %(default)s)")
+    parser.add_argument('--streaming', action='store_true',
+                        help="fetch, parse, enrich and write MPs in a pipeline of stages connected by bounded queues")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="maximum MPs waiting before each streaming stage (default: %(default)s)")
+    parser.add_argument('--resume', action='store_true',
+                        help="skip MPs the checkpoint journal records as written and reuse the votes it records as "
+                             "parsed, retrying only failed or missing MPs")
+    parser.add_argument('--journal', default=os.getenv("INGEST_JOURNAL_PATH", DEFAULT_JOURNAL_PATH),
+                        help="checkpoint journal of each MP's completed stages (default: %(default)s)")
+    parser.add_argument('--no-aggregates', action='store_true',
+                        help="skip refreshing the dashboard's precomputed vote counts after the ingest")
+    parser.add_argument('--snapshot', nargs='?', const=DEFAULT_SNAPSHOT_DIR, metavar='DIR',
+                        help=f"also write a columnar snapshot of the run under DIR (default: {DEFAULT_SNAPSHOT_DIR})")
+    parser.add_argument('--snapshot-only', action='store_true',
+                        help="only write the snapshot, without connecting to Neo4j")
+    parser.add_argument('--snapshot-format', choices=SNAPSHOT_FORMATS, default='parquet',
+                        help="snapshot file format (default: %(default)s)")
+    parser.add_argument('--bulk-import', nargs='?', const=DEFAULT_BULK_IMPORT_DIR, metavar='DIR',
+                        help="write neo4j-admin import CSV files under DIR instead of connecting to Neo4j, "
+                             f"for cold loads into a new database (default: {DEFAULT_BULK_IMPORT_DIR})")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="disable the on-disk HTTP response cache")
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help="bypass cached responses, re-downloading and re-caching everything")
+    parser.add_argument('--rate-limit', action='append', default=[], metavar='HOST=RATE[:BURST]',
+                        help="requests per second (and burst size) allowed to a host, may be repeated")
+    parser.add_argument('--record', metavar='ARCHIVE',
+                        help="record every HTTP response to a compressed fixture archive")
+    parser.add_argument('--replay', metavar='ARCHIVE',
+                        help="serve every HTTP request from a recorded fixture archive instead of the network")
+    parser.add_argument('--replay-latency', type=float, default=0.0,
+                        help="seconds of latency added to each replayed request (default: %(default)s)")
+    parser.add_argument('--replay-jitter', type=float, default=0.0,
+                        help="maximum seconds of random jitter on the replay latency (default: %(default)s)")
+    parser.add_argument('--replay-error-rate', type=float, default=0.0,
+                        help="fraction of replayed requests answered with a 503 (default: %(default)s)")
+    parser.add_argument('--replay-seed', type=int, default=None,
+                        help="seed for replay latency and error injection")
+    args = parser.parse_args(argv)
+    if args.resume and (args.snapshot_only or args.bulk_import):
+        parser.error("--resume only applies to runs that write to Neo4j")
+    return args
+
+def configure_http(args):
+    """
+    Configure the shared HTTP layer from the parsed command line arguments and environment.
+    The cache directory and size limit are read from HTTP_CACHE_DIR and HTTP_CACHE_MAX_MB,
+    and hosts are rate limited with `http_client.HOST_RATE_LIMITS` unless overridden by --rate-limit.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+    """
+    max_mb = int(os.getenv("HTTP_CACHE_MAX_MB", http_client.DEFAULT_MAX_CACHE_BYTES // (1024 * 1024)))
+    http_client.configure(cache_dir=os.getenv("HTTP_CACHE_DIR", http_client.DEFAULT_CACHE_DIR),
+                          max_bytes=max_mb * 1024 * 1024,
+                          # Replayed responses must not mix with real ones in the cache
+                          enabled=not (args.no_cache or args.replay),
+                          bypass=args.refresh_cache)
+    rate_limits = {}
+    for rate_limit in args.rate_limit:
+        host, limit = rate_limit.split('=')
+        rate, _, burst = limit.partition(':')
+        rate_limits[host] = (float(rate), float(burst or rate))
+    http_client.configure_hosts(rate_limits=rate_limits, pool_size=max(http_client.DEFAULT_POOL_SIZE, args.workers))
+    if args.replay:
+        http_fixtures.start_replay(args.replay, latency=args.replay_latency, jitter=args.replay_jitter,
+                                   error_rate=args.replay_error_rate, seed=args.replay_seed)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    load_dotenv()
+    args = parse_args()
+    configure_http(args)
+    recorder = http_fixtures.start_recording(args.record) if args.record else None
+    try:
+        stats = main(workers=args.workers, bulk=args.bulk, batch_size=args.batch_size,
+                     incremental=args.incremental, state_path=args.state_file,
+                     streaming=args.streaming, queue_size=args.queue_size,
+                     resume=args.resume, journal_path=args.journal, aggregate=not args.no_aggregates,
+                     snapshot_dir=args.snapshot, snapshot_format=args.snapshot_format,
+                     snapshot_only=args.snapshot_only, bulk_import_dir=args.bulk_import)
+    finally:
+        http_client.log_stats()
+        if recorder is not None:
+            http_fixtures.stop_recording(recorder)
+    for name, stage in (stats['stages'] or {}).items():
+        print(format_stage(name, stage))
+    if stats['bulk'] is not None:
+        print(f"Bulk wrote {stats['bulk']['rows']} rows for {stats['bulk']['mps']} MPs in "
+              f"{stats['bulk']['seconds']:.2f}s, {stats['bulk']['rows_per_second']:.1f} rows/s")
+    if stats['bulk_import_command'] is not None:
+        # The constraints and indexes are created by `Database.apply_schema` on the first connection
+        print(f"Import the bulk import files into a stopped Neo4j with:\n{stats['bulk_import_command']}")
@@ -0,0 +1,764 @@
+"""
+Batch job extracting relations between MPs and the people, places and organisations in their
+Wikipedia biographies, and writing them to the graph as relationships from each MP's node.
+
+Usage:
+    python nlp.py [--workers N] [--batch-size N] [--annotator wikifier|local] [--entity-cache DIR]
+                  [--coreference-batch-size N] [--coreference-processes N] [--corpus DIR] [--offline]
+                  [--refresh] [--reprocess]
+"""
+import argparse
+import collections
+import itertools
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from string import punctuation
+from dotenv import load_dotenv
+from tqdm import tqdm
+from corpus import CorpusStore, fetch_article, DEFAULT_CORPUS_DIR
+from database import Database
+from entity_linking import EntityLinker, ANNOTATORS, DEFAULT_ENTITY_CACHE_DIR, sentence_entities
+from logger_config import get_logger
+
+# The NLP libraries are optional, they are only needed to enrich MPs from their biographies
+try:
+    import opennre
+except ImportError:
+    opennre = None
+try:
+    import spacy
+except ImportError:
+    spacy = None
+try:
+    import torch
+except ImportError:
+    torch = None
+
+logger = get_logger(__name__)
+
+RELATION_MODEL = 'tacred_bertentity_softmax'
+TOKENISER_MODEL = 'en_core_web_sm'
+COREFERENCE_MODEL = 'en_coreference_web_trf'
+# Minimum probability of an extracted relation
+RELATION_THRESHOLD = 0.75
+# Relations we're not interested in
+RELATIONS_STOP_LIST = ['NA', 'per:title']
+# Number of candidate (MP, entity) pairs per relation model forward pass
+DEFAULT_RELATION_BATCH_SIZE = 32
+# Number of biographies per coreference `nlp.pipe` batch, and processes it runs on
+DEFAULT_COREFERENCE_BATCH_SIZE = 8
+DEFAULT_COREFERENCE_PROCESSES = 1
+# Number of threads downloading biographies
+DEFAULT_FETCH_WORKERS = 8
+
+def require_nlp():
+    """
+    Raises:
+        ImportError: If any of the NLP libraries is not installed.
+    """
+    missing = [name for name, module in (('opennre', opennre), ('spacy', spacy)) if module is None]
+    if missing:
+        raise ImportError(f"Enriching MPs from their biographies needs {', '.join(missing)}, "
+                          f"install with `pip install {' '.join(missing)}`")
+
+def default_workers():
+    """
+    Get the number of worker processes to enrich MPs with: one per CPU this process may run on.
+
+    Returns:
+        int: The number of workers.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+class Models(object):
+    """
+    The NLP models used to extract an MP's relations, which take several seconds and hundreds of MB
+    to load, so are loaded once per worker process by `init_worker` and reused for every MP it enriches.
+    Coreference resolution runs before the workers, see `resolve_biographies`.
+
+    Attributes:
+        relation_model: opennre relation extraction model.
+        tokeniser: spaCy pipeline splitting text into sentences.
+    """
+    def __init__(self, relation_model, tokeniser):
+        self.relation_model = relation_model
+        self.tokeniser = tokeniser
+
+    @classmethod
+    def load(cls):
+        """
+        Load every model.
+
+        Returns:
+            Models: The loaded models.
+        """
+        require_nlp()
+        start = time.perf_counter()
+        relation_model = opennre.get_model(RELATION_MODEL)
+        tokeniser = spacy.load(TOKENISER_MODEL, disable=['parser', 'ner'])
+        tokeniser.add_pipe('sentencizer')
+        logger.info(f"Loaded NLP models in process {os.getpid()} in {time.perf_counter() - start:.2f}s")
+        return cls(relation_model, tokeniser)
+
+# The models of the current process, see `get_models`
+_models = None
+
+def get_models():
+    """
+    Get the current process's models, loading them on first use.
+
+    Returns:
+        Models: The loaded models.
+    """
+    global _models
+    if _models is None:
+        _models = Models.load()
+    return _models
+
+# The entity linker of the current process, see `get_linker`
+_linker = None
+
+def get_linker():
+    """
+    Get the current process's entity linker, creating a Wikifier linker on first use.
+
+    Returns:
+        EntityLinker: The entity linker.
+    """
+    global _linker
+    if _linker is None:
+        _linker = EntityLinker()
+    return _linker
+
+def init_worker(torch_threads=1, annotator='wikifier', entity_cache_dir=DEFAULT_ENTITY_CACHE_DIR):
+    """
+    Initialise a worker process: limit its intra-op threads, so that the workers together use
+    each CPU once rather than every worker starting a thread per CPU, then load its models.
+
+    Args:
+        torch_threads (int): Number of threads each worker's PyTorch operations may use.
+        annotator (str): Name of the entity linking annotator, see `entity_linking.ANNOTATORS`.
+        entity_cache_dir (str): Directory of the entity linking cache, or None to disable it.
+    """
+    global _linker
+    if torch is not None:
+        torch.set_num_threads(torch_threads)
+    _linker = EntityLinker(annotator=annotator, cache_dir=entity_cache_dir)
+    get_models()
+
+def resolve_references(doc):
+    """
+    Replace every mention of an entity in a coreference resolved document with its first mention,
+    in a single pass over the document's tokens.
+
+    Args:
+        doc (spacy.tokens.Doc): Document processed by the coreference pipeline.
+
+    Returns:
+        str: The document's text with resolved references.
+    """
+    # Text replacing each token of a mention, by token index
+    replacements = {}
+    clusters = [
+        val for key, val in doc.spans.items() if key.startswith("coref_cluster")
+    ]
+
+    for cluster in clusters:
+        first_mention = cluster[0]
+        # replace mentions of an entity with the text of the first mention
+        for mention_span in list(cluster)[1:]:
+            # the first token is replaced by the first mention + the whitespace of the current mention
+            replacements[mention_span[0].i] = first_mention.text + mention_span[0].whitespace_
+
+            # if there are any other words in the mention, then replace them with the empty string
+            for token in mention_span[1:]:
+                replacements[token.i] = ""
+
+    # Parts are joined once at the end, as repeatedly concatenating strings is quadratic in the text's length
+    parts = []
+    for token in doc:
+        if token.i in replacements:
+            parts.append(replacements[token.i])
+        else:
+            parts.append(token.text_with_ws)
+    return ''.join(parts)
+
+def timed(items, stats, key):
+    """
+    Yield every item, adding the seconds spent producing them to `stats[key]`.
+
+    Args:
+        items (iterable): The items.
+        stats (dict): The statistics.
+        key (str): The key of the seconds in `stats`.
+    """
+    items = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(items)
+        except StopIteration:
+            stats[key] += time.perf_counter() - start
+            return
+        stats[key] += time.perf_counter() - start
+        yield item
+
+def resolve_biographies(biographies, coreference, batch_size=DEFAULT_COREFERENCE_BATCH_SIZE,
+                        n_process=DEFAULT_COREFERENCE_PROCESSES, stats=None):
+    """
+    Resolve the references in a stream of biographies, running them through the coreference pipeline
+    `batch_size` at a time with `nlp.pipe` rather than one document at a time.
+
+    A biography that fails to resolve is logged and skipped. If the pipeline itself fails, the
+    biographies it had taken but not returned are resolved one at a time, so that only those that
+    fail again are skipped, and the pipeline is restarted on the rest of the stream.
+
+    Args:
+        biographies (iterable): (MP name, text) pairs.
+        coreference: spaCy coreference resolution pipeline.
+        batch_size (int): Number of biographies per batch.
+        n_process (int): Number of processes spaCy runs the pipeline on.
+        stats (dict): If given, the number of tokens resolved and the seconds spent resolving them,
+                      not counting the time taken by `biographies`, are added to its
+                      `coreference_tokens` and `coreference_seconds`, and the number of biographies
+                      that failed to resolve to its `failed`.
+
+    Yields:
+        tuple: Each MP's name and resolved biography, in the order of `biographies`.
+    """
+    stats = stats if stats is not None else {}
+    for key in ('coreference_tokens', 'coreference_seconds', 'fetch_seconds', 'failed'):
+        stats.setdefault(key, 0)
+    coreference_seconds, fetch_seconds = stats['coreference_seconds'], stats['fetch_seconds']
+    pipe_stats = {'seconds': 0.0, 'resolve_seconds': 0.0}
+    biographies = timed(biographies, stats, 'fetch_seconds')
+    # Biographies taken by the pipeline and not yet returned, as (index, MP name, text)
+    pending = collections.deque()
+    progress = {'taken': 0}
+
+    def update_seconds():
+        # Time the pipe spends waiting for `biographies` is counted as fetching them
+        stats['coreference_seconds'] = (coreference_seconds + pipe_stats['seconds'] + pipe_stats['resolve_seconds']
+                                        - (stats['fetch_seconds'] - fetch_seconds))
+
+    def queued():
+        for mp_name, text in biographies:
+            index = progress['taken']
+            progress['taken'] += 1
+            pending.append((index, mp_name, text))
+            yield text, index
+
+    def resolve(doc):
+        start = time.perf_counter()
+        try:
+            resolved = resolve_references(doc)
+        except Exception:
+            traceback.print_exc()
+            stats['failed'] += 1
+            return None
+        pipe_stats['resolve_seconds'] += time.perf_counter() - start
+        stats['coreference_tokens'] += len(doc)
+        update_seconds()
+        return resolved
+
+    while True:
+        taken = progress['taken']
+        docs = coreference.pipe(queued(), as_tuples=True, batch_size=batch_size, n_process=n_process)
+        try:
+            for doc, index in timed(docs, pipe_stats, 'seconds'):
+                while pending[0][0] != index:
+                    pending.popleft()
+                _, mp_name, _ = pending.popleft()
+                resolved = resolve(doc)
+                if resolved is not None:
+                    yield mp_name, resolved
+            break
+        except Exception:
+            # A pipeline that failed before taking any biography would only fail again
+            if progress['taken'] == taken:
+                raise
+            traceback.print_exc()
+
+        while pending:
+            _, mp_name, text = pending.popleft()
+            start = time.perf_counter()
+            try:
+                doc = coreference(text)
+            except Exception:
+                traceback.print_exc()
+                stats['failed'] += 1
+                continue
+            finally:
+                pipe_stats['seconds'] += time.perf_counter() - start
+            resolved = resolve(doc)
+            if resolved is not None:
+                yield mp_name, resolved
+    update_seconds()
+
+def candidate_pairs(sentence, entities, mp_name):
+    """
+    Get the (MP mention, entity mention) pairs in a sentence whose relation is to be extracted.
+
+    Args:
+        sentence (str): The sentence, without punctuation.
+        entities (list): The entities in the sentence, as returned by `strip_punctuation`.
+        mp_name (str): The MP's name.
+
+    Returns:
+        list: (entity, item) pairs, `item` being the relation model input for the pair.
+    """
+    # should only be 1 entity with mp_name as title, so return characters for that entry, return empty list if not found
+    mp_positions = next((entity['characters'] for entity in entities if entity['title'] == mp_name), [])
+    # check that character indexes match mp_name in sentence
+    valid_mp_pos = [t for t in mp_positions if sentence[t[0]:t[1]+1] == mp_name]
+
+    pairs = []
+    for entity in entities:
+        # don't want target to be the MP themselves, or their political party
+        if entity['title'] == mp_name or entity['label'] == 'Party':
+            continue
+        for mp_pos in valid_mp_pos:
+            for target in entity['characters']:
+                pairs.append((entity, {'text': sentence,
+                                       'h': {'pos': [mp_pos[0], mp_pos[1] + 1]},
+                                       't': {'pos': [target[0], target[1] + 1]}}))
+    return pairs
+
+def strip_punctuation(text, entities):
+    """
+    Remove the punctuation from a sentence, moving its entities' mention offsets to match.
+
+    Args:
+        text (str): The sentence.
+        entities (list): {title, label, characters} dicts with mention offsets in `text`.
+
+    Returns:
+        tuple: The sentence without punctuation, and the entities with offsets in it. Mentions
+               made up only of punctuation are dropped.
+    """
+    kept = [char not in punctuation for char in text]
+    # Offset in the stripped sentence of each character in the original one
+    positions = list(itertools.accumulate(kept, initial=0))
+    stripped = ''.join(char for char, keep in zip(text, kept) if keep)
+
+    result = []
+    for entity in entities:
+        characters = [(positions[ch_from], positions[ch_to + 1] - 1) for ch_from, ch_to in entity['characters']
+                      if positions[ch_to + 1] > positions[ch_from]]
+        if characters:
+            result.append(dict(entity, characters=characters))
+    return stripped, result
+
+def infer_relations(relation_model, items, batch_size=DEFAULT_RELATION_BATCH_SIZE):
+    """
+    Extract the most likely relation of each candidate pair, running the pairs through the model
+    `batch_size` at a time rather than with one forward pass per pair as `relation_model.infer` does.
+    The pairs may come from any number of documents.
+
+    Args:
+        relation_model: opennre relation extraction model.
+        items (list): Relation model inputs, as built by `candidate_pairs`.
+        batch_size (int): Number of pairs per forward pass.
+
+    Returns:
+        list: (relation, probability) of each item.
+    """
+    if not items:
+        return []
+    if torch is None:
+        raise ImportError("Relation extraction needs torch, install it with `pip install torch`")
+    relation_model.eval()
+    device = next(relation_model.parameters()).device
+    results = []
+    with torch.no_grad():
+        for start in range(0, len(items), batch_size):
+            # The encoder pads every pair to its max length, so the tokenised pairs stack into one batch
+            tokenised = [relation_model.sentence_encoder.tokenize(item) for item in items[start:start + batch_size]]
+            inputs = [torch.cat(field, dim=0).to(device) for field in zip(*tokenised)]
+            scores, predictions = relation_model.softmax(relation_model.forward(*inputs)).max(-1)
+            results.extend((relation_model.id2rel[prediction], score)
+                           for prediction, score in zip(predictions.tolist(), scores.tolist()))
+    return results
+
+def nlp_pipeline(text, mp_name, models=None, batch_size=DEFAULT_RELATION_BATCH_SIZE, stats=None, linker=None):
+    """
+    Extract the relations between an MP and the entities mentioned in their biography. The entities
+    of the whole biography are linked at once and mapped back to each sentence, then the candidate
+    pairs of every sentence are collected and run through the relation model in batches.
+
+    Args:
+        text (str): The biography, with references resolved by `resolve_references`.
+        mp_name (str): The MP's name.
+        models (Models): The models to use, defaults to the current process's models.
+        batch_size (int): Number of candidate pairs per relation model forward pass.
+        stats (dict): If given, the number of candidate pairs and the seconds spent extracting
+                      their relations are added to its `pairs` and `inference_seconds`, and the
+                      number of tokens in the biography to its `relation_tokens`.
+        linker (EntityLinker): The entity linker to use, defaults to the current process's linker.
+
+    Returns:
+        tuple: Dict of entity titles to node labels, and a list of unique {source, target, type} relations.
+    """
+    models = models or get_models()
+    linker = linker or get_linker()
+    document_entities = linker.link(text)
+
+    candidates = []
+    tokenised_txt = models.tokeniser(text)
+    for sentence in tokenised_txt.sents:
+        entities = sentence_entities(document_entities, sentence.start_char, sentence.text)
+        sentence, entities = strip_punctuation(sentence.text, entities)
+        candidates += candidate_pairs(sentence, entities, mp_name)
+
+    start = time.perf_counter()
+    predictions = infer_relations(models.relation_model, [item for _, item in candidates], batch_size)
+    if stats is not None:
+        stats['pairs'] = stats.get('pairs', 0) + len(candidates)
+        stats['inference_seconds'] = stats.get('inference_seconds', 0.0) + time.perf_counter() - start
+        stats['relation_tokens'] = stats.get('relation_tokens', 0) + len(tokenised_txt)
+
+    entities_dict = {}
+    relation_dict_list = []
+    for (entity, _), (relation, score) in zip(candidates, predictions):
+        if score > RELATION_THRESHOLD and relation not in RELATIONS_STOP_LIST:
+            relation_dict_list.append({'source': mp_name, 'target': entity['title'], 'type': relation})
+            entities_dict[entity['title']] = entity['label']
+    # deduplicate a list of dictionaries by converting them to frozensets as keys in a new dictionary, then extracting unique values
+    unique_relations = list({frozenset(d.items()): d for d in relation_dict_list}.values())
+
+    return entities_dict, unique_relations
+
+def fetch_biography(store, mp_name, offline=False, refresh=False):
+    """
+    Get an MP's Wikipedia article from the corpus store, fetching it into the store if needed.
+
+    Args:
+        store (CorpusStore): The corpus store.
+        mp_name (str): The MP's name.
+        offline (bool): If True, only articles already in the store are used.
+        refresh (bool): If True, check whether a stored article has a newer revision however recently it was checked.
+
+    Returns:
+        tuple: The article's text, starting with the MP's name, and its revision ID, or None if no
+               article was found.
+    """
+    article = fetch_article(store, mp_name, offline=offline, refresh=refresh)
+    if article is None:
+        return None
+    return f'{mp_name}. ' + article.text, article.revision_id
+
+def fetch_biographies(mp_names, store, workers=DEFAULT_FETCH_WORKERS, offline=False, refresh=False):
+    """
+    Get the MPs' biographies from the corpus store, fetching those not yet stored on a pool of threads.
+
+    Args:
+        mp_names (list): The MPs' names.
+        store (CorpusStore): The corpus store.
+        workers (int): Number of biographies fetched concurrently.
+        offline (bool): If True, only articles already in the store are used.
+        refresh (bool): If True, check whether stored articles have newer revisions however recently they were checked.
+
+    Yields:
+        tuple: Each MP's name, biography and article revision ID, in the order of `mp_names`. MPs
+               without an article or whose article failed to download are logged and skipped.
+    """
+    def fetch(mp_name):
+        try:
+            return fetch_biography(store, mp_name, offline=offline, refresh=refresh)
+        except Exception:
+            traceback.print_exc()
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for mp_name, biography in zip(mp_names, executor.map(fetch, mp_names)):
+            if biography is not None:
+                yield (mp_name,) + biography
+
+def load_coreference():
+    """
+    Load the coreference resolution pipeline.
+    """
+    require_nlp()
+    return spacy.load(COREFERENCE_MODEL)
+
+def process_biography(mp_name, text, batch_size=DEFAULT_RELATION_BATCH_SIZE):
+    """
+    Extract the relations from an MP's resolved biography with the current process's models.
+    Runs in a worker process, so only takes and returns picklable values.
+
+    Args:
+        mp_name (str): The MP's name.
+        text (str): The MP's biography, with references resolved by `resolve_references`.
+        batch_size (int): Number of candidate pairs per relation model forward pass.
+
+    Returns:
+        tuple: The MP's name, dict of entity titles to node labels, list of relations, and a dict of
+               the number of candidate pairs and seconds spent extracting their relations, chunks
+               linked from the entity cache and by the annotator, and the biography's tokens and
+               seconds spent on it.
+    """
+    start = time.perf_counter()
+    stats = {'pairs': 0, 'inference_seconds': 0.0, 'relation_tokens': 0}
+    models = get_models()
+    linker = get_linker()
+    hits, misses = linker.hits, linker.misses
+    entities, relations = nlp_pipeline(text, mp_name, models, batch_size=batch_size, stats=stats, linker=linker)
+    stats['cached_chunks'] = linker.hits - hits
+    stats['annotated_chunks'] = linker.misses - misses
+    stats['relation_seconds'] = time.perf_counter() - start
+    return mp_name, entities, relations, stats
+
+def relation_type(relation):
+    """
+    Get the relationship type of an extracted relation, e.g. 'per:employee_of' -> 'EMPLOYEE_OF'.
+    """
+    return relation.split(':')[1].upper()
+
+def create_new_rel_work(tx, source_name, target_label, target_name, relation_type):
+    """
+    Function to be executed within a write transaction to create a relationship from an MP to an entity.
+
+    Args:
+        tx: The transaction object.
+        source_name (str): The MP's name.
+        target_label (str): The entity's node label, one of the labels of `entity_linking`.
+        target_name (str): The entity's name.
+        relation_type (str): The relationship type.
+
+    Returns:
+        A Record object containing the MP and entity nodes.
+    """
+    return tx.run(f"MATCH (m:MP {{name: $source_name}}) \
+                  MERGE (t:{target_label} {{name: $target_name}}) \
+                  MERGE (m)-[:{relation_type}]->(t) \
+                  RETURN m, t",
+                  source_name=source_name, target_name=target_name).single()
+
+def create_new_rel(driver, source_name, target_label, target_name, relation_type):
+    """
+    Create a relationship from an MP to an entity, creating the entity's node if needed.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+        source_name (str): The MP's name.
+        target_label (str): The entity's node label.
+        target_name (str): The entity's name.
+        relation_type (str): The relationship type.
+    """
+    with driver.session() as session:
+        session.execute_write(create_new_rel_work,
+                              source_name=source_name, target_label=target_label,
+                              target_name=target_name, relation_type=relation_type)
+
+def set_biography_revision_work(tx, name, revision_id):
+    """
+    Function to be executed within a write transaction to record the biography revision an MP's
+    relations were extracted from.
+
+    Args:
+        tx: The transaction object.
+        name (str): The MP's name.
+        revision_id (int): The article revision ID.
+
+    Returns:
+        A Record object containing the MP node.
+    """
+    return tx.run("MATCH (m:MP {name: $name}) \
+                SET m.biography_revision = $revision_id \
+                RETURN m",
+                name=name, revision_id=revision_id).single()
+
+def write_relations(driver, mp_name, entities, relations, revision_id=None):
+    """
+    Write the relations extracted from an MP's biography.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+        mp_name (str): The MP's name.
+        entities (dict): Entity titles to node labels.
+        relations (list): {source, target, type} relations.
+        revision_id (int): If given, recorded on the MP once its relations are written, so that later
+                           runs skip the MP until its article changes.
+    """
+    for relation in relations:
+        target_name = relation['target']
+        create_new_rel(driver, mp_name, entities[target_name], target_name, relation_type(relation['type']))
+    if revision_id is not None:
+        with driver.session() as session:
+            session.execute_write(set_biography_revision_work, name=mp_name, revision_id=revision_id)
+
+def get_mp_revisions_work(tx):
+    """
+    Function to be executed within a read transaction to get every MP's name and the biography
+    revision its relations were last extracted from.
+
+    Returns:
+        dict: MP names to revision IDs, None for MPs not yet processed.
+    """
+    result = tx.run("MATCH (mp:MP) RETURN mp.name AS name, mp.biography_revision AS revision")
+    return {record["name"]: record["revision"] for record in result}
+
+def tokens_per_second(tokens, seconds):
+    return tokens / seconds if seconds > 0 else 0.0
+
+def enrich_mps(driver, mp_names, workers=None, batch_size=DEFAULT_RELATION_BATCH_SIZE, annotator='wikifier',
+               entity_cache_dir=DEFAULT_ENTITY_CACHE_DIR, coreference_batch_size=DEFAULT_COREFERENCE_BATCH_SIZE,
+               coreference_processes=DEFAULT_COREFERENCE_PROCESSES, fetch_workers=DEFAULT_FETCH_WORKERS,
+               corpus_dir=DEFAULT_CORPUS_DIR, offline=False, processed=None, refresh=False):
+    """
+    Extract the relations from every MP's biography and write them to the graph database.
+
+    Biographies are read from the corpus store, fetching any not yet stored or with a newer revision
+    on Wikipedia on a pool of threads, and MPs whose biography revision has already been processed are skipped. The others are
+    streamed through the coreference pipeline in batches (`resolve_biographies`). Each resolved biography's relations are then extracted on a
+    pool of worker processes, so that the CPU bound spaCy and BERT work of different MPs runs on
+    different cores rather than contending for the GIL, and written from this process as each MP completes.
+    Resolved biographies are submitted one coreference batch at a time, with fewer than `workers` earlier
+    biographies still in flight, so relations are written while later batches are still being resolved
+    rather than once every biography has been.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+        mp_names (list): The MPs' names.
+        workers (int): Number of relation extraction worker processes, defaults to `default_workers`.
+        batch_size (int): Number of candidate pairs per relation model forward pass.
+        annotator (str): Name of the entity linking annotator, 'local' for offline runs.
+        entity_cache_dir (str): Directory of the entity linking cache, or None to disable it.
+        coreference_batch_size (int): Number of biographies per coreference batch.
+        coreference_processes (int): Number of processes the coreference pipeline runs on.
+        fetch_workers (int): Number of biographies downloaded concurrently.
+        corpus_dir (str): Directory of the corpus store.
+        offline (bool): If True, only articles already in the corpus store are used.
+        processed (dict): MP names to the biography revision their relations were last extracted from.
+        refresh (bool): If True, check whether stored articles have newer revisions however recently they were checked.
+
+    Returns:
+        dict: Number of MPs enriched, unchanged, failed and relations written, the number of tokens and seconds
+              of the coreference and relation extraction stages, the number of candidate pairs and
+              seconds extracting their relations, the number of text chunks linked from the entity
+              cache and by the annotator, and the elapsed seconds. Seconds spent in the worker
+              processes are totalled over the workers.
+    """
+    workers = max(1, workers or default_workers())
+    # Split the CPUs between the workers' PyTorch threads
+    torch_threads = max(1, default_workers() // workers)
+    processed = processed or {}
+    stats = {'mps': 0, 'unchanged': 0, 'failed': 0, 'relations': 0, 'fetch_seconds': 0.0,
+             'coreference_tokens': 0, 'coreference_seconds': 0.0, 'relation_tokens': 0, 'relation_seconds': 0.0,
+             'pairs': 0, 'inference_seconds': 0.0, 'cached_chunks': 0, 'annotated_chunks': 0}
+    revisions = {}
+
+    def changed(biographies):
+        for mp_name, text, revision_id in biographies:
+            if processed.get(mp_name) == revision_id:
+                stats['unchanged'] += 1
+                continue
+            revisions[mp_name] = revision_id
+            yield mp_name, text
+
+    start = time.perf_counter()
+    coreference = load_coreference()
+    # Workers are spawned rather than forked, so they do not inherit the driver's connections and threads
+    with CorpusStore(corpus_dir) as store, ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=init_worker, initargs=(torch_threads, annotator, entity_cache_dir)) as executor:
+        biographies = resolve_biographies(changed(fetch_biographies(mp_names, store, fetch_workers, offline, refresh)),
+                                          coreference, batch_size=coreference_batch_size,
+                                          n_process=coreference_processes, stats=stats)
+        pending = set()
+        progress = tqdm()
+
+        def write_completed(done):
+            for future in done:
+                progress.update()
+                # An error only affects the MP that raised it
+                try:
+                    mp_name, entities, relations, mp_stats = future.result()
+                    write_relations(driver, mp_name, entities, relations, revisions[mp_name])
+                except Exception:
+                    traceback.print_exc()
+                    stats['failed'] += 1
+                    continue
+                stats['mps'] += 1
+                stats['relations'] += len(relations)
+                for key in ('relation_tokens', 'relation_seconds', 'pairs', 'inference_seconds',
+                            'cached_chunks', 'annotated_chunks'):
+                    stats[key] += mp_stats[key]
+
+        # Resolved biographies are taken one coreference batch at a time, so that the next batch is resolved while
+        # the workers extract the relations of the last, and at most `workers - 1` earlier biographies are still in flight
+        for resolved in iter(lambda: list(itertools.islice(biographies, coreference_batch_size)), []):
+            while len(pending) >= workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write_completed(done)
+            for mp_name, text in resolved:
+                try:
+                    pending.add(executor.submit(process_biography, mp_name, text, batch_size))
+                except Exception:
+                    traceback.print_exc()
+                    stats['failed'] += 1
+        write_completed(as_completed(pending))
+        progress.close()
+    stats['seconds'] = time.perf_counter() - start
+    logger.info(f"Wrote {stats['relations']} relations for {stats['mps']} MPs with {workers} workers "
+                f"in {stats['seconds']:.2f}s, {stats['unchanged']} unchanged, {stats['failed']} failed")
+    logger.info(f"Coreference resolved {stats['coreference_tokens']} tokens at "
+                f"{tokens_per_second(stats['coreference_tokens'], stats['coreference_seconds']):.1f} tokens/s, "
+                f"relations extracted from {stats['relation_tokens']} tokens at "
+                f"{tokens_per_second(stats['relation_tokens'], stats['relation_seconds']):.1f} tokens/s per worker")
+    logger.info(f"Linked entities of {stats['cached_chunks']} text chunks from the cache and "
+                f"{stats['annotated_chunks']} with the {annotator} annotator")
+    if stats['inference_seconds'] > 0:
+        logger.info(f"Extracted relations of {stats['pairs']} candidate pairs in batches of {batch_size} at "
+                    f"{stats['pairs'] / stats['inference_seconds']:.1f} pairs/s per worker")
+    return stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=int(os.getenv("NLP_WORKERS", default_workers())),
+                        help="number of worker processes, each loading its own models (default: %(default)s)")
+    parser.add_argument('--annotator', choices=list(ANNOTATORS), default='wikifier',
+                        help="entity linking annotator, 'local' runs offline with spaCy (default: %(default)s)")
+    parser.add_argument('--entity-cache', default=os.getenv("ENTITY_CACHE_DIR", DEFAULT_ENTITY_CACHE_DIR),
+                        help="directory of the entity linking cache (default: %(default)s)")
+    parser.add_argument('--no-entity-cache', action='store_true', help="disable the entity linking cache")
+    parser.add_argument('--corpus', default=os.getenv("WIKIPEDIA_CORPUS_DIR", DEFAULT_CORPUS_DIR),
+                        help="directory of the Wikipedia corpus store (default: %(default)s)")
+    parser.add_argument('--offline', action='store_true',
+                        help="only use articles already in the corpus store, without searching Wikipedia")
+    parser.add_argument('--refresh', action='store_true',
+                        help="check every stored article for a newer revision, however recently it was checked")
+    parser.add_argument('--reprocess', action='store_true',
+                        help="reprocess every MP, including those whose biography is unchanged since the last run")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_RELATION_BATCH_SIZE,
+                        help="candidate pairs per relation model forward pass (default: %(default)s)")
+    parser.add_argument('--coreference-batch-size', type=int, default=DEFAULT_COREFERENCE_BATCH_SIZE,
+                        help="biographies per coreference batch (default: %(default)s)")
+    parser.add_argument('--coreference-processes', type=int, default=DEFAULT_COREFERENCE_PROCESSES,
+                        help="processes the coreference pipeline runs on (default: %(default)s)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    driver = Database.init_driver(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+    try:
+        with driver.session() as session:
+            processed = session.execute_read(get_mp_revisions_work)
+        stats = enrich_mps(driver, list(processed), workers=args.workers, batch_size=args.batch_size,
+                           annotator=args.annotator,
+                           entity_cache_dir=None if args.no_entity_cache else args.entity_cache,
+                           coreference_batch_size=args.coreference_batch_size,
+                           coreference_processes=args.coreference_processes,
+                           corpus_dir=args.corpus, offline=args.offline, refresh=args.refresh,
+                           processed=None if args.reprocess else processed)
+    finally:
+        Database.close_driver()
+    print(f"{stats['relations']} relations for {stats['mps']} MPs in {stats['seconds']:.2f}s, "
+          f"{stats['unchanged']} unchanged")
+    for stage in ('coreference', 'relation'):
+        print(f"{stage:<12}{tokens_per_second(stats[stage + '_tokens'], stats[stage + '_seconds']):>10.1f} tokens/s")
+    if stats['inference_seconds'] > 0:
+        print(f"{stats['pairs'] / stats['inference_seconds']:.1f} candidate pairs/s per worker")
@@ -1,12 +1,69 @@
+import http_client
 import requests
-import time
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from logger_config import get_logger
+from scraper import VOTE_DIRECTIONS
 
 logger = get_logger(__name__)
 
-class MP:
+# Direction codes stored for each vote, indexes into `VOTE_DIRECTIONS`
+VOTE_DIRECTION_CODES = {direction: code for code, direction in enumerate(VOTE_DIRECTIONS)}
+
+class PolicyTable(object):
+    """
+    Intern table mapping policy descriptions to small integer IDs, so each description is
+    stored once however many MPs voted on it. IDs are only meaningful within one process.
+    """
+    def __init__(self):
+        self._ids = {}
+        self._descriptions = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._descriptions)
+
+    def intern(self, description):
+        """
+        Get the ID of a policy description, adding it to the table if it is new.
+
+        Args:
+            description (str): The policy description.
+
+        Returns:
+            int: The policy's ID.
+        """
+        policy_id = self._ids.get(description)
+        if policy_id is None:
+            with self._lock:
+                policy_id = self._ids.get(description)
+                if policy_id is None:
+                    policy_id = len(self._descriptions)
+                    self._descriptions.append(description)
+                    self._ids[description] = policy_id
+        return policy_id
+
+    def description(self, policy_id):
+        """
+        Get the policy description for an ID.
+
+        Args:
+            policy_id (int): The policy's ID.
+
+        Returns:
+            str: The policy description.
+        """
+        return self._descriptions[policy_id]
+
+# Policy table shared by every MP
+POLICY_TABLE = PolicyTable()
+
+class MP(object):
     """
     Class representing a Member of Parliament (MP) with attributes and voting records.
+    Votes are stored as columns: policy IDs from `MP.policy_table`, direction codes and float32
+    strengths, and are returned from `votes` as (policy, direction, strength) tuples.
 
     Attributes:
         id (int): Unique identifier of the MP.
@@ -23,6 +80,12 @@ class MP:
         majority (int): Majority held by the MP in their constituency.
         govt_post (str): Government post held by the MP, if any.
     """
+    __slots__ = ('id', 'name', 'twfy_id', 'party', 'constituency', 'region', 'gender', 'start_date',
+                 'electorate', 'turnout', 'majority', 'govt_post',
+                 'vote_policy_ids', 'vote_directions', 'vote_strengths')
+
+    policy_table = POLICY_TABLE
+
     def __init__(self, id, name, party, constituency, gender, start_date):
         self.id = id
         self.name = name
@@ -30,7 +93,9 @@ class MP:
         self.party = party
         self.constituency = constituency.lower()
         self.region = None
-        self.votes = []
+        self.vote_policy_ids = array('I')
+        self.vote_directions = array('b')
+        self.vote_strengths = array('f')
         self.gender = gender
         self.start_date = start_date
         self.electorate = None
@@ -43,12 +108,40 @@ class MP:
                 gender={self.gender}\nstart_date={self.start_date}\nname={self.name}\n\
                 electorate={self.electorate}\nturnout={self.turnout}\nmajority={self.majority}\nvotes={self.votes}"
 
+    def __getstate__(self):
+        # Policy IDs are local to this process, so pickle votes as tuples
+        state = {slot: getattr(self, slot) for slot in self.__slots__ if not slot.startswith('vote_')}
+        state['votes'] = self.votes
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        votes = state.pop('votes')
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self.set_votes(votes)
+
+    @property
+    def votes(self):
+        """
+        list: The MP's votes as (policy, direction, strength) tuples.
+        """
+        description = self.policy_table.description
+        # float32 strengths are rounded back to the 5 decimal places they were scraped with
+        return [(description(policy_id), VOTE_DIRECTIONS[direction], round(strength, 5))
+                for policy_id, direction, strength
+                in zip(self.vote_policy_ids, self.vote_directions, self.vote_strengths)]
+
+    @votes.setter
+    def votes(self, votes):
+        self.set_votes(votes)
+
     def set_election_result(self):
         """
         Fetches election results from the Members API and sets the relevant MP attributes.
         """
         url = f'https://members-api.parliament.uk/api/Members/{self.id}/LatestElectionResult'
-        response = requests.get(url)
+        response = http_client.get(url)
 
         if response.status_code != 200:
             raise Exception(f'API request failed with response code {response.status_code}')
@@ -106,62 +199,122 @@ class MP:
         Sets the voting records for the MP.
 
         Args:
-            votes (list): A list of voting records for the MP.
+            votes (list): A list of (policy, direction, strength) voting records for the MP.
         """
-        if isinstance(votes, list):
-            self.votes = votes
-        else:
+        if not isinstance(votes, list):
+            err_msg = f"Votes data is invalid for MP id: {self.id}."
+            logger.critical(err_msg)
+            raise ValueError(err_msg)
+
+        policy_ids = array('I')
+        directions = array('b')
+        strengths = array('f')
+        try:
+            for policy, direction, strength in votes:
+                policy_ids.append(self.policy_table.intern(policy))
+                directions.append(VOTE_DIRECTION_CODES[direction])
+                strengths.append(strength)
+        except (TypeError, ValueError, KeyError):
             err_msg = f"Votes data is invalid for MP id: {self.id}."
             logger.critical(err_msg)
             raise ValueError(err_msg)
+
+        self.vote_policy_ids = policy_ids
+        self.vote_directions = directions
+        self.vote_strengths = strengths
         
-def get_mps_from_members_api():
+MEMBERS_SEARCH_URL = 'https://members-api.parliament.uk/api/Members/Search'
+# Largest page size the Members Search API accepts for `take`
+MEMBERS_API_MAX_TAKE = 20
+# Number of Members Search pages fetched concurrently
+DEFAULT_PAGE_WORKERS = 8
+
+def get_members_page(skip, take=MEMBERS_API_MAX_TAKE):
     """
-    Retrieves a list of current MPs and their information from the Members API.
+    Fetch a single page of current MPs from the Members Search API. Rate limited and failed
+    requests, dropped connections and timeouts are retried with backoff by `http_client`, so a
+    page that still fails is not retried.
+
+    Args:
+        skip (int): Number of results to skip.
+        take (int): Number of results in the page.
 
     Returns:
-        mp_dict (dict): A dictionary of MP objects with constituency names as keys.
+        dict: The decoded page, with `items` and `totalResults`.
+
+    Raises:
+        requests.HTTPError: If the page could not be fetched.
+    """
+    params = {'take': take, 'skip': skip, 'IsCurrentMember': True, 'House': 1}
+
+    response = http_client.get(MEMBERS_SEARCH_URL, params=params)
+    if response.status_code == 200:
+        return response.json()
+
+    logger.critical(f"Get Members API request failed with code: {response.status_code} for params {params}. Exiting.")
+    raise requests.HTTPError(f"Members API request failed with code: {response.status_code} for page {params}",
+                             response=response)
+
+def mp_from_member(member):
+    """
+    Create an MP object from a Members Search API item.
+
+    Args:
+        member (dict): An item from the Members Search API response.
+
+    Returns:
+        MP: The MP object.
+    """
+    party = member['value']['latestParty']['name']
+    # Change party of Labour (Co-op) MPs to Labour
+    if party == 'Labour (Co-op)':
+        party = 'Labour'
+
+    return MP(id=member['value']['id'], name=member['value']['nameDisplayAs'], party=party,
+              constituency=member['value']['latestHouseMembership']['membershipFrom'],
+              gender=member['value']['gender'],
+              start_date=member['value']['latestHouseMembership']['membershipStartDate'].split("T")[0])
+
+def iter_mps_from_members_api(take=MEMBERS_API_MAX_TAKE, workers=DEFAULT_PAGE_WORKERS):
+    """
+    Stream current MPs from the Members API. The first page gives the total number of MPs,
+    the remaining pages are then fetched concurrently and their MPs yielded as each page arrives.
+
+    Args:
+        take (int): Page size, capped at `MEMBERS_API_MAX_TAKE`.
+        workers (int): Maximum number of pages fetched concurrently.
+
+    Yields:
+        MP: MP objects, in page arrival order.
     """
     logger.info("Getting list of MPs from members API")
-    url = 'https://members-api.parliament.uk/api/Members/Search'
-    params = {'take': 20, 'skip': 0, 'IsCurrentMember': True, 'House': 1}
+    take = min(take, MEMBERS_API_MAX_TAKE)
 
-    mp_dict = {}
-    max_retries = 30
-    retry_count = 0
+    first_page = get_members_page(0, take)
+    for member in first_page['items']:
+        yield mp_from_member(member)
 
-    # Keep making API requests until all MPs are retrieved or the maximum number of retries is reached
-    while True:
-        response = requests.get(url, params=params)
-        
-        if response.status_code != 200:
-            logger.debug(f'Get Members API request failed with code: {response.status_code}, {response.json()}')
-            retry_count += 1
-            if retry_count >= max_retries:
-                logger.critical("Max retries reached. Exiting.")
-                raise(RecursionError)
-            time.sleep(5)
-            continue
+    skips = range(take, first_page['totalResults'], take)
+    logger.debug(f"Fetching {len(skips)} more Members API pages with {workers} workers")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(get_members_page, skip, take) for skip in skips]
+        for future in as_completed(futures):
+            for member in future.result()['items']:
+                yield mp_from_member(member)
 
-        data = response.json()
-        # Iterate through the API response and create MP objects for each member
-        for mp in data['items']:
-            party = mp['value']['latestParty']['name']
-            # Change party of Labour (Co-op) MPs to Labour
-            if party == 'Labour (Co-op)':
-                party = 'Labour'
-            
-            mp_obj = MP(id=mp['value']['id'], name= mp['value']['nameDisplayAs'], party=party, 
-                        constituency=mp['value']['latestHouseMembership']['membershipFrom'],
-                        gender=mp['value']['gender'],
-                        start_date=mp['value']['latestHouseMembership']['membershipStartDate'].split("T")[0])
-            mp_dict[mp_obj.constituency] = mp_obj
-        
-        # If all MPs have been retrieved, exit the loop
-        if len(mp_dict) == data['totalResults']:
-            break
-        # Update the API request parameters to fetch the next batch of MPs
-        params['skip'] += params['take']
-        logger.debug(f"Members API Search params: {params}")
+def get_mps_from_members_api(take=MEMBERS_API_MAX_TAKE, workers=DEFAULT_PAGE_WORKERS):
+    """
+    Retrieves a list of current MPs and their information from the Members API.
+
+    Args:
+        take (int): Page size, capped at `MEMBERS_API_MAX_TAKE`.
+        workers (int): Maximum number of pages fetched concurrently.
+
+    Returns:
+        mp_dict (dict): A dictionary of MP objects with constituency names as keys.
+    """
+    mp_dict = {}
+    for mp_obj in iter_mps_from_members_api(take=take, workers=workers):
+        mp_dict[mp_obj.constituency] = mp_obj
 
     return mp_dict
@@ -0,0 +1,216 @@
+import queue
+import threading
+import time
+import traceback
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Default number of items waiting between two stages before the upstream stage blocks
+DEFAULT_QUEUE_SIZE = 32
+# Default seconds between progress reports
+DEFAULT_REPORT_INTERVAL = 10
+
+# Put on a stage's input queue once no more items will arrive
+_DONE = object()
+
+class Stage(object):
+    """
+    A pipeline stage run by a pool of worker threads. Each worker takes items from the stage's
+    bounded input queue, passes them to `func` and puts the result on the next stage's queue,
+    blocking while that queue is full so that a slow stage holds back the stages before it.
+    An item for which `func` returns None or raises is dropped, without affecting other items.
+
+    Attributes:
+        name (str): Name of the stage in progress reports.
+        func (callable): Function applied to each item.
+        workers (int): Number of worker threads.
+        flush (callable): Optional function called once all items have been processed,
+                          for stages that buffer items.
+        input (queue.Queue): The stage's bounded input queue.
+        output (queue.Queue): The next stage's input queue, or None for the last stage.
+        processed (int): Number of items processed.
+        failed (int): Number of items that raised an exception.
+        busy_seconds (float): Seconds spent in `func` across all workers.
+        max_depth (int): Largest input queue depth seen.
+    """
+    def __init__(self, name, func, workers=1, queue_size=DEFAULT_QUEUE_SIZE, flush=None):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.flush = flush
+        self.input = queue.Queue(maxsize=queue_size)
+        self.output = None
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._running = self.workers
+        self._lock = threading.Lock()
+
+    def depth(self):
+        """
+        Get the number of items waiting on the stage's input queue.
+
+        Returns:
+            int: The queue depth.
+        """
+        depth = self.input.qsize()
+        with self._lock:
+            self.max_depth = max(self.max_depth, depth)
+        return depth
+
+    def start(self):
+        """
+        Start the stage's worker threads.
+
+        Returns:
+            list: The started threads.
+        """
+        threads = [threading.Thread(target=self._work, name=f'{self.name}-{i}', daemon=True)
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _work(self):
+        while True:
+            self.depth()
+            item = self.input.get()
+            if item is _DONE:
+                # Pass the end marker on to the stage's other workers
+                self.input.put(_DONE)
+                break
+
+            start = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception:
+                logger.error(f"Stage {self.name} failed on {item}")
+                traceback.print_exc()
+                result = None
+                with self._lock:
+                    self.failed += 1
+            with self._lock:
+                self.processed += 1
+                self.busy_seconds += time.perf_counter() - start
+
+            if result is not None and self.output is not None:
+                self.output.put(result)
+
+        with self._lock:
+            self._running -= 1
+            last_worker = self._running == 0
+        if last_worker:
+            if self.flush is not None:
+                try:
+                    self.flush()
+                except Exception:
+                    logger.error(f"Stage {self.name} failed to flush")
+                    traceback.print_exc()
+            if self.output is not None:
+                self.output.put(_DONE)
+
+class Pipeline(object):
+    """
+    Chain of stages connected by bounded queues, each running at its own rate.
+
+    Attributes:
+        stages (list): The stages, in the order items pass through them.
+        report_interval (float): Seconds between progress reports.
+    """
+    def __init__(self, stages, report_interval=DEFAULT_REPORT_INTERVAL):
+        self.stages = stages
+        self.report_interval = report_interval
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.output = next_stage.input
+
+    def run(self, source):
+        """
+        Feed every item from `source` through the pipeline and wait for all stages to finish.
+        The source is only read as fast as the first stage accepts items.
+
+        Args:
+            source (iterable): The items to process.
+
+        Returns:
+            dict: Statistics per stage name, see `stats`.
+        """
+        start = time.perf_counter()
+        threads = [thread for stage in self.stages for thread in stage.start()]
+        feeder = threading.Thread(target=self._feed, args=(source,), name='pipeline-source', daemon=True)
+        feeder.start()
+
+        finished = threading.Event()
+        reporter = threading.Thread(target=self._report_until, args=(finished, start),
+                                    name='pipeline-report', daemon=True)
+        reporter.start()
+
+        feeder.join()
+        for thread in threads:
+            thread.join()
+        finished.set()
+        reporter.join()
+
+        self.report(start)
+        return self.stats(start)
+
+    def _feed(self, source):
+        first = self.stages[0]
+        try:
+            for item in source:
+                first.input.put(item)
+        except Exception:
+            logger.error("Pipeline source failed, finishing the items already read")
+            traceback.print_exc()
+        finally:
+            first.input.put(_DONE)
+
+    def _report_until(self, finished, start):
+        while not finished.wait(self.report_interval):
+            self.report(start)
+
+    def stats(self, start):
+        """
+        Get the progress of each stage.
+
+        Args:
+            start (float): `time.perf_counter()` when the pipeline started.
+
+        Returns:
+            dict: For each stage name, the items processed and failed, items processed per second
+                  since `start`, seconds spent processing, and current and largest queue depths.
+        """
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        stats = {}
+        for stage in self.stages:
+            depth = stage.depth()
+            stats[stage.name] = {'processed': stage.processed, 'failed': stage.failed,
+                                 'items_per_second': stage.processed / elapsed,
+                                 'busy_seconds': stage.busy_seconds,
+                                 'queue_depth': depth, 'max_queue_depth': stage.max_depth}
+        return stats
+
+    def report(self, start):
+        """
+        Log the queue depth and throughput of each stage.
+
+        Args:
+            start (float): `time.perf_counter()` when the pipeline started.
+        """
+        for name, stage in self.stats(start).items():
+            logger.info(format_stage(name, stage))
+
+def format_stage(name, stage):
+    """
+    Format a stage's statistics as a progress line.
+
+    Args:
+        name (str): The stage's name.
+        stage (dict): The stage's statistics, see `Pipeline.stats`.
+
+    Returns:
+        str: The stage's queue depth and throughput.
+    """
+    return (f"{name}: queue {stage['queue_depth']} (max {stage['max_queue_depth']}), "
+            f"{stage['processed']} processed, {stage['failed']} failed, {stage['items_per_second']:.1f}/s")
@@ -0,0 +1,98 @@
+import hashlib
+import re
+import threading
+from functools import lru_cache
+
+_WHITESPACE = re.compile(r'\s+')
+# Punctuation that TWFY wording tweaks add or remove at the end of a policy description
+_TRAILING_PUNCTUATION = '.;: '
+
+def normalise_policy(description):
+    """
+    Normalise a policy description so that changes in case, spacing or trailing punctuation
+    do not change the policy's ID.
+
+    Args:
+        description (str): The policy description, as scraped from TheyWorkForYou.
+
+    Returns:
+        str: The normalised description.
+    """
+    return _WHITESPACE.sub(' ', description).strip().rstrip(_TRAILING_PUNCTUATION).casefold()
+
+@lru_cache(maxsize=4096)
+def policy_id(description):
+    """
+    Get the stable ID of a policy, a hash of its normalised description that is the same
+    in every run and on every machine.
+
+    Args:
+        description (str): The policy description.
+
+    Returns:
+        int: A signed 64-bit ID, so it fits in a Neo4j integer property.
+    """
+    digest = hashlib.sha256(normalise_policy(description).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+class PolicyCatalogue(object):
+    """
+    Catalogue of the policies seen in a run, so that each Policy node is upserted once
+    and vote writes can reference policies by ID alone.
+
+    Attributes:
+        names (dict): Description of each policy, keyed by policy ID. The first description
+                      seen for an ID is the one written.
+    """
+    def __init__(self):
+        self.names = {}
+        self._written = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, description):
+        """
+        Add a policy to the catalogue.
+
+        Args:
+            description (str): The policy description.
+
+        Returns:
+            int: The policy's ID.
+        """
+        id = policy_id(description)
+        with self._lock:
+            self.names.setdefault(id, description)
+        return id
+
+    def add_votes(self, votes):
+        """
+        Add the policies of (policy, direction, strength) votes to the catalogue.
+
+        Args:
+            votes (iterable): The votes.
+        """
+        for vote in votes:
+            self.add(vote[0])
+
+    def pending(self):
+        """
+        Get the policies that have not been written to the graph database yet.
+
+        Returns:
+            list: {id, name} dicts, one per policy.
+        """
+        with self._lock:
+            return [{'id': id, 'name': name} for id, name in self.names.items() if id not in self._written]
+
+    def mark_written(self, policies):
+        """
+        Record that policies have been written, so they are not returned by `pending` again.
+
+        Args:
+            policies (list): {id, name} dicts returned by `pending`.
+        """
+        with self._lock:
+            self._written.update(policy['id'] for policy in policies)
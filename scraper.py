@@ -1,11 +1,53 @@
-from bs4 import BeautifulSoup
-import requests
+from bs4 import BeautifulSoup, SoupStrainer
+import http_client
 import re
+import numpy as np
 from logger_config import get_logger
 import os
 
 logger = get_logger(__name__)
 
+# Use lxml's C parser when it is installed, the HTML_PARSER environment variable overrides the choice
+try:
+    import lxml  # noqa: F401
+    DEFAULT_HTML_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_HTML_PARSER = 'html.parser'
+HTML_PARSER = os.getenv('HTML_PARSER', DEFAULT_HTML_PARSER)
+
+# Country tables on the Wikipedia constituencies page
+CONSTITUENCY_TABLE_IDS = ['England', 'Scotland', 'Wales', 'NI']
+
+# Only build the parts of each page the scrapers read
+VOTES_STRAINER = SoupStrainer("div", class_="primary-content__unit")
+CONSTITUENCY_STRAINER = SoupStrainer("table", id=CONSTITUENCY_TABLE_IDS)
+
+def make_soup(html, parser=None, parse_only=None):
+    """
+    Parse HTML into a BeautifulSoup tree.
+
+    Args:
+        html (bytes or str): The HTML page content.
+        parser (str): The BeautifulSoup parser backend, defaults to `HTML_PARSER`.
+        parse_only (SoupStrainer): If given, only elements matching the strainer (and their children) are built.
+
+    Returns:
+        bs4.BeautifulSoup: The parsed tree.
+    """
+    return BeautifulSoup(html, parser or HTML_PARSER, parse_only=parse_only)
+
+# Patterns to extract vote counts for and against from a vote description's evidence
+VOTES_FOR_PATTERN = re.compile(r"(\d+) votes? for")
+VOTES_AGAINST_PATTERN = re.compile(r"(\d+) votes? against")
+
+# Vote direction names, indexed by the direction codes returned by `calculate_vote_directions_and_strengths`
+VOTE_DIRECTIONS = ('vote_split', 'voted_for', 'voted_against')
+VOTE_SPLIT = 0
+VOTED_FOR = 1
+VOTED_AGAINST = 2
+# Direction code for evidence strings that don't contain both vote counts
+VOTE_UNPARSED = -1
+
 def calculate_vote_direction_and_strength(text):
     """
     Calculate the vote direction and strength from a given text string.
@@ -16,13 +58,9 @@ def calculate_vote_direction_and_strength(text):
     Returns:
         tuple: A tuple containing the vote direction (str) and vote strength (float).
     """
-    # Define patterns to extract vote counts for and against
-    votes_for_pattern = r"(\d+) votes? for"
-    votes_against_pattern = r"(\d+) votes? against"
-    
     # Extract vote counts using regex patterns
-    votes_for = int(re.search(votes_for_pattern, text).group(1))
-    votes_against = int(re.search(votes_against_pattern, text).group(1))
+    votes_for = int(VOTES_FOR_PATTERN.search(text).group(1))
+    votes_against = int(VOTES_AGAINST_PATTERN.search(text).group(1))
     
     # Determine vote direction and calculate vote strength
     if votes_for > votes_against:
@@ -40,6 +78,50 @@ def calculate_vote_direction_and_strength(text):
     
     return direction, strength
 
+def calculate_vote_directions_and_strengths(texts):
+    """
+    Calculate the vote directions and strengths for many vote evidence strings at once.
+    Strings without both vote counts are marked with `VOTE_UNPARSED` instead of raising.
+
+    Args:
+        texts (iterable): The texts containing vote information.
+
+    Returns:
+        tuple: An int8 array of direction codes (indexes into `VOTE_DIRECTIONS`, or `VOTE_UNPARSED`)
+               and a float64 array of vote strengths rounded to 5 decimal places (NaN if unparsed).
+    """
+    texts = list(texts)
+    votes_for = np.zeros(len(texts), dtype=np.int64)
+    votes_against = np.zeros(len(texts), dtype=np.int64)
+    parsed = np.zeros(len(texts), dtype=bool)
+
+    # Extract vote counts, the only per-string step
+    for i, text in enumerate(texts):
+        for_match = VOTES_FOR_PATTERN.search(text)
+        against_match = VOTES_AGAINST_PATTERN.search(text)
+        if for_match is not None and against_match is not None:
+            votes_for[i] = int(for_match.group(1))
+            votes_against[i] = int(against_match.group(1))
+            parsed[i] = True
+
+    # Determine vote directions and calculate vote strengths for all strings together
+    directions = np.full(len(texts), VOTE_SPLIT, dtype=np.int8)
+    directions[votes_for > votes_against] = VOTED_FOR
+    directions[votes_against > votes_for] = VOTED_AGAINST
+
+    total = votes_for + votes_against
+    strengths = np.full(len(texts), 0.5)
+    not_split = directions != VOTE_SPLIT
+    strengths[not_split] = np.maximum(votes_for, votes_against)[not_split] / total[not_split]
+    # np.round scales by 10**5 before rounding, so a strength halfway between two 5 place values
+    # can round the other way to `calculate_vote_direction_and_strength`
+    strengths = np.round(strengths, 5)
+
+    directions[~parsed] = VOTE_UNPARSED
+    strengths[~parsed] = np.nan
+
+    return directions, strengths
+
 def scrape_mp_votes(mp_twfy_id):
     """
     Scrape MP voting records from the TheyWorkForYou website using a given MP's TWFY ID.
@@ -50,31 +132,76 @@ def scrape_mp_votes(mp_twfy_id):
     Returns:
         list: A list of tuples containing MP's voting data.
     """
-    # Construct URL with MP's TWFY ID and send a GET request
-    URL = f"https://www.theyworkforyou.com/mp/{mp_twfy_id}/votes"
-    page = requests.get(URL)
+    return parse_mp_votes(fetch_mp_votes_page(mp_twfy_id))
+
+def fetch_mp_votes_page(mp_twfy_id):
+    """
+    Download an MP's voting record page from the TheyWorkForYou website without parsing it.
+
+    Args:
+        mp_twfy_id (int): The TheyWorkForYou ID of the MP.
+
+    Returns:
+        bytes: The HTML of the page.
+    """
+    page = http_client.get(mp_votes_url(mp_twfy_id))
 
-    soup = BeautifulSoup(page.content, "html.parser")
+    return page.content
+
+def mp_votes_url(mp_twfy_id):
+    """
+    Construct the URL of an MP's voting record page on the TheyWorkForYou website.
+
+    Args:
+        mp_twfy_id (int): The TheyWorkForYou ID of the MP.
+
+    Returns:
+        str: The page URL.
+    """
+    return f"https://www.theyworkforyou.com/mp/{mp_twfy_id}/votes"
+
+def parse_mp_votes(html, parser=None, partial=True):
+    """
+    Parse MP voting records from a TheyWorkForYou votes page.
+
+    Args:
+        html (bytes or str): The votes page content.
+        parser (str): The BeautifulSoup parser backend, defaults to `HTML_PARSER`.
+        partial (bool): If True, only the primary content panels are parsed.
+
+    Returns:
+        list: A list of tuples containing MP's voting data.
+    """
+    soup = make_soup(html, parser, VOTES_STRAINER if partial else None)
 
     # Find the main content container and locate all panels containing vote information
     elements = soup.find("div", class_="primary-content__unit")
     panels = elements.find_all("div", class_="panel")
 
-    mp_votes = []
+    policies = []
+    evidence = []
     # Iterate over panels to find relevant vote information
     for panel in panels:
         issue = panel.find("h2")
         if issue is not None and issue.has_attr('id'):
             vote_descriptions = panel.find("ul", class_="vote-descriptions")
             votes = vote_descriptions.find_all("li", class_="vote-description")        
-            # Extract vote data and calculate vote direction and strength
+            # Extract vote data
             for vote in votes:
                 vote_evidence = vote.find("a", class_="vote-description__evidence")
-                vote_evidence = vote_evidence.get_text(strip=True)
-                vote_direction, vote_strength = calculate_vote_direction_and_strength(vote_evidence)
-                vote_tuple = (vote['data-policy-desc'], vote_direction, vote_strength)
-                # Append vote data to the list of MP votes
-                mp_votes.append(vote_tuple)
+                policies.append(vote['data-policy-desc'])
+                evidence.append(vote_evidence.get_text(strip=True) if vote_evidence is not None else '')
+
+    # Calculate vote directions and strengths for all of the MP's votes together
+    directions, strengths = calculate_vote_directions_and_strengths(evidence)
+
+    mp_votes = []
+    for policy, direction, strength, text in zip(policies, directions.tolist(), strengths.tolist(), evidence):
+        if direction == VOTE_UNPARSED:
+            logger.warning(f"Skipping vote on '{policy}' with unparseable evidence: '{text}'")
+            continue
+        # Append vote data to the list of MP votes
+        mp_votes.append((policy, VOTE_DIRECTIONS[direction], strength))
     
     return mp_votes
 
@@ -86,13 +213,27 @@ def scrape_constituency_regions():
         dict: A dictionary mapping constituency names (str) to their regions (str).
     """
     logger.info("Scrape constituency regions")
-    constituency_region_dict = {}
-    
+
     # Send a GET request to the Wikipedia page containing constituency information
     URL = "https://en.wikipedia.org/wiki/Constituencies_of_the_Parliament_of_the_United_Kingdom"
-    page = requests.get(URL)
+    page = http_client.get(URL)
+
+    return parse_constituency_regions(page.content)
 
-    soup = BeautifulSoup(page.content, "html.parser")
+def parse_constituency_regions(html, parser=None, partial=True):
+    """
+    Parse constituency regions from the Wikipedia constituencies page.
+
+    Args:
+        html (bytes or str): The Wikipedia page content.
+        parser (str): The BeautifulSoup parser backend, defaults to `HTML_PARSER`.
+        partial (bool): If True, only the four country tables are parsed.
+
+    Returns:
+        dict: A dictionary mapping constituency names (str) to their regions (str).
+    """
+    constituency_region_dict = {}
+    soup = make_soup(html, parser, CONSTITUENCY_STRAINER if partial else None)
 
     # English Constituencies
     logger.info("Scraping consituency data for England")
@@ -118,7 +259,7 @@ def scrape_constituency_regions():
         constituency_region_dict[constituency] = region
 
     # Don't need to find region for other countries constituencies as region is just country
-    countries = ['Scotland', 'Wales', 'NI']
+    countries = CONSTITUENCY_TABLE_IDS[1:]
     for country in countries:
         output_dict = get_constituencies_from_table(soup, country)
         constituency_region_dict.update(output_dict)
@@ -175,7 +316,7 @@ def get_twfy_ids():
     url = 'https://www.theyworkforyou.com/api/getMPs'
     params = {'key': os.getenv("TWFY_API_KEY"), 'output': 'json'}
 
-    response = requests.get(url, params=params)
+    response = http_client.get(url, params=params)
     data = response.json()
     logger.debug(f"Data from TWFY getMPS API: {data}")
 
@@ -201,7 +342,7 @@ def get_govt_posts_from_members_api():
     # Set the URL for the Members API request
     url = 'https://members-api.parliament.uk/api/Posts/GovernmentPosts'
 
-    response = requests.get(url)
+    response = http_client.get(url)
     data = response.json()
     logger.debug(f"Data from GovernmentPosts API {data}")
 
@@ -0,0 +1,183 @@
+"""
+Batch job computing each MP's most similar voters and writing them to the graph as weighted
+SIMILAR_TO relationships, for the dashboard's "MPs who vote most like" report.
+
+Usage:
+    python similarity.py [--k N] [--metric cosine|agreement] [--block-size N]
+"""
+import argparse
+import os
+import time
+import numpy as np
+from dotenv import load_dotenv
+from database import Database
+from vote_matrix import VoteMatrix
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_TOP_K = 10
+# Rows of the similarity matrix computed at once, bounding memory to block_size x MPs scores
+DEFAULT_BLOCK_SIZE = 256
+METRICS = ('cosine', 'agreement')
+
+def vote_vectors(matrix, metric='cosine'):
+    """
+    Build the vectors compared by `metric` from a vote matrix.
+
+    Args:
+        matrix (VoteMatrix): The MPs' votes.
+        metric (str): 'cosine' compares signed vote strengths. 'agreement' compares vote directions,
+                      scoring the fraction of policies both MPs voted for or against on which they agreed.
+
+    Returns:
+        tuple: For 'cosine', the unit length signed strength vectors and None, the vectors of MPs
+               without any vote being NaN so that they are comparable with no MP. For 'agreement',
+               the direction vectors (+1 / -1 / 0) and the indicator vectors of decided votes.
+    """
+    values = np.nan_to_num(matrix.values, nan=0.0)
+    if metric == 'cosine':
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        with np.errstate(invalid='ignore'):
+            return values / norms, None
+    if metric == 'agreement':
+        directions = np.sign(values)
+        return directions, (directions != 0).astype(np.float32)
+    raise ValueError(f"Unknown similarity metric {metric}, expected one of {METRICS}")
+
+def top_k_similar(matrix, k=DEFAULT_TOP_K, metric='cosine', block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Find each MP's `k` most similar MPs, comparing a block of MPs against all MPs at a time with
+    a single matrix product and keeping the block's top `k` with `numpy.argpartition`.
+
+    Args:
+        matrix (VoteMatrix): The MPs' votes.
+        k (int): Number of neighbours kept per MP.
+        metric (str): One of `METRICS`, see `vote_vectors`.
+        block_size (int): Number of MPs compared against all MPs at once.
+
+    Returns:
+        tuple: (neighbours, scores) arrays of shape (MPs, k), each MP's neighbour row indexes and
+               scores from most to least similar. Unused slots, for MPs with fewer than `k`
+               comparable MPs, have index -1 and a NaN score.
+    """
+    vectors, decided = vote_vectors(matrix, metric)
+    num_mps = vectors.shape[0]
+    k = max(0, min(k, num_mps - 1))
+    neighbours = np.full((num_mps, k), -1, dtype=np.int64)
+    scores = np.full((num_mps, k), np.nan, dtype=np.float32)
+    if k == 0:
+        return neighbours, scores
+
+    for start in range(0, num_mps, block_size):
+        stop = min(start + block_size, num_mps)
+        block_scores = vectors[start:stop] @ vectors.T
+        if decided is not None:
+            # (agreements - disagreements) / shared, rescaled from [-1, 1] to the fraction agreed
+            shared = decided[start:stop] @ decided.T
+            with np.errstate(invalid='ignore', divide='ignore'):
+                block_scores = (block_scores / shared + 1) / 2
+        block_scores = np.where(np.isnan(block_scores), -np.inf, block_scores)
+        # An MP is not its own neighbour
+        block_scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+        top = np.argpartition(-block_scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block_scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        valid = np.isfinite(top_scores)
+        neighbours[start:stop] = np.where(valid, top, -1)
+        scores[start:stop] = np.where(valid, top_scores, np.nan)
+
+    return neighbours, scores
+
+def similarity_rows(matrix, neighbours, scores):
+    """
+    Convert top-k results into parameter rows for `write_similarities_work`.
+
+    Returns:
+        list: {name, neighbour, score, rank} dicts, rank 1 being the most similar.
+    """
+    rows = []
+    for i, name in enumerate(matrix.mps):
+        for rank, (j, score) in enumerate(zip(neighbours[i], scores[i]), start=1):
+            if j >= 0:
+                rows.append({'name': name, 'neighbour': matrix.mps[j], 'score': float(score), 'rank': rank})
+    return rows
+
+def write_similarities_work(tx, rows, metric):
+    """
+    Function to be executed within a write transaction to replace all SIMILAR_TO relationships.
+
+    Args:
+        tx: The transaction object.
+        rows (list): Rows created by `similarity_rows`.
+        metric (str): The similarity metric the scores were computed with.
+
+    Returns:
+        A Record object containing the number of SIMILAR_TO relationships created.
+    """
+    tx.run("MATCH (:MP)-[s:SIMILAR_TO]->(:MP) DELETE s").consume()
+    return tx.run("UNWIND $rows AS row \
+                MATCH (m:MP {name: row.name}) \
+                MATCH (n:MP {name: row.neighbour}) \
+                CREATE (m)-[s:SIMILAR_TO {score: row.score, rank: row.rank, metric: $metric}]->(n) \
+                RETURN count(s) AS relationships",
+                rows=rows, metric=metric).single()
+
+def build_similarity_graph(driver, matrix=None, k=DEFAULT_TOP_K, metric='cosine', block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Compute every MP's top `k` most similar MPs and write them as SIMILAR_TO relationships,
+    replacing those from any previous run in a single transaction.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+        matrix (VoteMatrix): The MPs' votes. If None, they are read from the database.
+        k (int): Number of neighbours kept per MP.
+        metric (str): One of `METRICS`, see `vote_vectors`.
+        block_size (int): Number of MPs compared against all MPs at once.
+
+    Returns:
+        dict: Number of relationships written and the seconds spent in each phase.
+    """
+    timings = {}
+    start = time.perf_counter()
+    if matrix is None:
+        matrix = VoteMatrix.from_neo4j(driver)
+    timings['load_seconds'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    neighbours, scores = top_k_similar(matrix, k=k, metric=metric, block_size=block_size)
+    rows = similarity_rows(matrix, neighbours, scores)
+    timings['similarity_seconds'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with driver.session() as session:
+        record = session.execute_write(write_similarities_work, rows=rows, metric=metric)
+    timings['write_seconds'] = time.perf_counter() - start
+
+    stats = dict(timings, mps=matrix.shape[0], relationships=record["relationships"])
+    logger.info(f"Wrote {stats['relationships']} SIMILAR_TO relationships for {stats['mps']} MPs: "
+                f"load {timings['load_seconds']:.2f}s, similarity {timings['similarity_seconds']:.2f}s, "
+                f"write {timings['write_seconds']:.2f}s")
+    return stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--k', type=int, default=DEFAULT_TOP_K, help="neighbours kept per MP (default: %(default)s)")
+    parser.add_argument('--metric', choices=METRICS, default='cosine', help="similarity metric (default: %(default)s)")
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE,
+                        help="MPs compared against all MPs at once (default: %(default)s)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    driver = Database.init_driver(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+    try:
+        stats = build_similarity_graph(driver, k=args.k, metric=args.metric, block_size=args.block_size)
+    finally:
+        Database.close_driver()
+    for phase in ('load', 'similarity', 'write'):
+        print(f"{phase:<12}{stats[phase + '_seconds']:>8.2f}s")
+    print(f"{stats['relationships']} SIMILAR_TO relationships for {stats['mps']} MPs")
@@ -0,0 +1,172 @@
+import datetime
+import json
+import os
+import numpy as np
+from database import SCHEMA_MIGRATIONS
+from policies import policy_id
+from scraper import VOTE_DIRECTIONS
+from logger_config import get_logger
+
+# pyarrow is optional, it is only needed to write or read snapshots
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = get_logger(__name__)
+
+DEFAULT_SNAPSHOT_DIR = 'snapshots'
+# Incremented whenever the tables or their columns change
+SNAPSHOT_VERSION = 1
+# Snapshot file formats, also used as the file extensions
+FORMATS = ('parquet', 'arrow')
+TABLES = ('mps', 'policies', 'votes', 'govt_posts')
+# Low cardinality string columns, stored dictionary encoded
+DICTIONARY_COLUMNS = {'party', 'region', 'gender', 'govt_post', 'direction'}
+
+def require_pyarrow():
+    """
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    if pa is None:
+        raise ImportError("Snapshots need pyarrow, install it with `pip install pyarrow`")
+
+def _concatenate(arrays, dtype):
+    """
+    Concatenate the columnar vote arrays of many MPs into one numpy array.
+    """
+    return np.concatenate([np.asarray(array, dtype=dtype) for array in arrays] + [np.array([], dtype=dtype)])
+
+def snapshot_columns(mps, govt_post_dict):
+    """
+    Build the columns of each snapshot table from enriched MPs.
+
+    Args:
+        mps (list): The enriched MP objects.
+        govt_post_dict (dict): Mapping of MP IDs to government post names.
+
+    Returns:
+        dict: For each table in `TABLES`, a dict of column name to list or numpy array.
+    """
+    mp_columns = {column: [getattr(mp, column) for mp in mps]
+                  for column in ('id', 'name', 'twfy_id', 'party', 'constituency', 'region', 'gender',
+                                 'start_date', 'electorate', 'turnout', 'majority', 'govt_post')}
+
+    # Votes are read from the MPs' columnar arrays, mapping interned policy IDs to stable ones
+    lengths = [len(mp.vote_policy_ids) for mp in mps]
+    interned, index = np.unique(_concatenate([mp.vote_policy_ids for mp in mps], np.int64), return_inverse=True)
+    names = [mps[0].policy_table.description(int(i)) for i in interned]
+    stable_ids = np.array([policy_id(name) for name in names], dtype=np.int64)
+    votes = {'mp_id': np.repeat(np.array([mp.id for mp in mps], dtype=np.int64), lengths),
+             'policy_id': stable_ids[index],
+             'direction': [VOTE_DIRECTIONS[d] for d in _concatenate([mp.vote_directions for mp in mps], np.int64)],
+             'strength': _concatenate([mp.vote_strengths for mp in mps], np.float32)}
+
+    # Descriptions that normalise to the same policy share an ID, keep the first one seen
+    policies = {}
+    for stable_id, name in zip(stable_ids.tolist(), names):
+        policies.setdefault(stable_id, name)
+
+    return {'mps': mp_columns,
+            'policies': {'policy_id': np.array(list(policies), dtype=np.int64), 'name': list(policies.values())},
+            'votes': votes,
+            'govt_posts': {'mp_id': np.array(list(govt_post_dict), dtype=np.int64),
+                           'govt_post': list(govt_post_dict.values())}}
+
+def to_arrow_table(columns):
+    """
+    Convert snapshot columns to an Arrow table, dictionary encoding `DICTIONARY_COLUMNS`.
+
+    Args:
+        columns (dict): Column name to list or numpy array.
+
+    Returns:
+        pyarrow.Table: The table.
+    """
+    require_pyarrow()
+    arrays = {}
+    for name, values in columns.items():
+        if name in DICTIONARY_COLUMNS:
+            # Typed explicitly, as a column of only nulls would otherwise have no string type to encode
+            arrays[name] = pa.array(values, type=pa.string()).dictionary_encode()
+        else:
+            arrays[name] = pa.array(values)
+    return pa.table(arrays)
+
+def write_snapshot(mps, govt_post_dict, snapshot_dir=DEFAULT_SNAPSHOT_DIR, format='parquet'):
+    """
+    Write a versioned, columnar snapshot of an ingest run, one file per table in `TABLES` plus a
+    manifest, to a new timestamped directory under `snapshot_dir`.
+
+    Args:
+        mps (list): The enriched MP objects.
+        govt_post_dict (dict): Mapping of MP IDs to government post names.
+        snapshot_dir (str): Directory the snapshot directory is created in.
+        format (str): 'parquet', or 'arrow' for uncompressed Arrow IPC files.
+
+    Returns:
+        str: Path of the snapshot directory.
+    """
+    require_pyarrow()
+    if format not in FORMATS:
+        raise ValueError(f"Unknown snapshot format {format}, expected one of {FORMATS}")
+
+    created_at = datetime.datetime.now(datetime.timezone.utc)
+    path = os.path.join(snapshot_dir, created_at.strftime('%Y%m%dT%H%M%S%fZ'))
+    os.makedirs(path)
+
+    rows = {}
+    for table, columns in snapshot_columns(mps, govt_post_dict).items():
+        arrow_table = to_arrow_table(columns)
+        table_path = os.path.join(path, f'{table}.{format}')
+        if format == 'parquet':
+            pq.write_table(arrow_table, table_path, use_dictionary=True)
+        else:
+            with pa.OSFile(table_path, 'wb') as sink, pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+        rows[table] = arrow_table.num_rows
+
+    manifest = {'version': SNAPSHOT_VERSION, 'created_at': created_at.isoformat(), 'format': format,
+                'schema_version': SCHEMA_MIGRATIONS[-1][0], 'rows': rows}
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Wrote snapshot of {rows['mps']} MPs and {rows['votes']} votes to {path}")
+    return path
+
+def latest_snapshot(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """
+    Get the most recent snapshot written under a directory.
+
+    Args:
+        snapshot_dir (str): Directory snapshots are written to.
+
+    Returns:
+        str: Path of the latest snapshot directory, or None if there are no snapshots.
+    """
+    if not os.path.isdir(snapshot_dir):
+        return None
+    snapshots = sorted(name for name in os.listdir(snapshot_dir)
+                       if os.path.exists(os.path.join(snapshot_dir, name, 'manifest.json')))
+    return os.path.join(snapshot_dir, snapshots[-1]) if snapshots else None
+
+def read_snapshot(path, table):
+    """
+    Read one table of a snapshot, memory mapping the file rather than copying it into memory.
+
+    Args:
+        path (str): Path of the snapshot directory.
+        table (str): One of `TABLES`.
+
+    Returns:
+        pyarrow.Table: The table.
+    """
+    require_pyarrow()
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    table_path = os.path.join(path, f"{table}.{manifest['format']}")
+    if manifest['format'] == 'parquet':
+        return pq.read_table(table_path, memory_map=True)
+    return pa.ipc.open_file(pa.memory_map(table_path, 'r')).read_all()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+from database import apply_person_diff
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_STATE_PATH = 'sync_state.json'
+
+# Changes to an MP since it was last written, see `SyncState.diff`
+MPDiff = namedtuple('MPDiff', ['attributes_changed', 'added_votes', 'removed_votes'])
+
+def mp_attributes(mp):
+    """
+    Get the attributes of an MP that are written to its node and links.
+
+    Args:
+        mp (MP): The MP object.
+
+    Returns:
+        dict: The MP's written attributes.
+    """
+    return {'name': mp.name, 'party': mp.party, 'constituency': mp.constituency, 'region': mp.region,
+            'gender': mp.gender, 'start_date': mp.start_date, 'electorate': mp.electorate,
+            'turnout': mp.turnout, 'majority': mp.majority, 'govt_post': mp.govt_post}
+
+def normalise_votes(votes):
+    """
+    Convert vote tuples (or lists loaded from JSON) into a sorted list of [policy, direction, strength] lists.
+
+    Args:
+        votes (iterable): (policy, direction, strength) votes.
+
+    Returns:
+        list: The votes in a stable order.
+    """
+    return sorted([vote[0], vote[1], vote[2]] for vote in votes)
+
+def fingerprint(attributes, votes):
+    """
+    Hash an MP's attributes and normalised votes.
+
+    Args:
+        attributes (dict): The MP's attributes, from `mp_attributes`.
+        votes (list): The MP's votes, from `normalise_votes`.
+
+    Returns:
+        str: A hex digest that changes whenever any attribute or vote changes.
+    """
+    payload = json.dumps([attributes, votes], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class SyncState(object):
+    """
+    Local state file recording the fingerprint, attributes and votes last written for each MP,
+    used to skip MPs that have not changed and to write only the changes for those that have.
+
+    Attributes:
+        path (str): Path of the JSON state file.
+        entries (dict): State per MP, keyed by the MP's Members API id as a string.
+    """
+    def __init__(self, path=DEFAULT_STATE_PATH, entries=None):
+        self.path = path
+        self.entries = entries or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=DEFAULT_STATE_PATH):
+        """
+        Load the state file, starting with an empty state if it does not exist or cannot be read.
+
+        Args:
+            path (str): Path of the JSON state file.
+
+        Returns:
+            SyncState: The loaded state.
+        """
+        if not os.path.exists(path):
+            logger.info(f"No sync state found at {path}, all MPs will be written")
+            return cls(path)
+        try:
+            with open(path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            logger.error(f"Sync state at {path} could not be read, all MPs will be written")
+            entries = {}
+        return cls(path, entries)
+
+    def save(self):
+        """
+        Write the state file, replacing the previous one atomically.
+        """
+        with self._lock:
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+        logger.info(f"Saved sync state for {len(self.entries)} MPs to {self.path}")
+
+    def diff(self, mp):
+        """
+        Compare an MP against its last written state.
+
+        Args:
+            mp (MP): The enriched MP object.
+
+        Returns:
+            MPDiff: The changes to write, or None if the MP is unchanged.
+        """
+        attributes = mp_attributes(mp)
+        votes = normalise_votes(mp.votes)
+        with self._lock:
+            entry = self.entries.get(str(mp.id))
+
+        # MPs are keyed by name in the graph, so a new or renamed MP is written in full
+        if entry is None or entry['attributes']['name'] != mp.name:
+            return MPDiff(True, [tuple(vote) for vote in votes], [])
+        if entry['fingerprint'] == fingerprint(attributes, votes):
+            return None
+
+        previous_votes = {tuple(vote) for vote in entry['votes']}
+        current_votes = {tuple(vote) for vote in votes}
+        return MPDiff(entry['attributes'] != attributes,
+                      sorted(current_votes - previous_votes),
+                      sorted(previous_votes - current_votes))
+
+    def record(self, mp):
+        """
+        Record an MP's current attributes and votes as written.
+
+        Args:
+            mp (MP): The MP object that has just been written.
+        """
+        attributes = mp_attributes(mp)
+        votes = normalise_votes(mp.votes)
+        with self._lock:
+            self.entries[str(mp.id)] = {'fingerprint': fingerprint(attributes, votes),
+                                        'attributes': attributes, 'votes': votes}
+
+def sync_person(driver, state, mp, catalogue=None):
+    """
+    Write only the changes to an MP since the last recorded run, skipping the MP entirely if it
+    is unchanged, then record its new state.
+
+    Args:
+        driver (neo4j.Driver): The Neo4j driver instance.
+        state (SyncState): The sync state of previously written MPs.
+        mp (MP): The enriched MP object.
+        catalogue (PolicyCatalogue): The run's policy catalogue, so each Policy node is only written once.
+
+    Returns:
+        MPDiff: The changes written, or None if the MP was unchanged.
+    """
+    diff = state.diff(mp)
+    if diff is None:
+        logger.info(f"Skipping unchanged MP {mp.name}")
+        return None
+
+    apply_person_diff(driver, mp, diff, catalogue=catalogue)
+    state.record(mp)
+    return diff
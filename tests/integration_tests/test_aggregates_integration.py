@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+from dotenv import load_dotenv
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+import aggregates
+import database
+from database import Database
+from person import MP
+from policies import policy_id
+from vote_matrix import VoteMatrix
+
+def make_mp(id, party, votes):
+    mp = MP(id, f'MP {id}', party, f'Constituency {id}', 'F', '2019-01-01')
+    mp.set_region('London')
+    mp.set_votes(votes)
+    return mp
+
+# Policy A divides 2 for, 1 against and 1 split; Policy B is unanimous; Policy C has no votes
+SAMPLE_MPS = [make_mp(1, 'Labour', [('Policy A', 'voted_for', 1.0), ('Policy B', 'voted_for', 0.5)]),
+              make_mp(2, 'Labour', [('Policy A', 'voted_for', 0.75), ('Policy B', 'voted_for', 1.0)]),
+              make_mp(3, 'Conservative', [('Policy A', 'voted_against', 1.0), ('Policy B', 'voted_for', 1.0)]),
+              make_mp(4, 'Conservative', [('Policy A', 'vote_split', 0.5)])]
+
+@pytest.fixture(scope="module")
+def neo4j_driver():
+    load_dotenv()
+    driver = Database.init_driver(os.getenv("NEO4J_URI_TEST"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+
+    for mp in SAMPLE_MPS:
+        database.create_person(driver, mp)
+    with driver.session() as session:
+        session.execute_write(database.upsert_policies_work,
+                              policies=[{'id': policy_id('Policy C'), 'name': 'Policy C'}])
+
+    yield driver
+
+    with driver.session() as session:
+        session.run("MATCH (n) DETACH DELETE n")
+
+    driver.close()
+
+def get_policy(neo4j_driver, name):
+    with neo4j_driver.session() as session:
+        return dict(session.run("MATCH (p:Policy {name: $name}) RETURN p", name=name).single()['p'])
+
+def get_party_votes(neo4j_driver):
+    with neo4j_driver.session() as session:
+        result = session.run("MATCH (party:Party)-[s:PARTY_VOTES]->(p:Policy) \
+                             RETURN party.name AS party, p.name AS policy, s")
+        return {(record['party'], record['policy']): dict(record['s']) for record in result}
+
+def test_policy_aggregates_split_vote(neo4j_driver):
+    aggregates.refresh_aggregates(neo4j_driver)
+
+    policy = get_policy(neo4j_driver, 'Policy A')
+
+    assert (policy['support'], policy['opposition'], policy['split'], policy['total_votes']) == (2, 1, 1, 4)
+    assert policy['support_ratio'] == pytest.approx(2.0)
+    # Split votes count towards neither side: 1 - |2 - 1| / (2 + 1)
+    assert policy['controversy'] == pytest.approx(2 / 3)
+
+def test_policy_aggregates_one_sided_vote(neo4j_driver):
+    aggregates.refresh_aggregates(neo4j_driver)
+
+    policy = get_policy(neo4j_driver, 'Policy B')
+
+    assert (policy['support'], policy['opposition'], policy['split'], policy['total_votes']) == (3, 0, 0, 3)
+    assert 'support_ratio' not in policy
+    assert 'controversy' not in policy
+
+def test_policy_aggregates_without_votes(neo4j_driver):
+    aggregates.refresh_aggregates(neo4j_driver)
+
+    policy = get_policy(neo4j_driver, 'Policy C')
+
+    assert (policy['support'], policy['opposition'], policy['split'], policy['total_votes']) == (0, 0, 0, 0)
+    assert 'support_ratio' not in policy
+    assert 'controversy' not in policy
+
+def test_policy_aggregates_match_vote_matrix(neo4j_driver):
+    aggregates.refresh_aggregates(neo4j_driver)
+    matrix = VoteMatrix.from_neo4j(neo4j_driver)
+
+    reference = matrix.policy_controversy()
+
+    for i, name in enumerate(matrix.policies):
+        policy = get_policy(neo4j_driver, name)
+        assert policy['support'] == reference['support'][i]
+        assert policy['opposition'] == reference['opposition'][i]
+        assert policy['split'] == reference['split'][i]
+        if np.isnan(reference['controversy'][i]):
+            assert 'controversy' not in policy
+        else:
+            assert policy['controversy'] == pytest.approx(reference['controversy'][i])
+
+def test_party_aggregates_rebuilt_on_refresh(neo4j_driver):
+    aggregates.refresh_aggregates(neo4j_driver)
+    aggregates.refresh_aggregates(neo4j_driver)
+
+    party_votes = get_party_votes(neo4j_driver)
+
+    # Refreshing replaces every PARTY_VOTES relationship rather than adding to them
+    assert len(party_votes) == 4
+    assert party_votes[('Labour', 'Policy A')] == {'support': 2, 'opposition': 0, 'split': 0, 'total_votes': 2}
+    assert party_votes[('Conservative', 'Policy A')] == {'support': 0, 'opposition': 1, 'split': 1, 'total_votes': 2}
+    assert party_votes[('Conservative', 'Policy B')] == {'support': 1, 'opposition': 0, 'split': 0, 'total_votes': 1}
+
+def test_party_aggregates_drop_stale_summaries(neo4j_driver):
+    with neo4j_driver.session() as session:
+        session.run("MATCH (party:Party {name: 'Labour'}), (p:Policy {name: 'Policy C'}) \
+                    CREATE (party)-[:PARTY_VOTES {support: 9, opposition: 0, split: 0, total_votes: 9}]->(p)").consume()
+
+    aggregates.refresh_aggregates(neo4j_driver)
+
+    assert ('Labour', 'Policy C') not in get_party_votes(neo4j_driver)
@@ -30,6 +30,66 @@ def generate_sample_mps(num_mps):
 
     return sample_mps
 
+# Approximate seat shares, so party sizes look like a real parliament
+PARTY_WEIGHTS = {'Conservative': 0.54, 'Labour': 0.31, 'Scottish National Party': 0.07,
+                 'Liberal Democrat': 0.02, 'Democratic Unionist Party': 0.01, 'Independent': 0.03,
+                 'Plaid Cymru': 0.01, 'Green Party': 0.01}
+REGIONS = ['London', 'South East', 'South West', 'East of England', 'East Midlands', 'West Midlands',
+           'North East', 'North West', 'Yorkshire and the Humber', 'Scotland', 'Wales', 'NI']
+POLICY_TOPICS = ['the NHS', 'university tuition fees', 'renewable energy', 'the armed forces', 'local councils',
+                 'income tax', 'welfare benefits', 'immigration', 'the European Union', 'housing',
+                 'rail nationalisation', 'police numbers', 'surveillance powers', 'trade unions', 'fox hunting']
+POLICY_VERBS = ['more powers for', 'higher spending on', 'reducing', 'stricter controls on',
+                'greater transparency in', 'privatising', 'protecting']
+
+def generate_policy_descriptions(num_policies):
+    """
+    Generate unique policy descriptions of a similar length to TheyWorkForYou's `data-policy-desc` strings.
+    """
+    return [f'{POLICY_VERBS[i % len(POLICY_VERBS)]} {POLICY_TOPICS[(i // len(POLICY_VERBS)) % len(POLICY_TOPICS)]} '
+            f'as set out in policy {i + 1}, including the related amendments and statutory instruments'
+            for i in range(num_policies)]
+
+def generate_parliament(num_mps, num_policies, votes_per_mp=None, seed=None):
+    """
+    Generate a synthetic parliament of MP objects for benchmarks. Each party has a position on every
+    policy which its MPs follow 90% of the time, and each MP votes on `votes_per_mp` random policies.
+
+    Args:
+        num_mps (int): Number of MPs.
+        num_policies (int): Number of distinct policies.
+        votes_per_mp (int): Number of policies each MP voted on, defaults to all policies up to 300.
+        seed (int): Random seed, for reproducible parliaments.
+
+    Returns:
+        list: The generated MP objects, with region and votes set.
+    """
+    rng = random.Random(seed)
+    votes_per_mp = min(votes_per_mp or min(num_policies, 300), num_policies)
+    policies = generate_policy_descriptions(num_policies)
+    directions = ['voted_for', 'voted_against', 'vote_split']
+    parties = list(PARTY_WEIGHTS)
+    party_positions = {party: [rng.choice(directions[:2]) for _ in policies] for party in parties}
+
+    mps = []
+    for i in range(num_mps):
+        party = rng.choices(parties, weights=list(PARTY_WEIGHTS.values()))[0]
+        mp = MP(id=i + 1, name=f'MP {i + 1}', party=party, constituency=f'Constituency {i + 1}',
+                gender=rng.choice(['M', 'F']), start_date=rng.choice(['2019-12-12', '2017-06-08', '2015-05-07', '2010-05-06']))
+        mp.set_region(rng.choice(REGIONS))
+        votes = []
+        for policy_index in rng.sample(range(num_policies), votes_per_mp):
+            if rng.random() < 0.9:
+                direction = party_positions[party][policy_index]
+            else:
+                direction = rng.choice(directions)
+            strength = 0.5 if direction == 'vote_split' else round(rng.uniform(0.5, 1.0), 5)
+            votes.append((policies[policy_index], direction, strength))
+        mp.set_votes(votes)
+        mps.append(mp)
+
+    return mps
+
 def save_sample_mps_to_file(sample_mps, filename):
     with open(filename, 'w') as f:
         json.dump(sample_mps, f)
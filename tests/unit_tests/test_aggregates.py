@@ -0,0 +1,42 @@
+from unittest.mock import MagicMock
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+import aggregates
+
+def test_policy_aggregates_work_sets_counts():
+    tx = MagicMock()
+    tx.run.return_value.single.return_value = {'policies': 3}
+
+    record = aggregates.policy_aggregates_work(tx)
+
+    query = tx.run.call_args.args[0]
+    for prop in ('p.support', 'p.opposition', 'p.split', 'p.support_ratio', 'p.controversy'):
+        assert prop in query
+    assert record['policies'] == 3
+
+def test_party_aggregates_work_replaces_summaries():
+    tx = MagicMock()
+
+    aggregates.party_aggregates_work(tx)
+
+    queries = [call.args[0] for call in tx.run.call_args_list]
+    assert 'DELETE s' in queries[0]
+    assert 'CREATE (party)-[s:PARTY_VOTES' in queries[1]
+    # The old summaries are deleted before the new ones are created
+    assert tx.run.return_value.consume.call_count == 1
+
+def test_refresh_aggregates_single_transaction():
+    driver = MagicMock()
+    session = driver.session.return_value.__enter__.return_value
+    session.execute_write.return_value = (300, 1200)
+
+    stats = aggregates.refresh_aggregates(driver)
+
+    assert session.execute_write.call_count == 1
+    assert stats['policies'] == 300
+    assert stats['summaries'] == 1200
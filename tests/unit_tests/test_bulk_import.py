@@ -0,0 +1,83 @@
+import csv
+import pytest
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+import bulk_import
+from person import MP
+from policies import policy_id
+
+@pytest.fixture
+def mps():
+    mp1 = MP(1, 'MP 1', 'Labour', 'Constituency 1', 'F', '2019-01-01')
+    mp1.set_region('London')
+    mp1.set_votes([('Policy 1', 'voted_for', 0.75), ('Policy 2', 'voted_against', 0.5)])
+    mp2 = MP(2, 'MP 2', 'Labour', 'Constituency 2', 'M', '2019-01-01')
+    mp2.set_region('Wales')
+    mp2.set_govt_post('Minister')
+    mp2.set_votes([('Policy 2', 'vote_split', 0.5)])
+    return [mp1, mp2]
+
+def read_csv(directory, file_name):
+    with open(os.path.join(directory, file_name), newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+def test_writer_writes_headers(tmp_path):
+    with bulk_import.BulkImportWriter(str(tmp_path)):
+        pass
+
+    for _, file_name, header in bulk_import.NODE_FILES:
+        assert read_csv(tmp_path, file_name) == [header]
+    for file_name, header in bulk_import.RELATIONSHIP_FILES:
+        assert read_csv(tmp_path, file_name) == [header]
+
+def test_writer_writes_shared_nodes_once(tmp_path, mps):
+    with bulk_import.BulkImportWriter(str(tmp_path)) as writer:
+        for mp in mps:
+            writer.add(mp)
+
+    assert read_csv(tmp_path, 'mps.csv')[1:] == [['MP 1', 'constituency 1', 'F', '', '', '', ''],
+                                                 ['MP 2', 'constituency 2', 'M', '', '', '', 'Minister']]
+    assert read_csv(tmp_path, 'parties.csv')[1:] == [['Labour']]
+    assert read_csv(tmp_path, 'regions.csv')[1:] == [['London'], ['Wales']]
+    assert read_csv(tmp_path, 'start_dates.csv')[1:] == [['2019-01-01']]
+    assert read_csv(tmp_path, 'policies.csv')[1:] == [
+        [str(policy_id('Policy 1')), str(policy_id('Policy 1')), 'Policy 1'],
+        [str(policy_id('Policy 2')), str(policy_id('Policy 2')), 'Policy 2']]
+    assert read_csv(tmp_path, 'memberships.csv')[1:] == [['MP 1', 'Labour', 'IS_A_MEMBER_OF'],
+                                                         ['MP 2', 'Labour', 'IS_A_MEMBER_OF']]
+    assert writer.counts['houses_joined.csv'] == 2
+
+def test_writer_writes_fractional_turnout(tmp_path, mps):
+    mp = mps[0]
+    mp.electorate, mp.turnout, mp.majority = 72000, 67.4, 5120
+    with bulk_import.BulkImportWriter(str(tmp_path)) as writer:
+        writer.add(mp)
+
+    header, row = read_csv(tmp_path, 'mps.csv')
+    # MP.turnout is a float, which neo4j-admin would reject in an int column
+    assert header[4] == 'turnout:float'
+    assert row[3:6] == ['72000', '67.4', '5120']
+
+def test_writer_writes_typed_votes(tmp_path, mps):
+    with bulk_import.BulkImportWriter(str(tmp_path)) as writer:
+        for mp in mps:
+            writer.add(mp)
+
+    assert read_csv(tmp_path, 'votes.csv')[1:] == [
+        ['MP 1', str(policy_id('Policy 1')), '0.75', 'VOTED_FOR'],
+        ['MP 1', str(policy_id('Policy 2')), '0.5', 'VOTED_AGAINST'],
+        ['MP 2', str(policy_id('Policy 2')), '0.5', 'VOTE_SPLIT']]
+
+def test_command(tmp_path):
+    with bulk_import.BulkImportWriter(str(tmp_path)) as writer:
+        command = writer.command('mps')
+
+    assert command.startswith('neo4j-admin database import full ')
+    assert command.endswith(' mps')
+    assert f"--nodes=Policy={os.path.join(str(tmp_path), 'policies.csv')}" in command
+    assert f"--relationships={os.path.join(str(tmp_path), 'votes.csv')}" in command
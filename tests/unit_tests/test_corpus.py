@@ -0,0 +1,196 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+import bz2
+import re
+import pytest
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+import corpus
+
+DUMP = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" version="0.10">
+  <page>
+    <title>Jane Smith (politician)</title>
+    <revision><id>101</id><text>Jane Smith is an MP.
+== References ==
+Citation</text></revision>
+  </page>
+  <page>
+    <title>Ann Jones</title>
+    <ns>0</ns>
+    <revision><id>202</id><text>'''Ann Jones''' is an [[Member of Parliament (United Kingdom)|MP]].</text></revision>
+  </page>
+  <page>
+    <title>Jane Smith MP</title>
+    <ns>0</ns>
+    <redirect title="Jane Smith (politician)" />
+    <revision><id>303</id><text>#REDIRECT [[Jane Smith (politician)]]</text></revision>
+  </page>
+  <page>
+    <title>Talk:Ann Jones</title>
+    <ns>1</ns>
+    <revision><id>404</id><text>Talk page</text></revision>
+  </page>
+</mediawiki>
+"""
+
+def test_store_round_trip(tmp_path):
+    with corpus.CorpusStore(str(tmp_path)) as store:
+        assert store.add('Jane Smith', 1, 'Jane Smith is an MP.\n== References ==\nCitation')
+        article = store.get('Jane Smith')
+
+    assert (article.title, article.revision_id, article.text) == ('Jane Smith', 1, 'Jane Smith is an MP.\n')
+
+    # A later run reads the saved index and the same data file
+    with corpus.CorpusStore(str(tmp_path)) as store:
+        assert len(store) == 1
+        assert store.get('Jane Smith').text == 'Jane Smith is an MP.\n'
+        assert store.get('Ann Jones') is None
+
+def test_store_only_adds_new_revisions(tmp_path):
+    with corpus.CorpusStore(str(tmp_path)) as store:
+        assert store.add('Jane Smith', 1, 'First')
+        assert not store.add('Jane Smith', 1, 'First')
+        size = os.path.getsize(os.path.join(str(tmp_path), 'articles.bin'))
+        assert store.add('Jane Smith', 2, 'Second')
+
+        assert store.revision('Jane Smith') == 2
+        assert store.get('Jane Smith').text == 'Second'
+    assert os.path.getsize(os.path.join(str(tmp_path), 'articles.bin')) > size
+
+def test_store_reads_articles_added_after_mapping(tmp_path):
+    with corpus.CorpusStore(str(tmp_path)) as store:
+        store.add('Jane Smith', 1, 'Jane Smith is an MP.')
+        assert store.get('Jane Smith').text == 'Jane Smith is an MP.'
+        store.add('Ann Jones', 2, 'Ann Jones is an MP.')
+        assert store.get('Ann Jones').text == 'Ann Jones is an MP.'
+
+def test_store_compresses_text(tmp_path):
+    text = 'Jane Smith is an MP. ' * 1000
+    with corpus.CorpusStore(str(tmp_path)) as store:
+        store.add('Jane Smith', 1, text)
+
+    assert os.path.getsize(os.path.join(str(tmp_path), 'articles.bin')) < len(text) / 10
+
+def test_fetch_article_searches_once(tmp_path):
+    page = SimpleNamespace(title='Jane Smith (politician)', revision_id='101', content='Jane Smith is an MP.')
+    with corpus.CorpusStore(str(tmp_path)) as store, \
+         patch('corpus.wikipedia') as mock_wikipedia:
+        mock_wikipedia.search.return_value = ['Jane Smith (politician)', 'Jane Smith']
+        mock_wikipedia.page.return_value = page
+        first = corpus.fetch_article(store, 'Jane Smith')
+        second = corpus.fetch_article(store, 'Jane Smith')
+
+    mock_wikipedia.page.assert_called_once_with('Jane Smith (politician)', auto_suggest=False)
+    assert (first.title, first.revision_id, first.text) == ('Jane Smith (politician)', 101, 'Jane Smith is an MP.')
+    assert second.text == first.text
+    with corpus.CorpusStore(str(tmp_path)) as store:
+        assert store.resolve('Jane Smith') == 'Jane Smith (politician)'
+
+def test_fetch_article_without_results(tmp_path):
+    with corpus.CorpusStore(str(tmp_path)) as store, patch('corpus.wikipedia') as mock_wikipedia:
+        mock_wikipedia.search.return_value = []
+        assert corpus.fetch_article(store, 'Jane Smith') is None
+
+def test_fetch_article_offline(tmp_path):
+    with corpus.CorpusStore(str(tmp_path)) as store, patch('corpus.wikipedia') as mock_wikipedia:
+        store.add('Ann Jones', 202, 'Ann Jones is an MP.')
+        assert corpus.fetch_article(store, 'Ann Jones', offline=True).revision_id == 202
+        assert corpus.fetch_article(store, 'Jane Smith', offline=True) is None
+
+    assert not mock_wikipedia.search.called
+
+def strip_code(text):
+    # Stand-in for mwparserfromhell's strip_code, for the markup used in DUMP
+    return re.sub(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]", r"\1", text).replace("'''", '')
+
+@pytest.fixture
+def mock_mwparserfromhell():
+    with patch('corpus.mwparserfromhell') as mock_mwparserfromhell:
+        mock_mwparserfromhell.parse.side_effect = lambda text: SimpleNamespace(strip_code=lambda: strip_code(text))
+        yield mock_mwparserfromhell
+
+@pytest.mark.parametrize('file_name', ['dump.xml', 'dump.xml.bz2'])
+def test_load_dump(tmp_path, file_name, mock_mwparserfromhell):
+    path = os.path.join(str(tmp_path), file_name)
+    with (bz2.open if file_name.endswith('.bz2') else open)(path, 'wb') as f:
+        f.write(DUMP.encode('utf-8'))
+
+    with corpus.CorpusStore(os.path.join(str(tmp_path), 'corpus')) as store:
+        assert corpus.load_dump(store, path) == 2
+        assert corpus.load_dump(store, path) == 0
+        assert len(store) == 2
+        article = store.get('Jane Smith (politician)')
+        assert (article.revision_id, article.text) == (101, 'Jane Smith is an MP.')
+        assert corpus.fetch_article(store, 'Ann Jones', offline=True).text == 'Ann Jones is an MP.'
+        # Names resolve to the disambiguated title and redirects to their target
+        assert corpus.fetch_article(store, 'Jane Smith', offline=True).revision_id == 101
+        assert store.resolve('Jane Smith MP') == 'Jane Smith (politician)'
+
+def test_load_dump_keeps_existing_resolution(tmp_path, mock_mwparserfromhell):
+    path = os.path.join(str(tmp_path), 'dump.xml')
+    with open(path, 'wb') as f:
+        f.write(DUMP.encode('utf-8'))
+
+    with corpus.CorpusStore(os.path.join(str(tmp_path), 'corpus')) as store:
+        store.set_resolved('Jane Smith', 'Jane Smith (Labour politician)')
+        corpus.load_dump(store, path)
+        assert store.resolve('Jane Smith') == 'Jane Smith (Labour politician)'
+
+def test_strip_wikitext():
+    mwparserfromhell = pytest.importorskip('mwparserfromhell')
+    with patch('corpus.mwparserfromhell', mwparserfromhell):
+        text = corpus.strip_wikitext("'''Ann Jones''' is an [[Member of Parliament|MP]].{{Infobox}}<ref>Cite</ref>\n"
+                                     "== References ==\nCitation")
+    assert text == 'Ann Jones is an MP.'
+
+def test_latest_revision():
+    response = SimpleNamespace(status_code=200, json=lambda: {
+        'query': {'pages': [{'title': 'Ann Jones', 'revisions': [{'revid': 203, 'parentid': 202}]}]}})
+    with patch('corpus.http_client.get', return_value=response) as mock_get:
+        assert corpus.latest_revision('Ann Jones') == 203
+
+    assert mock_get.call_args.kwargs['params']['titles'] == 'Ann Jones'
+    assert mock_get.call_args.kwargs['params']['prop'] == 'revisions'
+
+def test_latest_revision_of_missing_article():
+    response = SimpleNamespace(status_code=200, json=lambda: {
+        'query': {'pages': [{'title': 'Ann Jones', 'missing': True}]}})
+    with patch('corpus.http_client.get', return_value=response):
+        assert corpus.latest_revision('Ann Jones') is None
+    with patch('corpus.http_client.get', return_value=SimpleNamespace(status_code=503)):
+        assert corpus.latest_revision('Ann Jones') is None
+
+def test_fetch_article_refetches_new_revision(tmp_path):
+    page = SimpleNamespace(title='Ann Jones', revision_id='203', content='Ann Jones was an MP.')
+    with corpus.CorpusStore(str(tmp_path)) as store, \
+         patch('corpus.wikipedia') as mock_wikipedia, \
+         patch('corpus.latest_revision', return_value=203) as mock_latest_revision:
+        mock_wikipedia.page.return_value = page
+        store.add('Ann Jones', 202, 'Ann Jones is an MP.')
+
+        # A stored article that has never been checked is checked, and fetched as its revision changed
+        article = corpus.fetch_article(store, 'Ann Jones')
+        assert (article.revision_id, article.text) == (203, 'Ann Jones was an MP.')
+        mock_wikipedia.page.assert_called_once_with('Ann Jones', auto_suggest=False)
+
+        # It is not checked again until the TTL expires, unless refreshing
+        corpus.fetch_article(store, 'Ann Jones')
+        assert mock_latest_revision.call_count == 1
+        corpus.fetch_article(store, 'Ann Jones', ttl=0)
+        corpus.fetch_article(store, 'Ann Jones', refresh=True)
+        assert mock_latest_revision.call_count == 3
+        # The revision is unchanged, so the article is not fetched again
+        assert mock_wikipedia.page.call_count == 1
+        assert not mock_wikipedia.search.called
+
+def test_fetch_article_offline_skips_revision_check(tmp_path):
+    with corpus.CorpusStore(str(tmp_path)) as store, patch('corpus.latest_revision') as mock_latest_revision:
+        store.add('Ann Jones', 202, 'Ann Jones is an MP.')
+        assert corpus.fetch_article(store, 'Ann Jones', offline=True, refresh=True).revision_id == 202
+
+    assert not mock_latest_revision.called
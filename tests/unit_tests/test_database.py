@@ -10,7 +10,10 @@ from database import Database
 
 import pytest
 from unittest.mock import MagicMock, patch
+import database
 from database import Database
+from person import MP
+from policies import PolicyCatalogue, policy_id
 
 @pytest.fixture
 def mock_driver():
@@ -19,6 +22,8 @@ def mock_driver():
 @pytest.fixture
 def mock_driver_connectivity(mock_driver):
     mock_driver.verify_connectivity = MagicMock()
+    # Empty database, so all schema migrations are applied
+    mock_driver.session.return_value.__enter__.return_value.execute_read.return_value = 0
     return mock_driver
 
 def test_init_driver(mock_driver_connectivity):
@@ -69,4 +74,162 @@ def test_init_driver_multiple_connections(mock_driver_connectivity):
     assert driver1 == driver2
 
     # Ensure that the driver was only initialized once
-    assert mock_driver_function.call_count == 1
\ No newline at end of file
+    assert mock_driver_function.call_count == 1
+
+@pytest.fixture
+def sample_mp():
+    mp = MP(1, 'MP 1', 'Labour', 'Constituency 1', 'F', '2019-01-01')
+    mp.set_region('London')
+    mp.set_votes([('Policy 1', 'voted_for', 0.75),
+                  ('Policy 2', 'voted_against', 0.9),
+                  ('Policy 3', 'vote_split', 0.5)])
+    return mp
+
+def test_mp_to_row(sample_mp):
+    row = database.mp_to_row(sample_mp)
+
+    assert row['name'] == 'MP 1'
+    assert row['region'] == 'London'
+    assert row['voted_for'] == [{'policy_id': policy_id('Policy 1'), 'policy_name': 'Policy 1', 'strength': 0.75}]
+    assert row['voted_against'] == [{'policy_id': policy_id('Policy 2'), 'policy_name': 'Policy 2', 'strength': 0.9}]
+    assert row['vote_split'] == [{'policy_id': policy_id('Policy 3'), 'policy_name': 'Policy 3', 'strength': 0.5}]
+
+def test_create_person_single_transaction(mock_driver, sample_mp):
+    session = mock_driver.session.return_value.__enter__.return_value
+    session.execute_write.return_value = {'names': ['MP 1']}
+
+    name = database.create_person(mock_driver, sample_mp)
+
+    assert name == 'MP 1'
+    assert session.execute_write.call_count == 1
+    assert session.execute_write.call_args.args[0] is database.write_people_work
+    assert session.execute_write.call_args.kwargs['rows'] == [database.mp_to_row(sample_mp)]
+    policies = session.execute_write.call_args.kwargs['policies']
+    assert sorted(policy['name'] for policy in policies) == ['Policy 1', 'Policy 2', 'Policy 3']
+
+def test_create_person_writes_each_policy_once(mock_driver, sample_mp):
+    session = mock_driver.session.return_value.__enter__.return_value
+    catalogue = PolicyCatalogue()
+
+    database.create_person(mock_driver, sample_mp, catalogue=catalogue)
+    database.create_person(mock_driver, sample_mp, catalogue=catalogue)
+
+    policies = [call.kwargs['policies'] for call in session.execute_write.call_args_list]
+    assert len(policies[0]) == 3
+    assert policies[1] == []
+
+def test_create_person_failed_write_keeps_policies_pending(mock_driver, sample_mp):
+    session = mock_driver.session.return_value.__enter__.return_value
+    session.execute_write.side_effect = RuntimeError('write failed')
+    catalogue = PolicyCatalogue()
+
+    with pytest.raises(RuntimeError):
+        database.create_person(mock_driver, sample_mp, catalogue=catalogue)
+
+    assert len(catalogue.pending()) == 3
+
+def test_write_people_work_upserts_policies_first():
+    tx = MagicMock()
+    database.write_people_work(tx, policies=[{'id': 1, 'name': 'Policy 1'}], rows=[])
+
+    assert tx.run.call_count == 2
+    assert tx.run.call_args_list[0].kwargs['policies'] == [{'id': 1, 'name': 'Policy 1'}]
+
+def test_create_people_bulk_batches(mock_driver, sample_mp):
+    session = mock_driver.session.return_value.__enter__.return_value
+
+    stats = database.create_people_bulk(mock_driver, [sample_mp] * 5, batch_size=2)
+
+    # 5 MPs in batches of 2 -> 3 transactions
+    assert session.execute_write.call_count == 3
+    batch_sizes = [len(call.kwargs['rows']) for call in session.execute_write.call_args_list]
+    assert batch_sizes == [2, 2, 1]
+    assert stats['mps'] == 5
+    assert stats['votes'] == 15
+    # Each policy is only written with the first batch
+    assert stats['policies'] == 3
+    assert stats['rows'] == 23
+
+def test_apply_person_diff_work_only_writes_changes(sample_mp):
+    tx = MagicMock()
+    database.apply_person_diff_work(tx, sample_mp, attributes_changed=False,
+                                    added_votes=[('Policy 4', 'voted_for', 0.8)],
+                                    removed_votes=[('Policy 1', 'voted_for', 0.75)])
+
+    # One delete and one create, no MP node write
+    assert tx.run.call_count == 2
+    delete_kwargs = tx.run.call_args_list[0].kwargs
+    assert delete_kwargs['votes'] == [{'policy_id': policy_id('Policy 1'), 'type': 'VOTED_FOR', 'strength': 0.75}]
+    create_kwargs = tx.run.call_args_list[1].kwargs
+    assert create_kwargs['voted_for'] == [{'policy_id': policy_id('Policy 4'), 'policy_name': 'Policy 4', 'strength': 0.8}]
+
+def test_apply_person_diff_work_replaces_links(sample_mp):
+    tx = MagicMock()
+    sample_mp.party = 'New Party'
+    database.apply_person_diff_work(tx, sample_mp, attributes_changed=True, added_votes=[], removed_votes=[])
+
+    # The old Party, Region and Start_Date links are deleted before the current ones are merged
+    assert tx.run.call_count == 2
+    delete_query = tx.run.call_args_list[0].args[0]
+    assert 'IS_A_MEMBER_OF|REPRESENTS_REGION|JOINED_HOUSE' in delete_query and 'DELETE r' in delete_query
+    assert tx.run.call_args_list[0].kwargs == {'name': 'MP 1'}
+    assert tx.run.call_args_list[1].kwargs['party'] == 'New Party'
+
+def test_init_driver_applies_schema(mock_driver_connectivity):
+    Database.close_driver()
+    with patch('neo4j.GraphDatabase.driver', return_value=mock_driver_connectivity):
+        Database.init_driver('test_uri', 'test_username', 'test_password')
+
+    session = mock_driver_connectivity.session.return_value.__enter__.return_value
+    statements = [call.args[0] for call in session.run.call_args_list]
+    assert statements == [step for _, migration in database.SCHEMA_MIGRATIONS for step in migration
+                          if not callable(step)]
+    # Data migrations run in their own write transactions
+    assert database.merge_legacy_policies_work in [call.args[0] for call in session.execute_write.call_args_list]
+    assert session.execute_write.call_args.kwargs['version'] == database.SCHEMA_MIGRATIONS[-1][0]
+
+def test_policy_name_is_not_unique_from_migration_2():
+    steps = dict(database.SCHEMA_MIGRATIONS)[2]
+
+    # Legacy policies are merged by ID once names may repeat, before IDs are made unique
+    assert steps.index("DROP CONSTRAINT policy_name IF EXISTS") < steps.index(database.merge_legacy_policies_work)
+    assert "CREATE INDEX policy_name IF NOT EXISTS FOR (p:Policy) ON (p.name)" in steps
+    assert steps[-1].startswith("CREATE CONSTRAINT policy_id")
+
+def test_merge_legacy_policies_work_merges_spellings():
+    tx = MagicMock()
+    tx.run.side_effect = [[{'name': 'Foo'}, {'name': 'foo.'}, {'name': 'Bar'}],
+                          MagicMock(single=MagicMock(return_value={'merged': 3}))]
+
+    assert database.merge_legacy_policies_work(tx) == 3
+
+    # Both spellings get the ID of their normalised description, so they merge into one node
+    rows = tx.run.call_args_list[1].kwargs['rows']
+    assert rows == [{'name': 'Foo', 'id': policy_id('Foo')}, {'name': 'foo.', 'id': policy_id('Foo')},
+                    {'name': 'Bar', 'id': policy_id('Bar')}]
+    query = tx.run.call_args_list[1].args[0]
+    assert 'MERGE (p:Policy {id: row.id})' in query and 'DETACH DELETE legacy' in query
+
+def test_merge_legacy_policies_work_without_legacy_policies():
+    tx = MagicMock()
+    tx.run.return_value = []
+
+    assert database.merge_legacy_policies_work(tx) == 0
+    assert tx.run.call_count == 1
+
+def test_apply_schema_up_to_date(mock_driver_connectivity):
+    Database.close_driver()
+    session = mock_driver_connectivity.session.return_value.__enter__.return_value
+    session.execute_read.return_value = database.SCHEMA_MIGRATIONS[-1][0]
+    with patch('neo4j.GraphDatabase.driver', return_value=mock_driver_connectivity):
+        Database.init_driver('test_uri', 'test_username', 'test_password')
+
+    assert not session.run.called
+    assert not session.execute_write.called
+
+def test_init_driver_without_schema(mock_driver_connectivity):
+    Database.close_driver()
+    with patch('neo4j.GraphDatabase.driver', return_value=mock_driver_connectivity):
+        Database.init_driver('test_uri', 'test_username', 'test_password', apply_schema=False)
+
+    assert not mock_driver_connectivity.session.called
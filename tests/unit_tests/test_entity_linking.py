@@ -0,0 +1,111 @@
+from unittest.mock import MagicMock, patch
+import json
+import pytest
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+import entity_linking
+
+def test_get_label():
+    assert entity_linking.get_label([{'enLabel': 'human'}, {'enLabel': 'person'}]) == 'Person'
+    assert entity_linking.get_label([{'enLabel': 'human'}]) is None
+
+def test_wikifier_annotate():
+    response = {'annotations': [
+        {'title': 'Jane Smith', 'wikiDataClasses': [{'enLabel': 'person'}],
+         'support': [{'chFrom': 0, 'chTo': 9}]},
+        {'title': 'London', 'wikiDataClasses': [{'enLabel': 'city/town'}],
+         'support': [{'chFrom': 20, 'chTo': 25}, {'chFrom': 40, 'chTo': 45}]},
+        {'title': 'Walking', 'wikiDataClasses': [{'enLabel': 'activity'}], 'support': []},
+        {'title': 'Unclassified', 'support': []},
+    ]}
+    with patch('entity_linking.requests.post',
+               return_value=MagicMock(status_code=200, content=json.dumps(response).encode())) as mock_post:
+        entities = entity_linking.wikifier_annotate('text', threshold=0.5)
+
+    assert mock_post.call_args.kwargs['data']['pageRankSqThreshold'] == 0.5
+    assert entities == [{'title': 'Jane Smith', 'label': 'Person', 'characters': [(0, 9)]},
+                        {'title': 'London', 'label': 'Location', 'characters': [(20, 25), (40, 45)]}]
+
+def test_wikifier_annotate_error():
+    with patch('entity_linking.requests.post', return_value=MagicMock(status_code=500)):
+        assert entity_linking.wikifier_annotate('text') is None
+
+def test_chunks_split_at_paragraphs():
+    text = 'aaaa\nbbbb\ncccc dddd'
+
+    result = entity_linking.chunks(text, max_chars=7)
+
+    assert result == [(0, 'aaaa\n'), (5, 'bbbb\n'), (10, 'cccc '), (15, 'dddd')]
+    assert ''.join(chunk for _, chunk in result) == text
+    assert entity_linking.chunks('short', max_chars=11) == [(0, 'short')]
+
+def test_sentence_entities():
+    entities = [{'title': 'Jane Smith', 'label': 'Person', 'characters': [(0, 9), (30, 39)]},
+                {'title': 'Acme', 'label': 'Organisation', 'characters': [(22, 25)]}]
+
+    assert entity_linking.sentence_entities(entities, 28, 'Jane Smith resigned.') == \
+        [{'title': 'Jane Smith', 'label': 'Person', 'characters': [(2, 11)]}]
+
+def test_linker_links_chunks_with_document_offsets(tmp_path):
+    def annotate(text, threshold):
+        return [{'title': 'Acme', 'label': 'Organisation', 'characters': [(text.index('Acme'), text.index('Acme') + 3)]}]
+
+    with patch.dict(entity_linking.ANNOTATORS, {'test': annotate}):
+        linker = entity_linking.EntityLinker('test', cache_dir=str(tmp_path), max_chars=12)
+        entities = linker.link('Acme rose.\nAcme fell.')
+
+    assert entities == [{'title': 'Acme', 'label': 'Organisation', 'characters': [(0, 3), (11, 14)]}]
+
+def test_linker_caches_by_text_and_threshold(tmp_path):
+    annotate = MagicMock(return_value=[{'title': 'Acme', 'label': 'Organisation', 'characters': [(0, 3)]}])
+
+    with patch.dict(entity_linking.ANNOTATORS, {'test': annotate}):
+        linker = entity_linking.EntityLinker('test', threshold=0.8, cache_dir=str(tmp_path))
+        first = linker.annotate('Acme')
+        # A new linker, as in a later run, reads the cache written by the first
+        cached = entity_linking.EntityLinker('test', threshold=0.8, cache_dir=str(tmp_path))
+        second = cached.annotate('Acme')
+        entity_linking.EntityLinker('test', threshold=0.5, cache_dir=str(tmp_path)).annotate('Acme')
+
+    assert first == second == [{'title': 'Acme', 'label': 'Organisation', 'characters': [(0, 3)]}]
+    assert annotate.call_count == 2
+    assert (linker.misses, cached.hits) == (1, 1)
+
+def test_linker_does_not_cache_failures(tmp_path):
+    annotate = MagicMock(return_value=None)
+
+    with patch.dict(entity_linking.ANNOTATORS, {'test': annotate}):
+        linker = entity_linking.EntityLinker('test', cache_dir=str(tmp_path))
+        assert linker.link('Acme') == []
+        assert linker.annotate('Acme') is None
+
+    assert annotate.call_count == 2
+
+def test_linker_without_cache(tmp_path):
+    annotate = MagicMock(return_value=[])
+
+    with patch.dict(entity_linking.ANNOTATORS, {'test': annotate}):
+        linker = entity_linking.EntityLinker('test', cache_dir=None)
+        linker.annotate('Acme')
+        linker.annotate('Acme')
+
+    assert annotate.call_count == 2
+
+def test_linker_unknown_annotator():
+    with pytest.raises(ValueError):
+        entity_linking.EntityLinker('unknown')
+
+def test_local_annotate():
+    ents = [MagicMock(text='Jane Smith', label_='PERSON', start_char=0, end_char=10),
+            MagicMock(text='1999', label_='DATE', start_char=14, end_char=18),
+            MagicMock(text='Jane Smith', label_='PERSON', start_char=20, end_char=30)]
+    with patch('entity_linking.spacy') as mock_spacy, patch('entity_linking._local_pipeline', None):
+        mock_spacy.load.return_value.return_value.ents = ents
+        entities = entity_linking.local_annotate('text')
+
+    assert entities == [{'title': 'Jane Smith', 'label': 'Person', 'characters': [(0, 9), (20, 29)]}]
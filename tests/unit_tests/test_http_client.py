@@ -0,0 +1,187 @@
+import pytest
+import os
+import sys
+import time
+import requests
+from unittest.mock import MagicMock, patch
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+import http_client
+
+URL = 'https://www.theyworkforyou.com/mp/1/votes'
+
+def make_response(status_code=200, content=b'{"a": 1}', headers=None):
+    return MagicMock(status_code=status_code, content=content, headers=headers or {})
+
+@pytest.fixture
+def cache(tmp_path):
+    http_client.configure(cache_dir=str(tmp_path))
+    yield tmp_path
+    # Leave the cache disabled for the other tests
+    http_client.configure(enabled=False)
+
+def test_get_disabled_passes_through():
+    http_client.configure(enabled=False)
+    with patch('requests.Session.get', return_value=make_response()) as mock_get:
+        http_client.get(URL)
+        http_client.get(URL)
+
+    assert mock_get.call_count == 2
+
+def test_get_serves_cached_response(cache):
+    with patch('requests.Session.get', return_value=make_response()) as mock_get:
+        first = http_client.get(URL, params={'a': 1})
+        second = http_client.get(URL, params={'a': 1})
+
+    assert mock_get.call_count == 1
+    assert second.from_cache
+    assert second.content == first.content
+    assert second.json() == {'a': 1}
+
+def test_get_params_are_part_of_key(cache):
+    with patch('requests.Session.get', return_value=make_response()) as mock_get:
+        http_client.get(URL, params={'skip': 0})
+        http_client.get(URL, params={'skip': 20})
+
+    assert mock_get.call_count == 2
+
+def test_get_does_not_cache_errors(cache):
+    with patch('requests.Session.get', return_value=make_response(status_code=404)) as mock_get:
+        http_client.get(URL)
+        http_client.get(URL)
+
+    assert mock_get.call_count == 2
+
+def test_get_bypass(cache):
+    with patch('requests.Session.get', return_value=make_response()) as mock_get:
+        http_client.get(URL)
+        http_client.get(URL, bypass=True)
+
+    assert mock_get.call_count == 2
+
+def test_get_revalidates_expired_entry(cache):
+    http_client.configure(cache_dir=str(cache), ttls={URL: 0})
+    with patch('requests.Session.get', return_value=make_response(headers={'ETag': '"v1"'})):
+        http_client.get(URL)
+
+    with patch('requests.Session.get', return_value=make_response(status_code=304, content=b'')) as mock_get:
+        response = http_client.get(URL)
+
+    assert mock_get.call_args.kwargs['headers']['If-None-Match'] == '"v1"'
+    assert response.from_cache
+    assert response.content == b'{"a": 1}'
+
+def test_ttl_for_longest_prefix():
+    assert http_client.ttl_for('https://members-api.parliament.uk/api/Members/Search') == 24 * 60 * 60
+    assert http_client.ttl_for('https://members-api.parliament.uk/api/Members/1/LatestElectionResult') == 7 * 24 * 60 * 60
+    assert http_client.ttl_for('https://example.com') == http_client.DEFAULT_TTL
+
+def test_eviction_keeps_cache_bounded(cache):
+    http_client.configure(cache_dir=str(cache), max_bytes=250)
+    with patch('requests.Session.get', return_value=make_response(content=b'x' * 100)):
+        for i in range(5):
+            http_client.get(URL, params={'page': i})
+            time.sleep(0.01)
+
+    body_bytes = sum(os.path.getsize(os.path.join(cache, name)) for name in os.listdir(cache)
+                     if name.endswith('.body'))
+    assert body_bytes <= 250
+
+def test_refetched_entry_is_not_counted_twice(cache):
+    http_client.configure(cache_dir=str(cache), max_bytes=250)
+    with patch('requests.Session.get', return_value=make_response(content=b'x' * 100)):
+        for i in range(2):
+            http_client.get(URL, params={'page': i})
+        # Replacing a cached body leaves the cache size unchanged, so nothing is evicted
+        for _ in range(3):
+            http_client.get(URL, params={'page': 0}, bypass=True)
+
+    assert len([name for name in os.listdir(cache) if name.endswith('.body')]) == 2
+
+def test_get_retries_server_errors_honouring_retry_after():
+    http_client.configure(enabled=False)
+    responses = [make_response(status_code=429, headers={'Retry-After': '7'}),
+                 make_response(status_code=503),
+                 make_response()]
+    with patch('requests.Session.get', side_effect=responses) as mock_get, \
+         patch('time.sleep') as mock_sleep, \
+         patch('random.uniform', side_effect=lambda low, high: high):
+        response = http_client.get('https://retry.example.com/page')
+
+    assert response.status_code == 200
+    assert mock_get.call_count == 3
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [7, http_client.RETRY_BACKOFF_BASE * 2]
+    stats = http_client.get_stats()['retry.example.com']
+    assert stats['requests'] == 3
+    assert stats['retries'] == 2
+    assert stats['bytes'] == 3 * len(b'{"a": 1}')
+
+def test_get_gives_up_after_max_retries():
+    http_client.configure(enabled=False)
+    with patch('requests.Session.get', return_value=make_response(status_code=500)) as mock_get, \
+         patch('time.sleep'):
+        response = http_client.get('https://down.example.com/page')
+
+    assert response.status_code == 500
+    assert mock_get.call_count == http_client.MAX_RETRIES + 1
+    assert http_client.get_stats()['down.example.com']['errors'] == 1
+
+def test_get_retries_connection_errors_and_timeouts():
+    http_client.configure(enabled=False)
+    failures = [requests.ConnectionError('connection reset'), requests.Timeout('read timed out'), make_response()]
+    with patch('requests.Session.get', side_effect=failures) as mock_get, \
+         patch('time.sleep') as mock_sleep, \
+         patch('random.uniform', side_effect=lambda low, high: high):
+        response = http_client.get('https://flaky.example.com/page')
+
+    assert response.status_code == 200
+    assert mock_get.call_count == 3
+    assert mock_get.call_args.kwargs['timeout'] == http_client.REQUEST_TIMEOUT
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [http_client.RETRY_BACKOFF_BASE,
+                                                                    http_client.RETRY_BACKOFF_BASE * 2]
+    stats = http_client.get_stats()['flaky.example.com']
+    assert (stats['retries'], stats['errors']) == (2, 2)
+
+def test_get_raises_connection_error_after_max_retries():
+    http_client.configure(enabled=False)
+    with patch('requests.Session.get', side_effect=requests.ConnectionError('refused')) as mock_get, \
+         patch('time.sleep'):
+        with pytest.raises(requests.ConnectionError):
+            http_client.get('https://unreachable.example.com/page')
+
+    assert mock_get.call_count == http_client.MAX_RETRIES + 1
+
+def test_get_does_not_retry_other_request_errors():
+    http_client.configure(enabled=False)
+    with patch('requests.Session.get', side_effect=requests.exceptions.InvalidURL('bad url')) as mock_get, \
+         patch('time.sleep') as mock_sleep:
+        with pytest.raises(requests.exceptions.InvalidURL):
+            http_client.get('https://invalid.example.com/page')
+
+    assert mock_get.call_count == 1
+    assert not mock_sleep.called
+
+def test_host_clients_reuse_sessions():
+    assert http_client.host_client('pool.example.com') is http_client.host_client('pool.example.com')
+    assert http_client.host_client('pool.example.com').session is not http_client.host_client('other.example.com').session
+
+def test_configure_hosts_rate_limit():
+    http_client.configure_hosts(rate_limits={'limited.example.com': (2, 1)})
+    try:
+        assert http_client.host_client('limited.example.com').bucket.rate == 2
+        assert http_client.host_client('www.theyworkforyou.com').bucket is not None
+        assert http_client.host_client('unlimited.example.com').bucket is None
+    finally:
+        http_client.configure_hosts(rate_limits={host: None for host in http_client.HOST_RATE_LIMITS})
+
+def test_token_bucket_waits_when_empty():
+    with patch('time.sleep') as mock_sleep, patch('time.monotonic', side_effect=[0, 0, 0, 0.1]):
+        bucket = http_client.TokenBucket(rate=10, capacity=1)
+        assert bucket.acquire() == 0
+        waited = bucket.acquire()
+
+    assert waited == pytest.approx(0.1)
+    mock_sleep.assert_called_once()
@@ -0,0 +1,56 @@
+import pytest
+import os
+import sys
+from unittest.mock import MagicMock, patch
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+import http_client
+import http_fixtures
+import scraper
+
+URL = 'https://www.theyworkforyou.com/api/getMPs'
+twfy_api_response = b'[{"constituency": "Test Constituency", "name": "Test MP", "person_id": "1234"}]'
+
+@pytest.fixture
+def archive(tmp_path):
+    path = str(tmp_path / 'fixtures.jsonl.gz')
+    recorder = http_fixtures.start_recording(path)
+    response = MagicMock(status_code=200, content=twfy_api_response, headers={'Content-Type': 'application/json'})
+    with patch('requests.Session.get', return_value=response):
+        scraper.get_twfy_ids()
+    http_fixtures.stop_recording(recorder)
+    yield path
+    http_fixtures.stop_replay()
+
+def test_record_redacts_api_key(archive):
+    recorder = http_fixtures.FixtureReplayer(archive)
+    entry = list(recorder.responses.values())[0]
+
+    assert entry['url'] == URL
+    assert 'key' not in entry['params']
+
+def test_replay_serves_recording_without_network(archive):
+    http_fixtures.start_replay(archive)
+    with patch('requests.Session.get', side_effect=AssertionError('network used')):
+        result = scraper.get_twfy_ids()
+
+    assert result == {"test constituency": {"name": "Test MP", "twfy_id": "1234"}}
+
+def test_replay_unknown_request(archive):
+    replayer = http_fixtures.start_replay(archive)
+    response = http_client.get('https://www.theyworkforyou.com/mp/1/votes')
+
+    assert response.status_code == 404
+    assert replayer.misses == 1
+
+def test_replay_injected_errors_and_latency(archive):
+    http_fixtures.start_replay(archive, latency=0.5, error_rate=1.0, seed=1)
+    with patch('time.sleep') as mock_sleep:
+        response = http_client.get(URL, params={'key': 'abc', 'output': 'json'})
+
+    # Injected errors are retried like real ones, so every attempt gets the latency and an error
+    assert response.status_code == 503
+    assert mock_sleep.call_args_list[0].args[0] == 0.5
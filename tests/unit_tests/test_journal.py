@@ -0,0 +1,80 @@
+import json
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+from journal import Journal, FETCHED, PARSED, WRITTEN, FAILED
+
+def test_record_appends_lines(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = Journal.open(path)
+    journal.record(1, FETCHED, url='https://example.com', bytes=100)
+    journal.record(1, PARSED, votes=10)
+    journal.close()
+
+    with open(path) as f:
+        entries = [json.loads(line) for line in f]
+    assert [entry['stage'] for entry in entries] == [FETCHED, PARSED]
+    assert entries[0]['bytes'] == 100
+
+def test_resume_loads_completed_stages(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = Journal.open(path)
+    journal.record(1, FETCHED)
+    journal.record(1, PARSED)
+    journal.record(1, WRITTEN)
+    journal.record(2, FETCHED)
+    journal.close()
+
+    resumed = Journal.open(path, resume=True)
+
+    assert resumed.completed(1, WRITTEN)
+    assert resumed.completed(2, FETCHED)
+    assert not resumed.completed(2, WRITTEN)
+    assert not resumed.completed(3, FETCHED)
+
+def test_failure_invalidates_later_stages(tmp_path):
+    journal = Journal.open(str(tmp_path / 'journal.jsonl'))
+    journal.record(1, FETCHED)
+    journal.record(1, PARSED)
+    journal.record(1, WRITTEN)
+    journal.record(1, FAILED, during=PARSED)
+
+    assert journal.completed(1, FETCHED)
+    assert not journal.completed(1, PARSED)
+    assert not journal.completed(1, WRITTEN)
+
+def test_details_of_completed_stage(tmp_path):
+    journal = Journal.open(str(tmp_path / 'journal.jsonl'))
+    journal.record(1, PARSED, votes=[['Policy 1', 'voted_for', 0.75]])
+    journal.record(2, PARSED, votes=[])
+    journal.record(2, FAILED, during=PARSED)
+
+    assert journal.details(1, PARSED)['votes'] == [['Policy 1', 'voted_for', 0.75]]
+    assert journal.details(1, WRITTEN) is None
+    assert journal.details(2, PARSED) is None
+
+def test_resume_ignores_truncated_line(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    with open(path, 'w') as f:
+        f.write(json.dumps({'mp': '1', 'stage': WRITTEN, 'time': 0}) + '\n')
+        f.write('{"mp": "2", "stage": "writ')
+
+    resumed = Journal.open(path, resume=True)
+
+    assert resumed.completed(1, WRITTEN)
+    assert not resumed.completed(2, WRITTEN)
+
+def test_open_without_resume_starts_new_journal(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = Journal.open(path)
+    journal.record(1, WRITTEN)
+    journal.close()
+
+    journal = Journal.open(path)
+
+    assert not journal.completed(1, WRITTEN)
+    assert os.path.getsize(path) == 0
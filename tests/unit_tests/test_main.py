@@ -0,0 +1,339 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+import main
+from journal import Journal, PARSED, WRITTEN
+from person import MP
+
+constituency_region_dict = {'constituency 1': 'London', 'constituency 2': 'Wales'}
+twfy_dict = {'constituency 1': {'name': 'MP 1', 'twfy_id': 1},
+             'constituency 2': {'name': 'MP 2', 'twfy_id': 2}}
+govt_post_dict = {1: 'Test Post'}
+votes = [('Policy 1', 'voted_for', 0.75)]
+
+@pytest.fixture
+def mp_instance():
+    yield MP(1, 'MP 1', 'Party', 'Constituency 1', 'M', '2022-01-01')
+
+def test_process_mp(mp_instance):
+    with patch.object(MP, 'set_election_result'), \
+         patch('scraper.fetch_mp_votes_page', return_value=b''), \
+         patch('scraper.parse_mp_votes', return_value=votes), \
+         patch('main.create_person') as mock_create_person:
+        mp = main.process_mp('driver', mp_instance, constituency_region_dict, twfy_dict, govt_post_dict)
+
+    assert mp.region == 'London'
+    assert mp.twfy_id == 1
+    assert mp.govt_post == 'Test Post'
+    assert mp.votes == votes
+    mock_create_person.assert_called_once_with('driver', mp_instance, catalogue=None)
+
+def test_process_mp_votes_failure_still_writes(mp_instance):
+    with patch.object(MP, 'set_election_result'), \
+         patch('scraper.fetch_mp_votes_page', side_effect=Exception('TWFY down')), \
+         patch('main.create_person') as mock_create_person:
+        mp = main.process_mp('driver', mp_instance, constituency_region_dict, twfy_dict, govt_post_dict)
+
+    assert mp.votes == []
+    mock_create_person.assert_called_once_with('driver', mp_instance, catalogue=None)
+
+def test_main_isolates_mp_failures(tmp_path):
+    mp_dict = {'constituency 1': MP(1, 'MP 1', 'Party', 'Constituency 1', 'M', '2022-01-01'),
+               'constituency 2': MP(2, 'MP 2', 'Party', 'Constituency 2', 'F', '2022-01-01'),
+               'constituency 3': MP(3, 'MP 3', 'Party', 'Constituency 3', 'F', '2022-01-01')}
+
+    with patch('main.Database.init_driver', return_value=MagicMock()), \
+         patch('scraper.scrape_constituency_regions', return_value=constituency_region_dict), \
+         patch('scraper.get_twfy_ids', return_value=twfy_dict), \
+         patch('scraper.get_govt_posts_from_members_api', return_value=govt_post_dict), \
+         patch('main.iter_mps_from_members_api', return_value=iter(mp_dict.values())), \
+         patch.object(MP, 'set_election_result'), \
+         patch('scraper.fetch_mp_votes_page', return_value=b''), \
+         patch('scraper.parse_mp_votes', return_value=votes), \
+         patch('main.create_person') as mock_create_person, \
+         patch('main.refresh_aggregates') as mock_refresh_aggregates:
+        # 'constituency 3' has no region so raises a KeyError, which must not stop the other MPs
+        main.main(workers=4, journal_path=str(tmp_path / 'journal.jsonl'))
+
+    written = sorted(call.args[1].id for call in mock_create_person.call_args_list)
+    assert written == [1, 2]
+    # Aggregates are refreshed once, after all MPs are written
+    assert mock_refresh_aggregates.call_count == 1
+
+def test_parse_args_workers():
+    args = main.parse_args(['--workers', '16'])
+
+    assert args.workers == 16
+
+def test_main_bulk_writes_in_batches(tmp_path):
+    mp_dict = {'constituency 1': MP(1, 'MP 1', 'Party', 'Constituency 1', 'M', '2022-01-01'),
+               'constituency 2': MP(2, 'MP 2', 'Party', 'Constituency 2', 'F', '2022-01-01')}
+
+    with patch('main.Database.init_driver', return_value=MagicMock()), \
+         patch('scraper.scrape_constituency_regions', return_value=constituency_region_dict), \
+         patch('scraper.get_twfy_ids', return_value=twfy_dict), \
+         patch('scraper.get_govt_posts_from_members_api', return_value=govt_post_dict), \
+         patch('main.iter_mps_from_members_api', return_value=iter(mp_dict.values())), \
+         patch.object(MP, 'set_election_result'), \
+         patch('scraper.fetch_mp_votes_page', return_value=b''), \
+         patch('scraper.parse_mp_votes', return_value=votes), \
+         patch('main.create_person') as mock_create_person, \
+         patch('main.create_people_bulk') as mock_create_people_bulk:
+        mock_create_people_bulk.return_value = {'mps': 1, 'votes': 1, 'policies': 1, 'rows': 3, 'seconds': 0.5,
+                                                'rows_per_second': 6.0}
+        stats = main.main(workers=2, bulk=True, batch_size=1, journal_path=str(tmp_path / 'journal.jsonl'),
+                          aggregate=False)
+
+    assert not mock_create_person.called
+    assert mock_create_people_bulk.call_count == 2
+    # The counts of every batch are totalled
+    assert stats['bulk'] == {'mps': 2, 'votes': 2, 'policies': 2, 'rows': 6, 'seconds': 1.0, 'rows_per_second': 6.0}
+    assert stats['stages'] is None
+
+def test_process_mp_incremental_uses_sync_state(mp_instance):
+    state = MagicMock()
+    with patch.object(MP, 'set_election_result'), \
+         patch('scraper.fetch_mp_votes_page', return_value=b''), \
+         patch('scraper.parse_mp_votes', return_value=votes), \
+         patch('main.sync_person') as mock_sync_person, \
+         patch('main.create_person') as mock_create_person:
+        main.process_mp('driver', mp_instance, constituency_region_dict, twfy_dict, govt_post_dict, state=state)
+
+    mock_sync_person.assert_called_once_with('driver', state, mp_instance, catalogue=None)
+    assert not mock_create_person.called
+
+def test_process_mp_incremental_votes_failure_full_write(mp_instance):
+    with patch.object(MP, 'set_election_result'), \
+         patch('scraper.fetch_mp_votes_page', side_effect=Exception('TWFY down')), \
+         patch('main.sync_person') as mock_sync_person, \
+         patch('main.create_person') as mock_create_person:
+        main.process_mp('driver', mp_instance, constituency_region_dict, twfy_dict, govt_post_dict, state=MagicMock())
+
+    assert not mock_sync_person.called
+    mock_create_person.assert_called_once_with('driver', mp_instance, catalogue=None)
+
+def test_stream_mps_processes_all_stages():
+    mps = [MP(1, 'MP 1', 'Party', 'Constituency 1', 'M', '2022-01-01'),
+           MP(2, 'MP 2', 'Party', 'Constituency 2', 'F', '2022-01-01'),
+           MP(3, 'MP 3', 'Party', 'Constituency 3', 'F', '2022-01-01')]
+
+    with patch.object(MP, 'set_election_result'), \
+         patch('scraper.fetch_mp_votes_page', return_value=b'<html></html>'), \
+         patch('scraper.parse_mp_votes', return_value=votes), \
+         patch('main.create_person') as mock_create_person:
+        # 'constituency 3' has no TWFY ID so is dropped by the fetch stage
+        stats = main.stream_mps('driver', iter(mps), constituency_region_dict, twfy_dict, govt_post_dict,
+                                workers=2, queue_size=1)
+
+    written = sorted(call.args[1].id for call in mock_create_person.call_args_list)
+    assert written == [1, 2]
+    assert mps[0].votes == votes
+    assert mps[0].govt_post == 'Test Post'
+    assert stats['fetch']['failed'] == 1
+    assert stats['write']['processed'] == 2
+
+def test_stream_mps_bulk_flushes_last_batch():
+    mps = [MP(i, f'MP {i}', 'Party', 'Constituency 1', 'M', '2022-01-01') for i in range(5)]
+
+    with patch.object(MP, 'set_election_result'), \
+         patch('scraper.fetch_mp_votes_page', side_effect=Exception('TWFY unavailable')), \
+         patch('main.create_people_bulk') as mock_create_people_bulk:
+        main.stream_mps('driver', iter(mps), constituency_region_dict, twfy_dict, govt_post_dict,
+                        workers=2, bulk=True, batch_size=2)
+
+    batch_sizes = [len(call.args[1]) for call in mock_create_people_bulk.call_args_list]
+    assert batch_sizes == [2, 2, 1]
+
+def run_main(journal_path, resume=False, votes_side_effect=None):
+    mp_dict = {'constituency 1': MP(1, 'MP 1', 'Party', 'Constituency 1', 'M', '2022-01-01'),
+               'constituency 2': MP(2, 'MP 2', 'Party', 'Constituency 2', 'F', '2022-01-01')}
+
+    with patch('main.Database.init_driver', return_value=MagicMock()), \
+         patch('scraper.scrape_constituency_regions', return_value=constituency_region_dict), \
+         patch('scraper.get_twfy_ids', return_value=twfy_dict), \
+         patch('scraper.get_govt_posts_from_members_api', return_value=govt_post_dict), \
+         patch('main.iter_mps_from_members_api', return_value=iter(mp_dict.values())), \
+         patch.object(MP, 'set_election_result'), \
+         patch('scraper.fetch_mp_votes_page', return_value=b'', side_effect=votes_side_effect), \
+         patch('scraper.parse_mp_votes', return_value=votes), \
+         patch('main.create_person') as mock_create_person:
+        main.main(workers=1, resume=resume, journal_path=journal_path, aggregate=False)
+    return sorted(call.args[1].id for call in mock_create_person.call_args_list)
+
+def test_main_resume_retries_only_failed_mps(tmp_path):
+    journal_path = str(tmp_path / 'journal.jsonl')
+
+    def fail_for_mp_2(twfy_id):
+        if twfy_id == 2:
+            raise Exception('TWFY timeout')
+        return b''
+
+    # MP 2 is written without its votes, so is not journalled as written
+    assert run_main(journal_path, votes_side_effect=fail_for_mp_2) == [1, 2]
+    assert run_main(journal_path, resume=True) == [2]
+    # Everything is now written, so a second resume has nothing left to do
+    assert run_main(journal_path, resume=True) == []
+    # Without --resume the journal is started again
+    assert run_main(journal_path) == [1, 2]
+
+def test_main_resume_reuses_parsed_votes(tmp_path):
+    journal_path = str(tmp_path / 'journal.jsonl')
+    journal = Journal.open(journal_path)
+    # MP 1 was parsed but not written before the run died
+    journal.record(1, PARSED, votes=[['Policy 9', 'voted_against', 0.5]])
+    journal.record(2, WRITTEN)
+    journal.close()
+    mps = [MP(1, 'MP 1', 'Party', 'Constituency 1', 'M', '2022-01-01'),
+           MP(2, 'MP 2', 'Party', 'Constituency 2', 'F', '2022-01-01')]
+
+    with patch('main.Database.init_driver', return_value=MagicMock()), \
+         patch('scraper.scrape_constituency_regions', return_value=constituency_region_dict), \
+         patch('scraper.get_twfy_ids', return_value=twfy_dict), \
+         patch('scraper.get_govt_posts_from_members_api', return_value=govt_post_dict), \
+         patch('main.iter_mps_from_members_api', return_value=iter(mps)), \
+         patch.object(MP, 'set_election_result'), \
+         patch('scraper.fetch_mp_votes_page') as mock_fetch, \
+         patch('main.create_person') as mock_create_person:
+        main.main(workers=1, resume=True, journal_path=journal_path, aggregate=False)
+
+    mock_fetch.assert_not_called()
+    written = mock_create_person.call_args.args[1]
+    assert (written.id, written.votes) == (1, [('Policy 9', 'voted_against', 0.5)])
+    assert Journal.open(journal_path, resume=True).completed(1, WRITTEN)
+
+def test_main_saves_incremental_state_when_run_fails(tmp_path, mp_instance):
+    state_path = str(tmp_path / 'state.json')
+
+    def write_then_fail(driver, mps, *args, state=None, journal=None, **kwargs):
+        state.record(mp_instance)
+        journal.record(mp_instance.id, WRITTEN)
+        raise RuntimeError('Neo4j unavailable')
+
+    with patch('main.Database.init_driver', return_value=MagicMock()), \
+         patch('scraper.scrape_constituency_regions', return_value=constituency_region_dict), \
+         patch('scraper.get_twfy_ids', return_value=twfy_dict), \
+         patch('scraper.get_govt_posts_from_members_api', return_value=govt_post_dict), \
+         patch('main.iter_mps_from_members_api', return_value=iter([])), \
+         patch('main.pool_mps', side_effect=write_then_fail):
+        with pytest.raises(RuntimeError):
+            main.main(workers=1, incremental=True, state_path=state_path,
+                      journal_path=str(tmp_path / 'journal.jsonl'), aggregate=False)
+
+    # The MP journalled as written must also have its state saved, or a resumed run would skip it with stale state
+    with open(state_path) as f:
+        assert str(mp_instance.id) in json.load(f)
+
+def test_write_bulk_batch_journals_written_mps(tmp_path, mp_instance):
+    journal = Journal.open(str(tmp_path / 'journal.jsonl'))
+    other_mp = MP(2, 'MP 2', 'Party', 'Constituency 2', 'F', '2022-01-01')
+    main.record(journal, mp_instance, 'parsed', votes=1)
+
+    with patch('main.create_people_bulk'):
+        main.write_bulk_batch('driver', [mp_instance, other_mp], 2, journal=journal)
+
+    assert journal.completed(mp_instance.id, WRITTEN)
+    # MP 2's votes were never parsed
+    assert not journal.completed(other_mp.id, WRITTEN)
+
+def write_previous_journal(tmp_path):
+    journal_path = str(tmp_path / 'journal.jsonl')
+    journal = Journal.open(journal_path)
+    journal.record(1, WRITTEN)
+    journal.close()
+    with open(journal_path) as f:
+        return journal_path, f.read()
+
+def test_main_snapshot_only_skips_neo4j(tmp_path):
+    # The journal of an earlier Neo4j run is kept for resuming it
+    journal_path, previous_journal = write_previous_journal(tmp_path)
+    mp_dict = {'constituency 1': MP(1, 'MP 1', 'Party', 'Constituency 1', 'M', '2022-01-01'),
+               'constituency 3': MP(3, 'MP 3', 'Party', 'Constituency 3', 'F', '2022-01-01')}
+
+    with patch('main.Database.init_driver') as mock_init_driver, \
+         patch('scraper.scrape_constituency_regions', return_value=constituency_region_dict), \
+         patch('scraper.get_twfy_ids', return_value=twfy_dict), \
+         patch('scraper.get_govt_posts_from_members_api', return_value=govt_post_dict), \
+         patch('main.iter_mps_from_members_api', return_value=iter(mp_dict.values())), \
+         patch.object(MP, 'set_election_result'), \
+         patch('scraper.fetch_mp_votes_page', return_value=b''), \
+         patch('scraper.parse_mp_votes', return_value=votes), \
+         patch('main.create_person') as mock_create_person, \
+         patch('main.refresh_aggregates') as mock_refresh_aggregates, \
+         patch('main.require_pyarrow'), \
+         patch('main.write_snapshot') as mock_write_snapshot:
+        main.main(workers=2, journal_path=journal_path, snapshot_only=True)
+
+    assert not mock_init_driver.called
+    assert not mock_create_person.called
+    assert not mock_refresh_aggregates.called
+    # 'constituency 3' failed to enrich so is left out of the snapshot
+    snapshot_mps = mock_write_snapshot.call_args.args[0]
+    assert [mp.id for mp in snapshot_mps] == [1]
+    assert snapshot_mps[0].votes == votes
+    assert mock_write_snapshot.call_args.kwargs['snapshot_dir'] == main.DEFAULT_SNAPSHOT_DIR
+    with open(journal_path) as f:
+        assert f.read() == previous_journal
+
+@pytest.mark.parametrize('kwargs', [{'snapshot_only': True}, {'snapshot_dir': 'snapshots'}])
+def test_main_snapshot_without_pyarrow_fails_first(tmp_path, kwargs):
+    with patch('main.require_pyarrow', side_effect=ImportError('pyarrow')), \
+         patch('main.Database.init_driver') as mock_init_driver, \
+         patch('scraper.scrape_constituency_regions') as mock_scrape, \
+         patch('main.iter_mps_from_members_api') as mock_iter_mps:
+        with pytest.raises(ImportError):
+            main.main(journal_path=str(tmp_path / 'journal.jsonl'), **kwargs)
+
+    assert not mock_init_driver.called
+    assert not mock_scrape.called
+    assert not mock_iter_mps.called
+
+def test_main_bulk_import_skips_neo4j(tmp_path):
+    journal_path, previous_journal = write_previous_journal(tmp_path)
+    mp_dict = {'constituency 1': MP(1, 'MP 1', 'Party', 'Constituency 1', 'M', '2022-01-01'),
+               'constituency 3': MP(3, 'MP 3', 'Party', 'Constituency 3', 'F', '2022-01-01')}
+
+    with patch('main.Database.init_driver') as mock_init_driver, \
+         patch('scraper.scrape_constituency_regions', return_value=constituency_region_dict), \
+         patch('scraper.get_twfy_ids', return_value=twfy_dict), \
+         patch('scraper.get_govt_posts_from_members_api', return_value=govt_post_dict), \
+         patch('main.iter_mps_from_members_api', return_value=iter(mp_dict.values())), \
+         patch.object(MP, 'set_election_result'), \
+         patch('scraper.fetch_mp_votes_page', return_value=b''), \
+         patch('scraper.parse_mp_votes', return_value=votes), \
+         patch('main.create_person') as mock_create_person, \
+         patch('main.refresh_aggregates') as mock_refresh_aggregates, \
+         patch('main.BulkImportWriter') as mock_writer:
+        mock_writer.return_value.command.return_value = 'neo4j-admin database import full neo4j'
+        stats = main.main(workers=2, journal_path=journal_path, bulk_import_dir=str(tmp_path / 'import'))
+
+    assert not mock_init_driver.called
+    assert not mock_create_person.called
+    assert not mock_refresh_aggregates.called
+    mock_writer.assert_called_once_with(str(tmp_path / 'import'))
+    # 'constituency 3' failed to enrich so is left out of the import files
+    assert [call.args[0].id for call in mock_writer.return_value.add.call_args_list] == [1]
+    assert mock_writer.return_value.close.called
+    assert stats['bulk_import_command'] == 'neo4j-admin database import full neo4j'
+    with open(journal_path) as f:
+        assert f.read() == previous_journal
+
+@pytest.mark.parametrize('kwargs', [{'snapshot_only': True}, {'bulk_import_dir': 'import'}])
+def test_main_offline_cannot_resume(tmp_path, kwargs):
+    with patch('main.require_pyarrow'), \
+         patch('scraper.scrape_constituency_regions') as mock_scrape:
+        with pytest.raises(ValueError):
+            main.main(resume=True, journal_path=str(tmp_path / 'journal.jsonl'), **kwargs)
+
+    assert not mock_scrape.called
+
+@pytest.mark.parametrize('argv', [['--resume', '--snapshot-only'], ['--resume', '--bulk-import']])
+def test_parse_args_rejects_offline_resume(argv):
+    with pytest.raises(SystemExit):
+        main.parse_args(argv)
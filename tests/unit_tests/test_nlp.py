@@ -0,0 +1,372 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import itertools
+import numpy as np
+import pytest
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+import nlp
+from corpus import CorpusStore
+
+class Span(list):
+    """
+    Stand-in for a spaCy Span, a list of tokens.
+    """
+    @property
+    def text(self):
+        return ''.join(t.text + t.whitespace_ for t in self[:-1]) + self[-1].text
+
+class Doc(object):
+    """
+    Stand-in for a coreference resolved spaCy Doc, built from (text, whitespace) words and
+    clusters of (start, end) word index mentions.
+    """
+    def __init__(self, words, clusters):
+        self.tokens, idx = [], 0
+        for i, (text, whitespace) in enumerate(words):
+            self.tokens.append(SimpleNamespace(text=text, whitespace_=whitespace, text_with_ws=text + whitespace,
+                                               i=i, idx=idx))
+            idx += len(text) + len(whitespace)
+        self.spans = {f'coref_clusters_{i}': [Span(self.tokens[start:end]) for start, end in cluster]
+                      for i, cluster in enumerate(clusters)}
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+@pytest.fixture(autouse=True)
+def reset_models():
+    nlp._models = None
+    nlp._linker = None
+    yield
+    nlp._models = None
+    nlp._linker = None
+
+def test_resolve_references():
+    words = [('Jane', ' '), ('Smith', ' '), ('said', ' '), ('she', ' '), ('would', ' '), ('go', '.')]
+    doc = Doc(words, [[(0, 2), (3, 4)]])
+
+    assert nlp.resolve_references(doc) == 'Jane Smith said Jane Smith would go.'
+
+def test_resolve_references_multi_token_mention():
+    words = [('Jane', ' '), ('Smith', ''), ('.', ' '), ('The', ' '), ('MP', ' '), ('resigned', ''), ('.', '')]
+    doc = Doc(words, [[(0, 2), (3, 5)]])
+
+    assert nlp.resolve_references(doc) == 'Jane Smith. Jane Smith resigned.'
+
+def test_resolve_references_long_document():
+    words = [('Jane', ' '), ('Smith', ' '), ('said', ' ')] + [('she', ' '), ('said', ' ')] * 50000
+    clusters = [[(0, 2)] + [(3 + 2 * i, 4 + 2 * i) for i in range(50000)]]
+    doc = Doc(words, clusters)
+
+    resolved = nlp.resolve_references(doc)
+
+    assert resolved.count('Jane Smith') == 50001
+    assert 'she' not in resolved
+
+class Coreference(object):
+    """
+    Stand-in for a spaCy coreference pipeline, resolving 'she' to the first word pair of each text.
+    Texts containing 'crash' fail the pipe's batch, and those containing 'invalid' also fail alone.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        if 'invalid' in text:
+            raise ValueError(text)
+        words = [(word, ' ') for word in text.split(' ')]
+        mentions = [(i, i + 1) for i, (word, _) in enumerate(words) if word == 'she']
+        return Doc(words, [[(0, 2)] + mentions])
+
+    def pipe(self, texts, as_tuples, batch_size, n_process):
+        self.calls.append((as_tuples, batch_size, n_process))
+        for batch in iter(lambda: list(itertools.islice(texts, batch_size)), []):
+            if any('crash' in text or 'invalid' in text for text, _ in batch):
+                raise ValueError('batch failed')
+            for text, context in batch:
+                yield self(text), context
+
+def test_resolve_biographies():
+    biographies = [('Jane Smith', 'Jane Smith said she would'), ('Ann Jones', 'Ann Jones and she')]
+    coreference = Coreference()
+    stats = {}
+
+    resolved = list(nlp.resolve_biographies(iter(biographies), coreference, batch_size=4, n_process=2, stats=stats))
+
+    assert resolved == [('Jane Smith', 'Jane Smith said Jane Smith would '), ('Ann Jones', 'Ann Jones and Ann Jones ')]
+    assert coreference.calls == [(True, 4, 2)]
+    assert stats['coreference_tokens'] == 9
+    assert stats['coreference_seconds'] >= 0
+
+def test_resolve_biographies_skips_failed_documents():
+    biographies = [('MP 1', 'MP 1 said she'), ('MP 2', 'MP 2 crash she'), ('MP 3', 'MP 3 invalid she'),
+                   ('MP 4', 'MP 4 said she'), ('MP 5', 'MP 5 said she')]
+    coreference = Coreference()
+    stats = {}
+
+    with patch('traceback.print_exc'):
+        resolved = list(nlp.resolve_biographies(iter(biographies), coreference, batch_size=2, stats=stats))
+
+    # The failed batches are resolved one document at a time, and the pipe restarted after each
+    assert resolved == [('MP 1', 'MP 1 said MP 1 '), ('MP 2', 'MP 2 crash MP 2 '), ('MP 4', 'MP 4 said MP 4 '),
+                        ('MP 5', 'MP 5 said MP 5 ')]
+    assert stats['failed'] == 1
+    assert len(coreference.calls) == 3
+    assert stats['coreference_tokens'] == 16
+
+def test_resolve_biographies_skips_unresolvable_documents():
+    biographies = [('MP 1', 'MP 1 said she'), ('MP 2', 'MP 2 said she')]
+    stats = {}
+
+    with patch('nlp.resolve_references', side_effect=[ValueError('failed'), 'MP 2 said MP 2']), \
+         patch('traceback.print_exc'):
+        resolved = list(nlp.resolve_biographies(iter(biographies), Coreference(), stats=stats))
+
+    assert resolved == [('MP 2', 'MP 2 said MP 2')]
+    assert stats['failed'] == 1
+
+def test_resolve_biographies_raises_if_pipe_cannot_start():
+    coreference = Coreference()
+    coreference.pipe = MagicMock(side_effect=RuntimeError('no model'))
+
+    with pytest.raises(RuntimeError):
+        list(nlp.resolve_biographies(iter([('MP 1', 'MP 1 said she')]), coreference))
+
+def test_timed():
+    stats = {'seconds': 0.0}
+
+    assert list(nlp.timed(iter([1, 2]), stats, 'seconds')) == [1, 2]
+    assert stats['seconds'] > 0
+
+def test_fetch_biography(tmp_path):
+    with CorpusStore(str(tmp_path)) as store:
+        store.add('Jane Smith', 7, 'Jane Smith is an MP.\n== References ==\nCitation')
+
+        assert nlp.fetch_biography(store, 'Jane Smith', offline=True) == ('Jane Smith. Jane Smith is an MP.\n', 7)
+        assert nlp.fetch_biography(store, 'Ann Jones', offline=True) is None
+
+def test_fetch_biographies_skips_missing_articles():
+    def fetch_biography(store, mp_name, offline, refresh):
+        if mp_name == 'MP 3':
+            raise ValueError('failed')
+        return None if mp_name == 'MP 2' else (f'{mp_name}. Biography', 1)
+
+    with patch('nlp.fetch_biography', side_effect=fetch_biography):
+        biographies = list(nlp.fetch_biographies(['MP 1', 'MP 2', 'MP 3', 'MP 4'], 'store', workers=2))
+
+    assert biographies == [('MP 1', 'MP 1. Biography', 1), ('MP 4', 'MP 4. Biography', 1)]
+
+def test_relation_type():
+    assert nlp.relation_type('per:employee_of') == 'EMPLOYEE_OF'
+
+def test_get_models_loads_once():
+    with patch('nlp.Models.load', return_value='models') as mock_load:
+        assert nlp.get_models() == 'models'
+        assert nlp.get_models() == 'models'
+
+    assert mock_load.call_count == 1
+
+def test_init_worker_loads_models():
+    with patch('nlp.Models.load', return_value='models'), patch('nlp.torch') as mock_torch:
+        nlp.init_worker(torch_threads=2, annotator='local', entity_cache_dir=None)
+
+    mock_torch.set_num_threads.assert_called_once_with(2)
+    assert nlp._models == 'models'
+    assert (nlp._linker.annotator, nlp._linker.cache_dir) == ('local', None)
+
+def test_strip_punctuation():
+    text = 'Smith, J. worked for "Acme".'
+    entities = [{'title': 'J Smith', 'label': 'Person', 'characters': [(0, 8)]},
+                {'title': 'Acme', 'label': 'Organisation', 'characters': [(21, 26)]},
+                {'title': 'Quote', 'label': 'Organisation', 'characters': [(27, 27)]}]
+
+    stripped, result = nlp.strip_punctuation(text, entities)
+
+    assert stripped == 'Smith J worked for Acme'
+    assert [(e['title'], e['characters']) for e in result] == [('J Smith', [(0, 6)]), ('Acme', [(19, 22)])]
+    assert [stripped[start:end + 1] for start, end in result[1]['characters']] == ['Acme']
+
+def test_default_workers():
+    assert nlp.default_workers() >= 1
+
+class Tensor(object):
+    """
+    Stand-in for the parts of a torch Tensor used by `infer_relations`.
+    """
+    def __init__(self, array):
+        self.array = np.asarray(array)
+
+    def to(self, device):
+        return self
+
+    def max(self, dim):
+        return Tensor(self.array.max(axis=dim)), Tensor(self.array.argmax(axis=dim))
+
+    def tolist(self):
+        return self.array.tolist()
+
+fake_torch = SimpleNamespace(no_grad=nullcontext,
+                             cat=lambda tensors, dim: Tensor(np.concatenate([t.array for t in tensors], axis=dim)))
+
+class RelationModel(object):
+    """
+    Stand-in for an opennre model, whose probabilities of each relation are given by the text
+    of each pair.
+    """
+    id2rel = {0: 'NA', 1: 'per:employee_of', 2: 'per:title'}
+
+    def __init__(self, probabilities):
+        self.probabilities = probabilities
+        self.batches = []
+        self.sentence_encoder = SimpleNamespace(tokenize=self.tokenize)
+
+    def tokenize(self, item):
+        return (Tensor([[list(self.probabilities).index(item['text'])]]), Tensor([[1]]))
+
+    def eval(self):
+        pass
+
+    def parameters(self):
+        return iter([SimpleNamespace(device='cpu')])
+
+    def forward(self, tokens, mask):
+        self.batches.append(len(tokens.array))
+        return Tensor([self.probabilities[list(self.probabilities)[i]] for i in tokens.array[:, 0]])
+
+    def softmax(self, logits):
+        return logits
+
+def test_candidate_pairs():
+    sentence = 'Jane Smith worked for Acme'
+    entities = [{'title': 'Jane Smith', 'label': 'Person', 'characters': [(0, 9), (5, 9)]},
+                {'title': 'Acme', 'label': 'Organisation', 'characters': [(22, 25)]},
+                {'title': 'Labour', 'label': 'Party', 'characters': [(22, 25)]}]
+
+    pairs = nlp.candidate_pairs(sentence, entities, 'Jane Smith')
+
+    # The second MP mention does not match the MP's name and parties are not targets
+    assert pairs == [(entities[1], {'text': sentence, 'h': {'pos': [0, 10]}, 't': {'pos': [22, 26]}})]
+
+def test_infer_relations_batches():
+    model = RelationModel({'a': [0.1, 0.9, 0.0], 'b': [0.8, 0.1, 0.1], 'c': [0.0, 0.2, 0.8]})
+    items = [{'text': text} for text in 'abcab']
+
+    with patch('nlp.torch', fake_torch):
+        results = nlp.infer_relations(model, items, batch_size=2)
+
+    assert model.batches == [2, 2, 1]
+    assert [relation for relation, _ in results] == ['per:employee_of', 'NA', 'per:title', 'per:employee_of', 'NA']
+    assert [score for _, score in results] == pytest.approx([0.9, 0.8, 0.8, 0.9, 0.8])
+
+def test_infer_relations_without_items():
+    assert nlp.infer_relations(None, []) == []
+
+def test_nlp_pipeline():
+    text = 'Jane Smith worked for Acme. Jane Smith was a Minister.'
+    sentences = [SimpleNamespace(text='Jane Smith worked for Acme.', start_char=0),
+                 SimpleNamespace(text='Jane Smith was a Minister.', start_char=28)]
+    models = SimpleNamespace(tokeniser=lambda text: MagicMock(sents=sentences, __len__=lambda self: 11),
+                             relation_model=RelationModel({'Jane Smith worked for Acme': [0.1, 0.9, 0.0],
+                                                           'Jane Smith was a Minister': [0.1, 0.1, 0.8]}))
+    linker = MagicMock()
+    linker.link.return_value = [{'title': 'Jane Smith', 'label': 'Person', 'characters': [(0, 9), (28, 37)]},
+                                {'title': 'Acme', 'label': 'Organisation', 'characters': [(22, 25)]},
+                                {'title': 'Minister', 'label': 'Organisation', 'characters': [(45, 52)]}]
+
+    stats = {}
+    with patch('nlp.torch', fake_torch):
+        result = nlp.nlp_pipeline(text, 'Jane Smith', models, batch_size=8, stats=stats, linker=linker)
+
+    # The biography is linked once, both sentences' pairs are extracted in one batch,
+    # and per:title relations are dropped
+    linker.link.assert_called_once_with(text)
+    assert models.relation_model.batches == [2]
+    assert result == ({'Acme': 'Organisation'},
+                      [{'source': 'Jane Smith', 'target': 'Acme', 'type': 'per:employee_of'}])
+    assert (stats['pairs'], stats['relation_tokens']) == (2, 11)
+
+def test_process_biography():
+    linker = MagicMock(hits=0, misses=0)
+
+    def nlp_pipeline(text, mp_name, models, batch_size, stats, linker):
+        linker.misses += 1
+        stats['pairs'] += 2
+        return {'Acme': 'Organisation'}, []
+
+    with patch('nlp.get_models', return_value='models'), patch('nlp.get_linker', return_value=linker), \
+         patch('nlp.nlp_pipeline', side_effect=nlp_pipeline):
+        mp_name, entities, relations, stats = nlp.process_biography('Jane Smith', 'text', batch_size=4)
+
+    assert (mp_name, entities, relations) == ('Jane Smith', {'Acme': 'Organisation'}, [])
+    assert (stats['pairs'], stats['cached_chunks'], stats['annotated_chunks']) == (2, 0, 1)
+    assert stats['relation_seconds'] >= 0
+
+def thread_pool(mp_context=None, **kwargs):
+    return ThreadPoolExecutor(**kwargs)
+
+def test_enrich_mps_writes_relations(tmp_path):
+    results = {'MP 1': ('MP 1', {'Acme': 'Organisation'},
+                        [{'source': 'MP 1', 'target': 'Acme', 'type': 'per:employee_of'}],
+                        {'pairs': 3, 'inference_seconds': 0.5, 'cached_chunks': 1, 'annotated_chunks': 0,
+                         'relation_tokens': 10, 'relation_seconds': 1.0}),
+               'MP 2': ('MP 2', {}, [], {'pairs': 1, 'inference_seconds': 0.25, 'cached_chunks': 0,
+                                         'annotated_chunks': 2, 'relation_tokens': 5, 'relation_seconds': 0.5})}
+
+    def process_biography(mp_name, text, batch_size):
+        if mp_name == 'MP 3':
+            raise ValueError('failed')
+        return results[mp_name]
+
+    with patch('nlp.ProcessPoolExecutor', thread_pool), \
+         patch('nlp.init_worker') as mock_init_worker, \
+         patch('nlp.process_biography', side_effect=process_biography), \
+         patch('nlp.load_coreference', return_value=Coreference()), \
+         patch('nlp.fetch_biography', side_effect=lambda store, mp_name, offline, refresh: (f'{mp_name} said she would', 5)), \
+         patch('nlp.create_new_rel') as mock_create_new_rel:
+        driver = MagicMock()
+        stats = nlp.enrich_mps(driver, ['MP 1', 'MP 2', 'MP 3', 'MP 4'], workers=2, corpus_dir=str(tmp_path),
+                               processed={'MP 2': 4, 'MP 4': 5})
+
+    assert mock_init_worker.call_count == 2
+    mock_create_new_rel.assert_called_once_with(driver, 'MP 1', 'Organisation', 'Acme', 'EMPLOYEE_OF')
+    # MP 4's biography is unchanged since it was processed, and MPs are marked with the revision processed
+    assert (stats['mps'], stats['unchanged'], stats['failed'], stats['relations'], stats['pairs']) == (2, 1, 1, 1, 4)
+    revisions = [call.kwargs for call in driver.session.return_value.__enter__.return_value.execute_write.call_args_list]
+    assert sorted((r['name'], r['revision_id']) for r in revisions) == [('MP 1', 5), ('MP 2', 5)]
+    assert stats['inference_seconds'] == 0.75
+    assert (stats['cached_chunks'], stats['annotated_chunks']) == (1, 2)
+    assert (stats['coreference_tokens'], stats['relation_tokens']) == (15, 15)
+
+def test_enrich_mps_writes_while_resolving(tmp_path):
+    written = []
+
+    def resolve_biographies(biographies, coreference, batch_size, n_process, stats):
+        for i, (mp_name, text) in enumerate(biographies):
+            # With one worker a batch is only submitted once the last is written, so the first is written before the third is resolved
+            if i == 4:
+                assert {'MP 1', 'MP 2'} <= set(written)
+            yield mp_name, text
+
+    with patch('nlp.ProcessPoolExecutor', thread_pool), \
+         patch('nlp.init_worker'), \
+         patch('nlp.process_biography', side_effect=lambda mp_name, text, batch_size: (mp_name, {}, [], dict.fromkeys(
+             ['pairs', 'inference_seconds', 'cached_chunks', 'annotated_chunks', 'relation_tokens', 'relation_seconds'], 0))), \
+         patch('nlp.load_coreference'), \
+         patch('nlp.resolve_biographies', side_effect=resolve_biographies), \
+         patch('nlp.fetch_biography', side_effect=lambda store, mp_name, offline, refresh: (mp_name, 1)), \
+         patch('nlp.write_relations', side_effect=lambda driver, mp_name, *args: written.append(mp_name)):
+        stats = nlp.enrich_mps(MagicMock(), [f'MP {i}' for i in range(1, 7)], workers=1, corpus_dir=str(tmp_path),
+                               coreference_batch_size=2)
+
+    assert sorted(written) == [f'MP {i}' for i in range(1, 7)]
+    assert (stats['mps'], stats['failed']) == (6, 0)
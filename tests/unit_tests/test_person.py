@@ -7,7 +7,10 @@ parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
 grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
 sys.path.append(parent_dir)
 sys.path.append(grandparent_dir)
-from person import MP, get_mps_from_members_api
+import http_client
+import requests
+import person
+from person import MP, get_mps_from_members_api, iter_mps_from_members_api
 
 @pytest.fixture
 def mp_instance():
@@ -28,7 +31,7 @@ def test_set_election_result(mp_instance):
             'majority': 200,
         }
     }
-    with patch('requests.get', MagicMock(return_value=MagicMock(status_code=200, json=lambda: response_data))):
+    with patch('requests.Session.get', MagicMock(return_value=MagicMock(status_code=200, json=lambda: response_data))):
         mp_instance.set_election_result()
 
     assert mp_instance.electorate == 1000
@@ -53,19 +56,55 @@ def test_set_govt_post(mp_instance):
     assert mp_instance.govt_post == 'Government Post'
 
 def test_set_votes(mp_instance):
-    votes = [{'vote_id': 1, 'vote_value': 'yes'}]
+    votes = [('Policy 1', 'voted_for', 0.75), ('Policy 2', 'voted_against', 0.66667), ('Policy 3', 'vote_split', 0.5)]
     mp_instance.set_votes(votes)
 
     assert mp_instance.votes == votes
 
+def test_set_votes_columnar_storage(mp_instance):
+    other_mp = MP(2, 'MP 2', 'Party', 'Constituency 2', 'F', '2022-01-01')
+    mp_instance.set_votes([('Shared policy', 'voted_for', 0.75)])
+    other_mp.set_votes([['Shared policy', 'voted_against', 0.9]])
+
+    # The policy description is interned once and referenced by ID from both MPs
+    assert mp_instance.vote_policy_ids[0] == other_mp.vote_policy_ids[0]
+    assert mp_instance.vote_directions.typecode == 'b'
+    assert mp_instance.vote_strengths.typecode == 'f'
+    assert other_mp.votes == [('Shared policy', 'voted_against', 0.9)]
+
+def test_set_votes_invalid_vote(mp_instance):
+    with pytest.raises(ValueError):
+        mp_instance.set_votes([{'vote_id': 1, 'vote_value': 'yes'}])
+    with pytest.raises(ValueError):
+        mp_instance.set_votes([('Policy 1', 'abstained', 0.5)])
+
+def test_votes_setter(mp_instance):
+    mp_instance.votes = [('Policy 1', 'voted_for', 0.75)]
+
+    assert mp_instance.votes == [('Policy 1', 'voted_for', 0.75)]
+
+def test_mp_is_slotted(mp_instance):
+    with pytest.raises(AttributeError):
+        mp_instance.unknown_attribute = 1
+
+def test_mp_pickle_round_trip(mp_instance):
+    import pickle
+    mp_instance.set_region('London')
+    mp_instance.set_votes([('Policy 1', 'voted_for', 0.75)])
+
+    copy = pickle.loads(pickle.dumps(mp_instance))
+
+    assert copy.region == 'London'
+    assert copy.votes == mp_instance.votes
+
 def test_set_election_result_api_failure(mp_instance):
-    with patch('requests.get', MagicMock(return_value=MagicMock(status_code=404))):
+    with patch('requests.Session.get', MagicMock(return_value=MagicMock(status_code=404))):
         with pytest.raises(Exception):
             mp_instance.set_election_result()
 
 def test_set_election_result_missing_data(mp_instance):
     response_data = {}
-    with patch('requests.get', MagicMock(return_value=MagicMock(status_code=200, json=lambda: response_data))):
+    with patch('requests.Session.get', MagicMock(return_value=MagicMock(status_code=200, json=lambda: response_data))):
         mp_instance.set_election_result()
 
     assert mp_instance.electorate is None
@@ -117,7 +156,7 @@ members_api_response = {
 }
 
 def test_get_mps_from_members_api():
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = members_api_response
 
@@ -135,11 +174,77 @@ def test_get_mps_from_members_api():
 
 def test_get_mps_from_members_api_invalid_status_code():
     # Use 'with' for the requests.get mock
-    with patch("requests.get") as mock_get, patch("time.sleep") as mock_sleep:
+    with patch("requests.Session.get") as mock_get, patch("time.sleep") as mock_sleep:
         mock_get.return_value.status_code = 500
         mock_get.return_value.json.return_value = {}
 
         # Test the get_mps_from_members_api function with an invalid status code
-        with pytest.raises(RecursionError):
+        with pytest.raises(requests.HTTPError):
             get_mps_from_members_api()
             mock_sleep.assert_called_once_with(5)
+
+def make_members_page(skip, take, total):
+    return {
+        "totalResults": total,
+        "items": [
+            {
+                "value": {
+                    "id": i,
+                    "nameDisplayAs": f"MP {i}",
+                    "latestParty": {"name": "Conservative"},
+                    "latestHouseMembership": {
+                        "membershipFrom": f"Constituency {i}",
+                        "membershipStartDate": "2019-12-12T00:00:00"
+                    },
+                    "gender": "F"
+                }
+            }
+            for i in range(skip, min(skip + take, total))
+        ]
+    }
+
+def test_get_mps_from_members_api_fetches_all_pages():
+    def fake_get(url, params=None, headers=None, timeout=None):
+        return MagicMock(status_code=200, json=lambda: make_members_page(params['skip'], params['take'], 65))
+
+    with patch("requests.Session.get", side_effect=fake_get) as mock_get:
+        result = get_mps_from_members_api(workers=4)
+
+    assert len(result) == 65
+    assert sorted(mp.id for mp in result.values()) == list(range(65))
+    # One request per page of MEMBERS_API_MAX_TAKE
+    assert mock_get.call_count == 4
+    assert {call.kwargs['params']['take'] for call in mock_get.call_args_list} == {person.MEMBERS_API_MAX_TAKE}
+
+def test_iter_mps_from_members_api_streams_first_page():
+    with patch("requests.Session.get") as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = make_members_page(0, 20, 100)
+        mps = iter_mps_from_members_api()
+        first = next(mps)
+
+    # Only the first page has been requested when the first MP is yielded
+    assert first.id == 0
+    assert mock_get.call_count == 1
+    mps.close()
+
+def test_get_members_page_retries_with_backoff():
+    failure = MagicMock(status_code=503)
+    success = MagicMock(status_code=200, json=lambda: make_members_page(0, 20, 1))
+    with patch("requests.Session.get", side_effect=[failure, failure, success]), \
+         patch("time.sleep") as mock_sleep, \
+         patch("random.uniform", side_effect=lambda low, high: high):
+        page = person.get_members_page(0)
+
+    assert page['totalResults'] == 1
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [http_client.RETRY_BACKOFF_BASE,
+                                                                    http_client.RETRY_BACKOFF_BASE * 2]
+
+def test_get_members_page_fails_fast_on_client_error():
+    failure = MagicMock(status_code=400)
+    with patch("requests.Session.get", return_value=failure) as mock_get, patch("time.sleep") as mock_sleep:
+        with pytest.raises(requests.HTTPError):
+            person.get_members_page(0)
+
+    assert mock_get.call_count == 1
+    assert not mock_sleep.called
@@ -0,0 +1,86 @@
+import threading
+import time
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+from pipeline import Pipeline, Stage, format_stage
+
+def test_pipeline_runs_items_through_stages():
+    results = []
+    lock = threading.Lock()
+
+    def collect(item):
+        with lock:
+            results.append(item)
+
+    pipeline = Pipeline([Stage('double', lambda x: x * 2, workers=3),
+                         Stage('increment', lambda x: x + 1, workers=2),
+                         Stage('collect', collect)])
+    stats = pipeline.run(range(100))
+
+    assert sorted(results) == [x * 2 + 1 for x in range(100)]
+    assert stats['double']['processed'] == 100
+    assert stats['collect']['processed'] == 100
+
+def test_pipeline_drops_failed_items():
+    results = []
+
+    def fail_on_odd(x):
+        if x % 2:
+            raise ValueError(x)
+        return x
+
+    stats = Pipeline([Stage('filter', fail_on_odd), Stage('collect', results.append)]).run(range(10))
+
+    assert results == [0, 2, 4, 6, 8]
+    assert stats['filter']['failed'] == 5
+
+def test_pipeline_flushes_after_last_item():
+    batch = []
+    flushed = []
+    stage = Stage('batch', batch.append, flush=lambda: flushed.append(list(batch)))
+
+    Pipeline([stage]).run(range(3))
+
+    assert flushed == [[0, 1, 2]]
+
+def test_pipeline_bounded_queues_apply_backpressure():
+    read = []
+
+    def source():
+        for i in range(20):
+            read.append(i)
+            yield i
+
+    release = threading.Event()
+    pipeline = Pipeline([Stage('slow', lambda x: release.wait(), queue_size=2)])
+    runner = threading.Thread(target=pipeline.run, args=(source(),))
+    runner.start()
+    time.sleep(0.2)
+
+    # One item in the worker, two queued and one waiting to be queued
+    assert len(read) <= 4
+    release.set()
+    runner.join()
+    assert len(read) == 20
+
+def test_pipeline_source_failure_finishes_read_items():
+    results = []
+
+    def source():
+        yield 1
+        raise RuntimeError('source failed')
+
+    Pipeline([Stage('collect', results.append)]).run(source())
+
+    assert results == [1]
+
+def test_format_stage():
+    stage = {'processed': 10, 'failed': 1, 'items_per_second': 2.5, 'busy_seconds': 3.0,
+             'queue_depth': 0, 'max_queue_depth': 4}
+
+    assert format_stage('fetch', stage) == "fetch: queue 0 (max 4), 10 processed, 1 failed, 2.5/s"
@@ -0,0 +1,35 @@
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+from policies import PolicyCatalogue, normalise_policy, policy_id
+
+def test_normalise_policy():
+    assert normalise_policy('  Reducing   the Voting Age.') == 'reducing the voting age'
+
+def test_policy_id_is_stable_across_wording_tweaks():
+    assert policy_id('Reducing the voting age') == policy_id('reducing  the voting age.')
+    assert policy_id('Reducing the voting age') != policy_id('Increasing the voting age')
+
+def test_policy_id_fits_in_int64():
+    assert -2 ** 63 <= policy_id('Reducing the voting age') < 2 ** 63
+
+def test_catalogue_keeps_first_description():
+    catalogue = PolicyCatalogue()
+    first = catalogue.add('Reducing the voting age')
+    second = catalogue.add('reducing the voting age.')
+
+    assert first == second
+    assert len(catalogue) == 1
+    assert catalogue.pending() == [{'id': first, 'name': 'Reducing the voting age'}]
+
+def test_catalogue_pending_excludes_written():
+    catalogue = PolicyCatalogue()
+    catalogue.add_votes([('Policy 1', 'voted_for', 0.75), ('Policy 2', 'voted_against', 0.9)])
+    catalogue.mark_written(catalogue.pending())
+    catalogue.add('Policy 3')
+
+    assert catalogue.pending() == [{'id': policy_id('Policy 3'), 'name': 'Policy 3'}]
@@ -7,6 +7,7 @@ from unittest.mock import MagicMock, patch
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
 grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+fixtures_dir = os.path.join(parent_dir, 'fixtures')
 sys.path.append(parent_dir)
 sys.path.append(grandparent_dir)
 import scraper
@@ -101,13 +102,111 @@ govt_posts_api_response = [
 
 def test_get_twfy_ids():
     # Mock the requests.get function
-    with patch('requests.get', MagicMock(return_value=MagicMock(status_code=200, json=lambda: twfy_api_response))):
+    with patch('requests.Session.get', MagicMock(return_value=MagicMock(status_code=200, json=lambda: twfy_api_response))):
         result = scraper.get_twfy_ids()
     expected_result = {"test constituency": {"name": "Test MP", "twfy_id": "1234"}}
     assert result == expected_result
 
 def test_get_govt_posts_from_members_api():
-    with patch('requests.get', MagicMock(return_value=MagicMock(status_code=200, json=lambda: govt_posts_api_response))):
+    with patch('requests.Session.get', MagicMock(return_value=MagicMock(status_code=200, json=lambda: govt_posts_api_response))):
         result = scraper.get_govt_posts_from_members_api()
     expected_result = {"1234": "Test Post"}
-    assert result == expected_result
\ No newline at end of file
+    assert result == expected_result
+
+def read_fixture(name):
+    with open(os.path.join(fixtures_dir, name), 'rb') as f:
+        return f.read()
+
+expected_fixture_votes = [
+    ('Same sex marriage', 'voted_for', 0.92308),
+    ('Assisted dying', 'voted_against', 1.0),
+    ('Abortion', 'vote_split', 0.5),
+    ('Iraq war', 'voted_for', 1.0),
+    ('Trident replacement', 'voted_for', 1.0),
+    ('Military action against ISIL', 'voted_for', 0.75),
+    ('Welfare benefits', 'voted_against', 1.0),
+    ('Bedroom tax', 'voted_against', 0.58333),
+    ('Income tax', 'voted_for', 1.0),
+    ('VAT', 'vote_split', 0.5),
+]
+
+@pytest.mark.parametrize("parser", ["html.parser", "lxml"])
+@pytest.mark.parametrize("partial", [True, False])
+def test_parse_mp_votes_fixture(parser, partial):
+    mp_votes = scraper.parse_mp_votes(read_fixture('twfy_votes.html'), parser=parser, partial=partial)
+
+    assert mp_votes == expected_fixture_votes
+
+@pytest.mark.parametrize("parser", ["html.parser", "lxml"])
+@pytest.mark.parametrize("partial", [True, False])
+def test_parse_constituency_regions_fixture(parser, partial):
+    constituency_region_dict = scraper.parse_constituency_regions(read_fixture('wikipedia_constituencies.html'),
+                                                                  parser=parser, partial=partial)
+
+    assert len(constituency_region_dict) == 13
+    assert constituency_region_dict['aldershot'] == 'South East'
+    assert constituency_region_dict['hartlepool'] == 'North East'
+    assert constituency_region_dict['glasgow central'] == 'Scotland'
+    assert constituency_region_dict['swansea west'] == 'Wales'
+    assert constituency_region_dict['foyle'] == 'NI'
+
+def test_scrape_mp_votes_uses_fetched_page():
+    page = MagicMock(status_code=200, content=read_fixture('twfy_votes.html'))
+    with patch('requests.Session.get', MagicMock(return_value=page)):
+        mp_votes = scraper.scrape_mp_votes('25344')
+
+    assert mp_votes == expected_fixture_votes
+
+def test_calculate_vote_directions_and_strengths():
+    texts = ["300 votes for, 200 votes against",
+             "100 votes for, 200 votes against",
+             "150 votes for, 150 votes against",
+             "1 vote for, 0 votes against",
+             "no votes recorded"]
+    directions, strengths = scraper.calculate_vote_directions_and_strengths(texts)
+
+    assert directions.dtype == 'int8'
+    assert directions.tolist() == [scraper.VOTED_FOR, scraper.VOTED_AGAINST, scraper.VOTE_SPLIT,
+                                   scraper.VOTED_FOR, scraper.VOTE_UNPARSED]
+    assert strengths[:4].tolist() == [0.6, 0.66667, 0.5, 1.0]
+    assert scraper.np.isnan(strengths[4])
+
+def test_calculate_vote_directions_and_strengths_matches_scalar():
+    texts = [f"{f} votes for, {a} votes against" for f in range(0, 40, 3) for a in range(0, 40, 7)]
+    directions, strengths = scraper.calculate_vote_directions_and_strengths(texts)
+
+    for text, direction, strength in zip(texts, directions.tolist(), strengths.tolist()):
+        scalar_direction, scalar_strength = scraper.calculate_vote_direction_and_strength(text)
+        assert scraper.VOTE_DIRECTIONS[direction] == scalar_direction
+        assert strength == pytest.approx(scalar_strength, abs=1e-5)
+
+def test_calculate_vote_directions_and_strengths_matches_scalar_for_every_division():
+    # Every count of votes for and against a policy an MP could have, up to a full House
+    texts = [f"{f} votes for, {a} votes against" for f in range(651) for a in range(651) if f + a > 0]
+    directions, strengths = scraper.calculate_vote_directions_and_strengths(texts)
+
+    scalar = [scraper.calculate_vote_direction_and_strength(text) for text in texts]
+    assert [scraper.VOTE_DIRECTIONS[d] for d in directions.tolist()] == [direction for direction, _ in scalar]
+    # Halfway strengths may round the other way in the 5th place
+    assert strengths.tolist() == pytest.approx([strength for _, strength in scalar], abs=1e-5)
+
+def test_parse_mp_votes_fixture_matches_scalar():
+    soup = BeautifulSoup(read_fixture('twfy_votes.html'), 'html.parser')
+    evidence = [vote.get_text(strip=True) for vote in soup.find_all("a", class_="vote-description__evidence")]
+    mp_votes = scraper.parse_mp_votes(read_fixture('twfy_votes.html'))
+
+    scalar = [scraper.calculate_vote_direction_and_strength(text) for text in evidence]
+    assert [vote[1] for vote in mp_votes] == [direction for direction, _ in scalar]
+    assert [vote[2] for vote in mp_votes] == pytest.approx([strength for _, strength in scalar], abs=1e-5)
+
+def test_calculate_vote_directions_and_strengths_empty():
+    directions, strengths = scraper.calculate_vote_directions_and_strengths([])
+
+    assert len(directions) == 0
+    assert len(strengths) == 0
+
+def test_parse_mp_votes_skips_unparseable_evidence():
+    html = read_fixture('twfy_votes.html').replace(b'(12 votes for, 1 vote against', b'(no votes yet')
+    mp_votes = scraper.parse_mp_votes(html)
+
+    assert mp_votes == expected_fixture_votes[1:]
@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock
+import numpy as np
+import pytest
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+import similarity
+from vote_matrix import VoteMatrix
+
+def make_matrix(values):
+    values = np.array(values, dtype=np.float32)
+    names = [f'MP {i}' for i in range(len(values))]
+    return VoteMatrix(values, names, ['Party'] * len(values), ['Region'] * len(values),
+                      [f'Policy {i}' for i in range(values.shape[1])])
+
+@pytest.fixture
+def matrix():
+    return make_matrix([[1, 1, -1, np.nan],
+                        [1, 0.9, -1, 1],
+                        [-1, -1, 1, np.nan],
+                        [1, 1, -0.5, -1]])
+
+def brute_force_cosine(matrix):
+    values = np.nan_to_num(matrix.values)
+    unit = values / np.linalg.norm(values, axis=1, keepdims=True)
+    scores = unit @ unit.T
+    np.fill_diagonal(scores, -np.inf)
+    return scores
+
+def test_top_k_cosine_matches_brute_force(matrix):
+    neighbours, scores = similarity.top_k_similar(matrix, k=2, block_size=3)
+    expected = brute_force_cosine(matrix)
+
+    for i in range(4):
+        assert list(neighbours[i]) == list(np.argsort(-expected[i])[:2])
+        assert scores[i] == pytest.approx(np.sort(expected[i])[::-1][:2], rel=1e-5)
+
+def test_top_k_agreement(matrix):
+    neighbours, scores = similarity.top_k_similar(matrix, k=3, metric='agreement')
+
+    # MP 2 disagreed with MP 0 on every shared policy
+    assert scores[0][list(neighbours[0]).index(2)] == pytest.approx(0.0)
+    assert scores[0][0] == pytest.approx(1.0)
+
+def test_top_k_excludes_self_and_pads():
+    matrix = make_matrix([[1, -1], [1, -1]])
+    neighbours, scores = similarity.top_k_similar(matrix, k=5)
+
+    assert neighbours.shape == (2, 1)
+    assert neighbours[:, 0].tolist() == [1, 0]
+
+def test_top_k_skips_mps_without_comparable_votes():
+    matrix = make_matrix([[1, np.nan], [np.nan, 1], [np.nan, -1]])
+    neighbours, scores = similarity.top_k_similar(matrix, k=2, metric='agreement')
+
+    # MP 0 shares no policy with anyone
+    assert neighbours[0].tolist() == [-1, -1]
+    assert np.isnan(scores[0]).all()
+
+def test_top_k_cosine_skips_mps_without_votes():
+    matrix = make_matrix([[1, -1], [np.nan, np.nan], [1, -0.5], [0, 0]])
+    neighbours, scores = similarity.top_k_similar(matrix, k=3)
+
+    # MPs 1 and 3 have no votes, so have no neighbours and are no one's neighbour
+    assert neighbours[0].tolist() == [2, -1, -1]
+    assert neighbours[2].tolist() == [0, -1, -1]
+    for i in (1, 3):
+        assert neighbours[i].tolist() == [-1, -1, -1]
+        assert np.isnan(scores[i]).all()
+    assert [row['name'] for row in similarity.similarity_rows(matrix, neighbours, scores)] == ['MP 0', 'MP 2']
+
+def test_unknown_metric(matrix):
+    with pytest.raises(ValueError):
+        similarity.top_k_similar(matrix, metric='euclidean')
+
+def test_build_similarity_graph_writes_ranked_rows(matrix):
+    driver = MagicMock()
+    session = driver.session.return_value.__enter__.return_value
+    session.execute_write.return_value = {'relationships': 8}
+
+    stats = similarity.build_similarity_graph(driver, matrix=matrix, k=2)
+
+    rows = session.execute_write.call_args.kwargs['rows']
+    assert len(rows) == 8
+    assert [row['rank'] for row in rows[:2]] == [1, 2]
+    assert stats['relationships'] == 8
+    assert {'load_seconds', 'similarity_seconds', 'write_seconds'} <= set(stats)
@@ -0,0 +1,61 @@
+from unittest.mock import patch
+import numpy as np
+import pytest
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+import snapshot
+from person import MP
+from policies import policy_id
+
+@pytest.fixture
+def mps():
+    mp1 = MP(1, 'MP 1', 'Labour', 'Constituency 1', 'F', '2019-01-01')
+    mp1.set_region('London')
+    mp1.set_votes([('Policy 1', 'voted_for', 0.75), ('Policy 2', 'voted_against', 0.5)])
+    mp2 = MP(2, 'MP 2', 'Conservative', 'Constituency 2', 'M', '2017-01-01')
+    mp2.set_region('Wales')
+    mp2.set_votes([('Policy 2', 'vote_split', 0.5)])
+    return [mp1, mp2]
+
+def test_snapshot_columns(mps):
+    columns = snapshot.snapshot_columns(mps, {2: 'Minister'})
+
+    assert set(columns) == set(snapshot.TABLES)
+    assert columns['mps']['region'] == ['London', 'Wales']
+    assert sorted(zip(columns['policies']['policy_id'].tolist(), columns['policies']['name'])) == \
+        sorted([(policy_id('Policy 1'), 'Policy 1'), (policy_id('Policy 2'), 'Policy 2')])
+    votes = columns['votes']
+    assert votes['mp_id'].tolist() == [1, 1, 2]
+    assert votes['policy_id'].tolist() == [policy_id('Policy 1'), policy_id('Policy 2'), policy_id('Policy 2')]
+    assert votes['direction'] == ['voted_for', 'voted_against', 'vote_split']
+    assert votes['strength'].dtype == np.float32
+    assert columns['govt_posts']['govt_post'] == ['Minister']
+
+def test_snapshot_columns_empty():
+    columns = snapshot.snapshot_columns([], {})
+
+    assert len(columns['votes']['mp_id']) == 0
+    assert len(columns['policies']['name']) == 0
+
+def test_write_snapshot_without_pyarrow(mps, tmp_path):
+    with patch('snapshot.pa', None), pytest.raises(ImportError):
+        snapshot.write_snapshot(mps, {}, snapshot_dir=str(tmp_path))
+
+@pytest.mark.parametrize('format', snapshot.FORMATS)
+def test_write_and_read_snapshot(mps, tmp_path, format):
+    pytest.importorskip('pyarrow')
+    path = snapshot.write_snapshot(mps, {2: 'Minister'}, snapshot_dir=str(tmp_path), format=format)
+
+    assert snapshot.latest_snapshot(str(tmp_path)) == path
+    votes = snapshot.read_snapshot(path, 'votes')
+    assert votes.num_rows == 3
+    assert str(votes.schema.field('direction').type).startswith('dictionary')
+    assert snapshot.read_snapshot(path, 'mps').column('name').to_pylist() == ['MP 1', 'MP 2']
+
+def test_latest_snapshot_none(tmp_path):
+    assert snapshot.latest_snapshot(str(tmp_path / 'missing')) is None
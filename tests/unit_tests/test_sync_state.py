@@ -0,0 +1,78 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+from person import MP
+from sync_state import SyncState, sync_person
+
+def make_mp(votes=None, govt_post=None):
+    mp = MP(1, 'MP 1', 'Labour', 'Constituency 1', 'F', '2019-01-01')
+    mp.set_region('London')
+    mp.set_votes(votes if votes is not None else [('Policy 1', 'voted_for', 0.75),
+                                                  ('Policy 2', 'voted_against', 0.9)])
+    if govt_post:
+        mp.set_govt_post(govt_post)
+    return mp
+
+@pytest.fixture
+def state(tmp_path):
+    return SyncState.load(str(tmp_path / 'state.json'))
+
+def test_diff_new_mp_writes_everything(state):
+    diff = state.diff(make_mp())
+
+    assert diff.attributes_changed
+    assert len(diff.added_votes) == 2
+    assert diff.removed_votes == []
+
+def test_diff_unchanged_mp(state):
+    state.record(make_mp())
+
+    assert state.diff(make_mp()) is None
+
+def test_diff_changed_votes_only(state):
+    state.record(make_mp())
+    mp = make_mp(votes=[('Policy 1', 'voted_for', 0.75), ('Policy 2', 'voted_against', 0.95)])
+
+    diff = state.diff(mp)
+
+    assert not diff.attributes_changed
+    assert diff.added_votes == [('Policy 2', 'voted_against', 0.95)]
+    assert diff.removed_votes == [('Policy 2', 'voted_against', 0.9)]
+
+def test_diff_changed_govt_post(state):
+    state.record(make_mp())
+
+    diff = state.diff(make_mp(govt_post='Test Post'))
+
+    assert diff.attributes_changed
+    assert diff.added_votes == []
+    assert diff.removed_votes == []
+
+def test_save_and_load(state):
+    state.record(make_mp())
+    state.save()
+
+    loaded = SyncState.load(state.path)
+
+    assert loaded.diff(make_mp()) is None
+
+def test_sync_person_skips_unchanged(state):
+    state.record(make_mp())
+    with patch('sync_state.apply_person_diff') as mock_apply:
+        diff = sync_person(MagicMock(), state, make_mp())
+
+    assert diff is None
+    assert not mock_apply.called
+
+def test_sync_person_writes_and_records(state):
+    with patch('sync_state.apply_person_diff') as mock_apply:
+        sync_person(MagicMock(), state, make_mp())
+
+    assert mock_apply.call_count == 1
+    assert state.diff(make_mp()) is None
@@ -0,0 +1,106 @@
+from unittest.mock import MagicMock
+import numpy as np
+import pytest
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+grandparent_dir = os.path.abspath(os.path.join(parent_dir, os.pardir))
+sys.path.append(parent_dir)
+sys.path.append(grandparent_dir)
+from person import MP
+from vote_matrix import VoteMatrix
+
+def make_mp(id, party, region, votes):
+    mp = MP(id, f'MP {id}', party, f'Constituency {id}', 'F', '2019-01-01')
+    mp.set_region(region)
+    mp.set_votes(votes)
+    return mp
+
+@pytest.fixture
+def matrix():
+    mps = [make_mp(1, 'Labour', 'London', [('Policy A', 'voted_for', 0.75), ('Policy B', 'voted_against', 0.5)]),
+           make_mp(2, 'Labour', 'Wales', [('Policy A', 'voted_for', 1.0), ('Policy B', 'voted_for', 0.5)]),
+           make_mp(3, 'Labour', 'London', [('Policy A', 'voted_against', 1.0), ('Policy B', 'voted_against', 1.0)]),
+           make_mp(4, 'Conservative', 'London', [('Policy A', 'voted_against', 1.0), ('Policy B', 'vote_split', 0.5)])]
+    return VoteMatrix.from_mps(mps)
+
+def column(matrix, policy):
+    return list(matrix.policies).index(policy)
+
+def test_from_mps_signed_strengths(matrix):
+    a, b = column(matrix, 'Policy A'), column(matrix, 'Policy B')
+
+    assert matrix.shape == (4, 2)
+    assert matrix.values[0, a] == pytest.approx(0.75)
+    assert matrix.values[0, b] == pytest.approx(-0.5)
+    assert matrix.values[3, b] == 0
+
+def test_from_mps_missing_votes_are_nan():
+    mps = [make_mp(1, 'Labour', 'London', [('Policy A', 'voted_for', 0.75)]),
+           make_mp(2, 'Labour', 'London', [('Policy C', 'voted_for', 0.75)])]
+    matrix = VoteMatrix.from_mps(mps)
+
+    assert np.isnan(matrix.values).sum() == 2
+    assert len(matrix.to_coo()[2]) == 2
+
+def test_from_neo4j_matches_from_mps(matrix):
+    records = [{'name': 'MP 1', 'party': 'Labour', 'region': 'London',
+                'votes': [[1, 'Policy A', 'VOTED_FOR', 0.75], [2, 'Policy B', 'VOTED_AGAINST', 0.5]]},
+               {'name': 'MP 2', 'party': 'Labour', 'region': 'Wales', 'votes': [[None, None, None, None]]}]
+    driver = MagicMock()
+    driver.session.return_value.__enter__.return_value.execute_read.return_value = records
+
+    from_db = VoteMatrix.from_neo4j(driver)
+
+    assert list(from_db.policies) == ['Policy A', 'Policy B']
+    assert from_db.values[0].tolist() == pytest.approx([0.75, -0.5])
+    assert np.isnan(from_db.values[1]).all()
+
+def test_from_records_keys_columns_by_policy_id():
+    records = [{'name': 'MP 1', 'party': 'Labour', 'region': 'London',
+                'votes': [[1, 'Policy A', 'VOTED_FOR', 0.75], [2, 'Policy A', 'VOTED_AGAINST', 0.5]]}]
+
+    matrix = VoteMatrix.from_records(records)
+
+    # Policies that share a name keep their own columns
+    assert list(matrix.policies) == ['Policy A', 'Policy A']
+    assert matrix.values[0].tolist() == pytest.approx([0.75, -0.5])
+
+def test_policy_controversy(matrix):
+    controversy = matrix.policy_controversy()
+    a, b = column(matrix, 'Policy A'), column(matrix, 'Policy B')
+
+    assert controversy['support'][a] == 2
+    assert controversy['opposition'][a] == 2
+    assert controversy['controversy'][a] == pytest.approx(1.0)
+    assert controversy['split'][b] == 1
+    assert controversy['controversy'][b] == pytest.approx(1 - 1 / 3)
+
+def test_party_cohesion(matrix):
+    cohesion = matrix.party_cohesion()
+
+    # Labour divided 2-1 on both policies, the single Conservative MP is fully cohesive on Policy A
+    assert cohesion['Labour']['cohesion'] == pytest.approx(1 / 3)
+    assert cohesion['Conservative']['cohesion'] == pytest.approx(1.0)
+
+def test_rebellion_rates(matrix):
+    rates = matrix.rebellion_rates()
+
+    # MP 3 voted against the Labour majority on Policy A, MP 2 on Policy B
+    assert rates.tolist()[:3] == pytest.approx([0.0, 0.5, 0.5])
+    assert rates[3] == 0
+
+def test_region_breakdown(matrix):
+    breakdown = matrix.region_breakdown()
+    a = column(matrix, 'Policy A')
+
+    assert set(breakdown) == {'London', 'Wales'}
+    assert breakdown['London']['support'][a] == 1
+    assert breakdown['London']['opposition'][a] == 2
+    assert breakdown['London']['mean_strength'][a] == pytest.approx((0.75 - 1 - 1) / 3)
+
+def test_statistics(matrix):
+    stats = matrix.statistics()
+
+    assert set(stats) == {'policy_controversy', 'party_cohesion', 'rebellion_rates', 'region_breakdown', 'seconds'}
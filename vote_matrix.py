@@ -0,0 +1,268 @@
+import time
+import numpy as np
+from scraper import VOTE_DIRECTIONS
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Sign of each vote direction code in `VOTE_DIRECTIONS`: split votes count as neither for nor against
+DIRECTION_SIGNS = np.array([{'vote_split': 0, 'voted_for': 1, 'voted_against': -1}[direction]
+                            for direction in VOTE_DIRECTIONS], dtype=np.float32)
+
+# Relationship type of each vote direction, for matrices read from Neo4j
+RELATIONSHIP_SIGNS = {'VOTED_FOR': 1.0, 'VOTED_AGAINST': -1.0, 'VOTE_SPLIT': 0.0}
+
+def read_votes_work(tx):
+    """
+    Function to be executed within a read transaction to read every MP's party, region and votes.
+    The party and region are read once per MP, before its votes, so that each vote is read once.
+
+    Args:
+        tx: The transaction object.
+
+    Returns:
+        list: One dict per MP with name, party, region and a list of [policy ID, policy, type, strength] votes.
+    """
+    return tx.run("MATCH (m:MP) \
+                OPTIONAL MATCH (m)-[:IS_A_MEMBER_OF]->(party:Party) \
+                WITH m, head(collect(party.name)) AS party \
+                OPTIONAL MATCH (m)-[:REPRESENTS_REGION]->(region:Region) \
+                WITH m, party, head(collect(region.name)) AS region \
+                OPTIONAL MATCH (m)-[r:VOTED_FOR|VOTED_AGAINST|VOTE_SPLIT]->(p:Policy) \
+                WITH m, party, region, collect([p.id, p.name, type(r), r.strength]) AS votes \
+                RETURN m.name AS name, party, region, votes").data()
+
+class VoteMatrix(object):
+    """
+    Dense MP x Policy matrix of signed vote strengths for in-process analytics: positive for a
+    vote for the policy, negative against, 0 for a split vote and NaN where the MP did not vote.
+
+    Attributes:
+        values (numpy.ndarray): float32 matrix of shape (MPs, policies).
+        mps (numpy.ndarray): MP name of each row.
+        parties (numpy.ndarray): Party of each row.
+        regions (numpy.ndarray): Region of each row.
+        policies (numpy.ndarray): Policy name of each column.
+    """
+    def __init__(self, values, mps, parties, regions, policies):
+        self.values = values
+        self.mps = np.asarray(mps, dtype=object)
+        self.parties = np.asarray(parties, dtype=object)
+        self.regions = np.asarray(regions, dtype=object)
+        self.policies = np.asarray(policies, dtype=object)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @classmethod
+    def from_mps(cls, mps):
+        """
+        Build the matrix from enriched MP objects, reading their columnar vote arrays directly.
+
+        Args:
+            mps (list): The MP objects.
+
+        Returns:
+            VoteMatrix: The MPs' votes.
+        """
+        policy_table = mps[0].policy_table if mps else None
+        lengths = np.array([len(mp.vote_policy_ids) for mp in mps], dtype=np.int64)
+        policy_ids = np.concatenate([np.asarray(mp.vote_policy_ids, dtype=np.int64) for mp in mps] or [[]])
+        directions = np.concatenate([np.asarray(mp.vote_directions, dtype=np.int64) for mp in mps] or [[]])
+        strengths = np.concatenate([np.asarray(mp.vote_strengths, dtype=np.float32) for mp in mps] or [[]])
+
+        # Columns are the policies any MP voted on, in policy table order
+        columns, cols = np.unique(policy_ids.astype(np.int64), return_inverse=True)
+        rows = np.repeat(np.arange(len(mps)), lengths)
+        values = np.full((len(mps), len(columns)), np.nan, dtype=np.float32)
+        values[rows, cols] = DIRECTION_SIGNS[directions.astype(np.int64)] * strengths
+
+        policies = [policy_table.description(int(policy_id)) for policy_id in columns]
+        return cls(values, [mp.name for mp in mps], [mp.party for mp in mps], [mp.region for mp in mps],
+                   policies)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build the matrix from MP records, as returned by `read_votes_work`.
+
+        Args:
+            records (list): Dicts with name, party, region and [policy ID, policy, type, strength] votes.
+
+        Returns:
+            VoteMatrix: The MPs' votes.
+        """
+        # Columns are keyed by policy ID, as different policies may share a name
+        columns, policies = {}, []
+        rows, cols, signed = [], [], []
+        for row, record in enumerate(records):
+            for policy_id, policy, relationship, strength in record['votes']:
+                if policy_id is None or relationship not in RELATIONSHIP_SIGNS:
+                    continue
+                if policy_id not in columns:
+                    columns[policy_id] = len(columns)
+                    policies.append(policy)
+                rows.append(row)
+                cols.append(columns[policy_id])
+                signed.append(RELATIONSHIP_SIGNS[relationship] * (strength or 0.0))
+
+        values = np.full((len(records), len(columns)), np.nan, dtype=np.float32)
+        values[np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)] = signed
+        return cls(values, [r['name'] for r in records], [r['party'] for r in records],
+                   [r['region'] for r in records], policies)
+
+    @classmethod
+    def from_neo4j(cls, driver):
+        """
+        Build the matrix from the graph database with a single bulk read.
+
+        Args:
+            driver (neo4j.Driver): The Neo4j driver instance.
+
+        Returns:
+            VoteMatrix: The votes of every MP in the database.
+        """
+        with driver.session() as session:
+            records = session.execute_read(read_votes_work)
+        return cls.from_records(records)
+
+    def to_coo(self):
+        """
+        Get the matrix's votes in sparse coordinate form.
+
+        Returns:
+            tuple: Row indexes, column indexes and signed strengths of every vote.
+        """
+        rows, cols = np.nonzero(~np.isnan(self.values))
+        return rows, cols, self.values[rows, cols]
+
+    def direction_masks(self):
+        """
+        Get boolean masks of the votes in each direction.
+
+        Returns:
+            tuple: (voted_for, voted_against, vote_split) matrices with the shape of `values`.
+        """
+        voted = ~np.isnan(self.values)
+        # NaN compares as False, so non-votes are in no mask
+        with np.errstate(invalid='ignore'):
+            return self.values > 0, self.values < 0, voted & (self.values == 0)
+
+    def groups(self, labels):
+        """
+        Group MP rows by label.
+
+        Args:
+            labels (numpy.ndarray): Group label of each MP row, such as `parties` or `regions`.
+
+        Returns:
+            tuple: Group labels, the group index of each row, and a one-hot (groups, MPs) membership
+                   matrix, so that every group's totals come from a single matrix product.
+        """
+        groups, index = np.unique(np.asarray(labels).astype(str), return_inverse=True)
+        membership = np.zeros((len(groups), len(index)), dtype=np.float32)
+        membership[index, np.arange(len(index))] = 1
+        return groups, index, membership
+
+    def group_counts(self, labels):
+        """
+        Count the votes in each direction for each group of MPs and each policy.
+
+        Args:
+            labels (numpy.ndarray): Group label of each MP row, such as `parties` or `regions`.
+
+        Returns:
+            tuple: Group labels, then support, opposition and split count matrices of shape
+                   (groups, policies).
+        """
+        groups, _, membership = self.groups(labels)
+        voted_for, voted_against, vote_split = self.direction_masks()
+        return (groups,
+                membership @ voted_for.astype(np.float32),
+                membership @ voted_against.astype(np.float32),
+                membership @ vote_split.astype(np.float32))
+
+    def policy_controversy(self):
+        """
+        Count each policy's votes and score how evenly the House divided on it.
+
+        Returns:
+            dict: support, opposition and split count arrays per policy, and controversy, from 0
+                  when every MP voted the same way to 1 for an even division (NaN unless MPs voted
+                  both for and against), as stored on Policy nodes by `aggregates`.
+        """
+        voted_for, voted_against, vote_split = self.direction_masks()
+        support = voted_for.sum(axis=0)
+        opposition = voted_against.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            controversy = 1 - np.abs(support - opposition) / (support + opposition)
+        controversy[(support == 0) | (opposition == 0)] = np.nan
+        return {'support': support, 'opposition': opposition, 'split': vote_split.sum(axis=0),
+                'controversy': controversy}
+
+    def party_cohesion(self):
+        """
+        Score how united each party voted, with the Rice index |for - against| / (for + against)
+        of each policy, averaged over the policies the party's MPs voted on.
+
+        Returns:
+            dict: For each party, its mean cohesion and its per-policy cohesion array (NaN where
+                  none of its MPs voted for or against).
+        """
+        groups, support, opposition, _ = self.group_counts(self.parties)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rice = np.abs(support - opposition) / (support + opposition)
+            mean = np.nansum(rice, axis=1) / (~np.isnan(rice)).sum(axis=1)
+        return {party: {'cohesion': float(mean[i]), 'per_policy': rice[i]} for i, party in enumerate(groups)}
+
+    def rebellion_rates(self):
+        """
+        Get the fraction of each MP's for/against votes that went against the majority of their party.
+        Policies on which the party was evenly divided are not counted.
+
+        Returns:
+            numpy.ndarray: Rebellion rate of each MP row, NaN for MPs with no counted votes.
+        """
+        _, party_index, _ = self.groups(self.parties)
+        _, support, opposition, _ = self.group_counts(self.parties)
+        party_line = np.sign(support - opposition)[party_index]
+        direction = np.sign(np.nan_to_num(self.values, nan=0.0))
+        counted = (direction != 0) & (party_line != 0)
+        rebellions = counted & (direction != party_line)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return rebellions.sum(axis=1) / counted.sum(axis=1)
+
+    def region_breakdown(self):
+        """
+        Break each policy's votes down by region.
+
+        Returns:
+            dict: For each region, its support, opposition and split count arrays per policy and
+                  its MPs' mean signed vote strength per policy (NaN where none voted).
+        """
+        groups, support, opposition, split = self.group_counts(self.regions)
+        _, _, membership = self.groups(self.regions)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_strength = (membership @ np.nan_to_num(self.values, nan=0.0)) / (support + opposition + split)
+        return {region: {'support': support[i], 'opposition': opposition[i], 'split': split[i],
+                         'mean_strength': mean_strength[i]}
+                for i, region in enumerate(groups)}
+
+    def statistics(self):
+        """
+        Compute every dashboard statistic for the matrix.
+
+        Returns:
+            dict: policy_controversy, party_cohesion, rebellion_rates and region_breakdown results,
+                  and the seconds taken to compute them.
+        """
+        start = time.perf_counter()
+        stats = {'policy_controversy': self.policy_controversy(),
+                 'party_cohesion': self.party_cohesion(),
+                 'rebellion_rates': self.rebellion_rates(),
+                 'region_breakdown': self.region_breakdown()}
+        stats['seconds'] = time.perf_counter() - start
+        logger.info(f"Computed statistics for {self.shape[0]} MPs and {self.shape[1]} policies "
+                    f"in {stats['seconds'] * 1000:.1f}ms")
+        return stats